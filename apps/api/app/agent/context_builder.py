@@ -6,9 +6,10 @@ from app.path_config import *
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import logging
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from app.database import Game, GamePlayer, Event
+from app.database import ChatMessageRecord, NightActionRecord, DeathRecord, PrivateNoteRecord
 from app.game.state_machine import GameStateMachine
 from cyber_werewolves.models.agent_models import (
     AgentObservation, GameInfo, SelfInfo, PublicState, 
@@ -17,6 +18,14 @@ from cyber_werewolves.models.agent_models import (
 
 logger = logging.getLogger(__name__)
 
+# deaths.cause -> reason shown in revealed identities
+DEATH_REASONS = {
+    "voted": "voted_out",
+    "killed": "killed_at_night",
+    "poisoned": "killed_at_night",
+    "shot": "shot_by_hunter"
+}
+
 class AgentContextBuilder:
     """构建Agent可见上下文 - 严格信息隔离"""
     
@@ -39,7 +48,7 @@ class AgentContextBuilder:
         
         # Build each component
         game_info = self._build_game_info(game_state)
-        self_info = self._build_self_info(player)
+        self_info = self._build_self_info(game_id, player)
         public_state = self._build_public_state(game_state)
         chat_history = self._build_chat_history(game_id, seat, player)
         private_notes = self._build_private_notes(game_id, seat)
@@ -65,10 +74,10 @@ class AgentContextBuilder:
             phase_deadline_ts=deadline_ts
         )
     
-    def _build_self_info(self, player: Dict[str, Any]) -> SelfInfo:
+    def _build_self_info(self, game_id: str, player: Dict[str, Any]) -> SelfInfo:
         """构建自身信息"""
         status = {
-            "can_use_skill": self._check_skill_availability(player),
+            "can_use_skill": self._check_skill_availability(game_id, player),
             "is_silenced": self._check_silence_effects(player)
         }
         
@@ -79,20 +88,19 @@ class AgentContextBuilder:
             status=status
         )
     
-    def _check_skill_availability(self, player: Dict[str, Any]) -> bool:
+    def _check_skill_availability(self, game_id: str, player: Dict[str, Any]) -> bool:
         """检查技能是否可用（基于冷却时间和限制）"""
         role = player.get("role", "")
         seat = player.get("seat", 0)
         
-        # For roles with limited uses, check event history
+        # For roles with limited uses, check action history
         if role == "Witch":
-            # Check if witch has already used both potions
-            return self._check_witch_potions_available(seat)
-        elif role == "Guard":
-            # Check if guard can protect (not consecutive nights on same target)
-            return self._check_guard_target_available(seat)
+            # Witch can use skills if at least one potion is available
+            has_save, has_poison = self._get_witch_potion_status(game_id, seat)
+            return has_save or has_poison
         else:
-            # Most roles can use skills freely each night
+            # Most roles can use skills freely each night; the guard's
+            # no-repeat rule is enforced through guard_targets
             return True
     
     def _check_silence_effects(self, player: Dict[str, Any]) -> bool:
@@ -101,121 +109,37 @@ class AgentContextBuilder:
         # This would check for debuff events affecting the player
         return False
     
-    def _check_witch_potions_available(self, seat: int) -> bool:
-        """检查女巫是否还有药水可用"""
-        # Check event log for witch's previous uses
-        from app.database import Event
-        
-        try:
-            poison_used = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type == "night_action",
-                Event.actor == str(seat),
-                Event.payload["action"].astext == "poison"
-            ).first() is not None
-            
-            save_used = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type == "night_action",
-                Event.actor == str(seat),
-                Event.payload["action"].astext == "save"
-            ).first() is not None
-            
-            # Witch can use skills if at least one potion is available
-            return not (poison_used and save_used)
-        except:
-            # If we can't check, assume available
-            return True
-    
-    def _check_guard_target_available(self, seat: int) -> bool:
-        """检查守卫是否可以守护（不能连续守护同一目标）"""
-        # This is a simplified check - in a full implementation,
-        # we'd track the last guarded target from previous night
-        try:
-            from app.database import Event
-            
-            # Get the last guard action
-            last_guard_action = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type == "night_action",
-                Event.actor == str(seat),
-                Event.payload["action"].astext == "guard"
-            ).order_by(Event.timestamp.desc()).first()
-            
-            if last_guard_action:
-                # Check if it was from the immediately previous night
-                # For now, just return True to allow guarding
-                return True
-            
-            return True
-        except:
-            return True
-    
-    def _get_death_reason(self, seat: int) -> str:
+    def _get_death_reason(self, game_id: str, seat: int) -> str:
         """获取玩家死亡原因"""
-        try:
-            from app.database import Event
-            
-            # Look for death-related events
-            death_event = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type.in_(["night_result", "vote_result", "hunter_shot"]),
-                Event.payload.contains({"killed": seat})
-            ).order_by(Event.timestamp.desc()).first()
-            
-            if death_event:
-                if death_event.type == "night_result":
-                    return "killed_at_night"
-                elif death_event.type == "vote_result":
-                    return "voted_out"
-                elif death_event.type == "hunter_shot":
-                    return "shot_by_hunter"
-            
-            return "died"
-        except:
+        death = self.db.query(DeathRecord).filter(
+            DeathRecord.game_id == game_id,
+            DeathRecord.seat == seat
+        ).order_by(DeathRecord.idx.desc()).first()
+        
+        if not death:
             return "died"
+        return DEATH_REASONS.get(death.cause, "died")
     
-    def _get_last_guarded_target(self, seat: int) -> Optional[int]:
+    def _get_last_guarded_target(self, game_id: str, seat: int) -> Optional[int]:
         """获取守卫上一晚守护的目标"""
-        try:
-            from app.database import Event
-            
-            last_guard_action = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type == "night_action",
-                Event.actor == str(seat),
-                Event.payload["action"].astext == "guard"
-            ).order_by(Event.timestamp.desc()).first()
-            
-            if last_guard_action and "target_seat" in last_guard_action.payload:
-                return last_guard_action.payload["target_seat"]
-            
-            return None
-        except:
-            return None
+        last_guard_action = self.db.query(NightActionRecord).filter(
+            NightActionRecord.game_id == game_id,
+            NightActionRecord.seat == seat,
+            NightActionRecord.action == "guard"
+        ).order_by(NightActionRecord.idx.desc()).first()
+        
+        return last_guard_action.target_seat if last_guard_action else None
     
-    def _get_witch_potion_status(self, seat: int) -> tuple[bool, bool]:
+    def _get_witch_potion_status(self, game_id: str, seat: int) -> tuple[bool, bool]:
         """获取女巫药水使用状态 (has_save, has_poison)"""
-        try:
-            from app.database import Event
-            
-            save_used = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type == "night_action",
-                Event.actor == str(seat),
-                Event.payload["action"].astext == "save"
-            ).first() is not None
-            
-            poison_used = self.db.query(Event).filter(
-                Event.game_id == self.state_machine.current_game_id,
-                Event.type == "night_action",
-                Event.actor == str(seat),
-                Event.payload["action"].astext == "poison"
-            ).first() is not None
-            
-            return (not save_used, not poison_used)
-        except:
-            return (True, True)  # Default to having both potions
+        used = {
+            action for (action,) in self.db.query(NightActionRecord.action).filter(
+                NightActionRecord.game_id == game_id,
+                NightActionRecord.seat == seat,
+                NightActionRecord.action.in_(["save", "poison"])
+            ).distinct()
+        }
+        return ("save" not in used, "poison" not in used)
     
     def _build_public_state(self, game_state) -> PublicState:
         """构建公开状态信息"""
@@ -228,7 +152,7 @@ class AgentContextBuilder:
                 revealed_identities.append({
                     "seat": seat,
                     "role": player["role"],
-                    "reason": self._get_death_reason(seat)
+                    "reason": self._get_death_reason(game_state.game_id, seat)
                 })
         
         # Get last night result (public information only)
@@ -251,33 +175,27 @@ class AgentContextBuilder:
     ) -> ChatHistory:
         """构建聊天历史 - 基于可见性约束"""
         
-        # Get recent events
-        events = self.db.query(Event).filter(
-            Event.game_id == game_id,
-            Event.type == "Speak"
-        ).order_by(Event.idx.desc()).limit(50).all()
+        # Get recent messages
+        messages = self.db.query(ChatMessageRecord).filter(
+            ChatMessageRecord.game_id == game_id,
+            ChatMessageRecord.visibility.in_(["public", "team"])
+        ).order_by(ChatMessageRecord.idx.desc()).limit(50).all()
         
         public_chat = []
         team_chat = []
         
-        for event in reversed(events):  # Restore chronological order
-            payload = event.payload
-            event_visibility = payload.get("visibility", "public")
-            speaker_seat = payload.get("seat")
-            content = payload.get("content", "")
-            
+        for record in reversed(messages):  # Restore chronological order
             message = ChatMessage(
-                idx=event.idx,
-                seat=speaker_seat,
-                text=content
+                idx=record.idx,
+                seat=record.seat,
+                text=record.content
             )
             
-            if event_visibility == "public":
+            if record.visibility == "public":
                 public_chat.append(message)
-            elif event_visibility == "team":
+            elif self._can_see_team_chat(game_id, player, record.seat):
                 # Only show team chat if player is in same team
-                if self._can_see_team_chat(player, speaker_seat):
-                    team_chat.append(message)
+                team_chat.append(message)
         
         return ChatHistory(
             public_chat_tail=public_chat[-20:],  # Last 20 messages
@@ -287,48 +205,15 @@ class AgentContextBuilder:
     def _build_private_notes(self, game_id: str, seat: int) -> List[PrivateNote]:
         """构建私密通知"""
         
-        # Get system notices targeted at this player
-        events = self.db.query(Event).filter(
-            Event.game_id == game_id,
-            Event.type.in_(["SystemNotice", "NightResult"])
-        ).order_by(Event.idx).all()
+        # Notices addressed to this seat or to everyone
+        notes = self.db.query(PrivateNoteRecord).filter(
+            PrivateNoteRecord.game_id == game_id,
+            or_(PrivateNoteRecord.seat == seat, PrivateNoteRecord.seat.is_(None))
+        ).order_by(PrivateNoteRecord.idx, PrivateNoteRecord.id).all()
         
-        private_notes = []
-        
-        for event in events:
-            payload = event.payload
-            
-            if event.type == "SystemNotice":
-                target_seats = payload.get("target_seats")
-                if target_seats is None or seat in target_seats:
-                    private_notes.append(PrivateNote(
-                        idx=event.idx,
-                        content=payload.get("message", "")
-                    ))
-            
-            elif event.type == "NightResult":
-                # Extract relevant info for this player
-                results = payload.get("results", {})
-                inspected = results.get("inspected", {})
-                
-                if seat in inspected:
-                    target_seat = seat
-                    alignment = inspected[seat]
-                    private_notes.append(PrivateNote(
-                        idx=event.idx,
-                        content=f"你查验了{target_seat}号玩家，结果：{alignment}阵营"
-                    ))
-                
-                # If player was saved by witch
-                if seat in results.get("saved", []):
-                    private_notes.append(PrivateNote(
-                        idx=event.idx,
-                        content="你被女巫救了！"
-                    ))
-        
-        return private_notes
+        return [PrivateNote(idx=note.idx, content=note.content) for note in notes]
     
-    def _can_see_team_chat(self, player: Dict[str, Any], speaker_seat: int) -> bool:
+    def _can_see_team_chat(self, game_id: str, player: Dict[str, Any], speaker_seat: int) -> bool:
         """检查是否可以看到队内聊天"""
         
         player_alignment = player.get("alignment")
@@ -336,7 +221,7 @@ class AgentContextBuilder:
             return False
         
         # Get speaker's alignment from game state
-        game_state = self.state_machine.get_game(player["game_id"]) 
+        game_state = self.state_machine.get_game(game_id)
         if not game_state:
             return False
         
@@ -417,14 +302,14 @@ class AgentContextBuilder:
         elif role == "Guard":
             # Can guard anyone except self, and not same person twice in a row
             valid_targets = [s for s in game_state.get_alive_players() if s != seat]
-            last_guarded = self._get_last_guarded_target(seat)
+            last_guarded = self._get_last_guarded_target(game_id, seat)
             if last_guarded:
                 valid_targets = [s for s in valid_targets if s != last_guarded]
             constraints["guard_targets"] = valid_targets
         
         elif role == "Witch":
             # Track witch's potion usage - they can only use each potion once per game
-            has_save, has_poison = self._get_witch_potion_status(seat)
+            has_save, has_poison = self._get_witch_potion_status(game_id, seat)
             if has_save:
                 constraints["save_targets"] = game_state.get_alive_players()
             if has_poison:
@@ -23,10 +23,11 @@ class AgentToolsService:
         self.game_service = game_service
         self.context_builder = AgentContextBuilder(db, game_service.state_machine)
         
-    async def say(self, game_id: str, seat: int, text: str) -> ToolResult:
-        """发言工具"""
+    async def say(self, game_id: str, seat: int, text: str, finished: bool = False) -> ToolResult:
+        """发言工具，finished 表示本轮发言结束"""
         try:
-            # Validate context and permissions
+            # Validate context and permissions (rehydrates the game after a restart)
+            await self.game_service.load_game(game_id)
             context = self._get_and_validate_context(game_id, seat)
             if not self._is_action_allowed(context, "say"):
                 return ToolResult(
@@ -48,7 +49,7 @@ class AgentToolsService:
                 )
             
             # Submit through game service
-            result = await self.game_service.submit_speak(game_id, seat, text.strip())
+            result = await self.game_service.submit_speak(game_id, seat, text.strip(), finished)
             
             return ToolResult(
                 ok=True,
@@ -66,7 +67,8 @@ class AgentToolsService:
     async def vote(self, game_id: str, seat: int, target_seat: Optional[int]) -> ToolResult:
         """投票工具"""
         try:
-            # Validate context and permissions
+            # Validate context and permissions (rehydrates the game after a restart)
+            await self.game_service.load_game(game_id)
             context = self._get_and_validate_context(game_id, seat)
             if not self._is_action_allowed(context, "vote"):
                 return ToolResult(
@@ -108,7 +110,8 @@ class AgentToolsService:
     ) -> ToolResult:
         """夜间行动工具"""
         try:
-            # Validate context and permissions
+            # Validate context and permissions (rehydrates the game after a restart)
+            await self.game_service.load_game(game_id)
             context = self._get_and_validate_context(game_id, seat)
             action_name = f"night_action_{action}"
             
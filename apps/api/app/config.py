@@ -22,6 +22,35 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
     
+    # Event store: "json" or "msgpack-v1" for new events (existing rows keep their codec)
+    event_payload_codec: str = "json"
+    
+    # Cold storage for finished games
+    event_archive_dir: str = "./event_archive"
+    event_archive_segment_bytes: int = 64 * 1024 * 1024
+    
+    # Per-game ordered dispatch of events to async subscribers
+    event_dispatch_queue_size: int = 1000
+    event_dispatch_batch_size: int = 100
+    
+    # Per-game actors: commands waiting together are applied in one event batch
+    game_actor_batch_size: int = 32
+    
+    # Phase deadlines: timer wheel resolution in seconds
+    phase_timer_tick: float = 0.1
+    # Seconds a phase stays open after every required player has acted (0 advances at once)
+    phase_completion_grace: float = 1.0
+    # Workers lease the phase timers they fire and renew the lease every third of it
+    phase_timer_lease_seconds: int = 30
+    
+    # Transactional outbox relayed to NATS (game.<room_id>)
+    event_outbox_enabled: bool = False
+    event_outbox_batch_size: int = 100
+    event_outbox_poll_interval: float = 0.5
+    # A relay's claim on a batch; unpublished rows are claimable again after it lapses
+    event_outbox_claim_seconds: int = 30
+    nats_url: str = "nats://localhost:4222"
+    
     # WebSocket
     ws_max_rooms: int = 5000
     ws_max_conn_per_ip: int = 5
@@ -1,17 +1,30 @@
 """Database configuration and models"""
 
-from sqlalchemy import create_engine, Column, String, Integer, Boolean, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import create_engine, Column, String, Integer, BigInteger, Boolean, DateTime, Text, JSON, LargeBinary, ForeignKey, UniqueConstraint, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.dialects.postgresql import UUID
-from typing import Generator
+from typing import Generator, AsyncGenerator
 import uuid
 from datetime import datetime
 
 from app.config import settings
 
+
+def get_async_database_url(database_url: str) -> str:
+    """将同步数据库URL转换为异步驱动URL (asyncpg / aiosqlite)"""
+    if database_url.startswith(("postgresql://", "postgresql+psycopg2://")):
+        return "postgresql+asyncpg://" + database_url.split("://", 1)[1]
+    if database_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + database_url.split("://", 1)[1]
+    return database_url
+
+
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(get_async_database_url(settings.database_url))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
@@ -23,6 +36,11 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 # Database Models
 class User(Base):
     __tablename__ = "users"
@@ -83,6 +101,12 @@ class Game(Base):
     version = Column(Integer, default=1)
     current_phase = Column(String, default="Lobby")
     current_round = Column(Integer, default=0)
+    # Durable phase timer: deadline of the current phase and the worker lease to fire it
+    phase_deadline = Column(DateTime)
+    timer_owner = Column(String)
+    timer_lease_until = Column(DateTime)
+    
+    __table_args__ = (Index("idx_games_phase_deadline", "phase_deadline"),)
     
     # Relationships
     room = relationship("Room", back_populates="games")
@@ -109,6 +133,10 @@ class GamePlayer(Base):
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Optimistic concurrency for the hash chain: one event per (game, idx)
+        UniqueConstraint("game_id", "idx", name="uq_events_game_idx"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     game_id = Column(String, ForeignKey("games.id"), nullable=False)
@@ -116,7 +144,9 @@ class Event(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     type = Column(String, nullable=False)
     actor = Column(String)  # seat number or "system"
-    payload = Column(JSON)
+    payload = Column(JSON)  # NULL when the payload is stored in payload_bin
+    payload_codec = Column(String, nullable=False, default="json")  # see app.game.payload_codec
+    payload_bin = Column(LargeBinary)
     hash = Column(String, nullable=False)
     prev_hash = Column(String)
     
@@ -124,6 +154,149 @@ class Event(Base):
     game = relationship("Game", back_populates="events")
 
 
+class ChainCheckpoint(Base):
+    __tablename__ = "chain_checkpoints"
+    
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    idx = Column(Integer, nullable=False)  # last verified event idx
+    hash = Column(String, nullable=False)  # hash of that event
+    verified_at = Column(DateTime, default=datetime.utcnow)
+
+
+class MerkleCommitment(Base):
+    __tablename__ = "merkle_commitments"
+    
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    from_idx = Column(Integer, primary_key=True)  # first event idx of the segment
+    to_idx = Column(Integer, nullable=False)  # last event idx of the segment
+    round = Column(Integer)
+    phase = Column(String)
+    leaf_count = Column(Integer, nullable=False)
+    root = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class GameSnapshot(Base):
+    __tablename__ = "game_snapshots"
+    
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    idx = Column(Integer, primary_key=True)  # state after applying this event
+    phase = Column(String)
+    round = Column(Integer)
+    state = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OutboxMessage(Base):
+    __tablename__ = "event_outbox"
+    
+    # Written in the same transaction as the event; drained by app.game.outbox.OutboxRelay
+    id = Column(String, primary_key=True)  # event id, doubles as the dedup id on the bus
+    game_id = Column(String, nullable=False)
+    idx = Column(Integer, nullable=False)
+    type = Column(String, nullable=False)
+    message = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    published_at = Column(DateTime)
+    claimed_until = Column(DateTime)  # set while a relay is publishing the row
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    
+    # Partial index over pending rows only, as in infra/deploy/init_database.sql
+    __table_args__ = (
+        Index(
+            "idx_event_outbox_pending", "created_at",
+            postgresql_where=text("published_at IS NULL"),
+            sqlite_where=text("published_at IS NULL")
+        ),
+    )
+
+
+class ArchivedGame(Base):
+    __tablename__ = "archived_games"
+    
+    # Offset index into the cold-storage segment files (see app.game.archive)
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    segment = Column(String, nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    event_count = Column(Integer, nullable=False)
+    last_idx = Column(Integer, nullable=False)
+    last_hash = Column(String, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class GameSummary(Base):
+    __tablename__ = "game_summaries"
+    
+    # Maintained incrementally from PhaseChanged / GameEnded (see app.game.summaries)
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    total_events = Column(Integer, nullable=False, default=0)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    winner = Column(String)
+    rounds = Column(Integer, nullable=False, default=0)
+    current_phase = Column(String)
+    phases = Column(JSON, nullable=False, default=list)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (Index("idx_game_summaries_start_time", "start_time"),)
+
+
+# Read models projected from the event stream (see app.game.read_models)
+class ChatMessageRecord(Base):
+    __tablename__ = "chat_messages"
+    
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    seat = Column(Integer)
+    phase = Column(String)
+    visibility = Column(String, nullable=False, default="public")
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("idx_chat_messages_game_visibility", "game_id", "visibility", "idx"),)
+
+
+class NightActionRecord(Base):
+    __tablename__ = "night_actions"
+    
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    seat = Column(Integer, nullable=False)
+    role = Column(String)
+    action = Column(String, nullable=False)
+    target_seat = Column(Integer)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("idx_night_actions_game_seat_action", "game_id", "seat", "action", "idx"),)
+
+
+class DeathRecord(Base):
+    __tablename__ = "deaths"
+    
+    game_id = Column(String, ForeignKey("games.id"), primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    seat = Column(Integer, nullable=False)
+    cause = Column(String, nullable=False)  # voted / killed / poisoned
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("idx_deaths_game_seat", "game_id", "seat"),)
+
+
+class PrivateNoteRecord(Base):
+    __tablename__ = "private_notes"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    game_id = Column(String, ForeignKey("games.id"), nullable=False)
+    idx = Column(Integer, nullable=False)
+    seat = Column(Integer)  # NULL = visible to every seat
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (Index("idx_private_notes_game_seat", "game_id", "seat", "idx"),)
+
+
 class ActionRecord(Base):
     __tablename__ = "actions"
     
@@ -0,0 +1,164 @@
+"""Per-game actors - serialize every command that touches one game's state
+
+Each game has a mailbox drained by a single task. Commands (speak, vote,
+night action, phase advance, timer fired) run one at a time in arrival
+order, so awaits inside a command can no longer interleave with another
+command of the same game. Commands that are already waiting when the actor
+wakes up are applied together in one event batch - one transaction - and
+their callers are answered once that batch has committed. Each command runs
+in its own command scope (by default a nested batch, i.e. a savepoint): a
+command that fails leaves no writes or events in the batch, and the other
+commands still commit.
+
+A command may call other actor-routed methods of the same game; those run
+inline instead of being queued behind the running command.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncContextManager
+from dataclasses import dataclass
+import asyncio
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class GameCommand:
+    """邮箱中的命令"""
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+
+
+class GameActor:
+    """游戏 Actor - 单个任务按顺序处理一局游戏的命令邮箱，邮箱为空时任务退出"""
+
+    def __init__(
+        self,
+        game_id: str,
+        batch_factory: Callable[[str], AsyncContextManager],
+        batch_size: Optional[int] = None,
+        on_idle: Optional[Callable[["GameActor"], None]] = None,
+        command_factory: Optional[Callable[[str], AsyncContextManager]] = None
+    ):
+        self.game_id = game_id
+        self.batch_factory = batch_factory
+        self.command_factory = command_factory or batch_factory
+        self.batch_size = batch_size or settings.game_actor_batch_size
+        self.on_idle = on_idle
+        self.mailbox: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.processed = 0
+        self.batches = 0
+
+    def is_current(self) -> bool:
+        """当前代码是否运行在该 Actor 的任务中（用于重入）"""
+        return self._task is not None and self._task is asyncio.current_task()
+
+    def submit(self, name: str, run: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """投递命令，返回在命令所在批次提交后完成的 Future"""
+        future = asyncio.get_running_loop().create_future()
+        self.mailbox.put_nowait(GameCommand(name, run, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+        return future
+
+    async def _drain(self):
+        """批量处理邮箱，排空后退出"""
+        while True:
+            commands = [self.mailbox.get_nowait()]
+            while len(commands) < self.batch_size and not self.mailbox.empty():
+                commands.append(self.mailbox.get_nowait())
+
+            try:
+                await self._apply(commands)
+            finally:
+                for command in commands:
+                    if not command.future.done():
+                        command.future.cancel()
+
+            if self.mailbox.empty():
+                # No await between the check and returning, so no command can slip in unseen
+                if self.on_idle:
+                    self.on_idle(self)
+                return
+
+    async def _apply(self, commands: List[GameCommand]):
+        """在一个事件批次中依次执行命令，提交成功后再答复调用方
+
+        失败的命令在自己的作用域内回滚，不影响同批其他命令提交。
+        """
+        outcomes = []
+        try:
+            async with self.batch_factory(self.game_id):
+                for command in commands:
+                    try:
+                        async with self.command_factory(self.game_id):
+                            result = await command.run()
+                        outcomes.append((command, result, None))
+                    except Exception as e:
+                        outcomes.append((command, None, e))
+        except Exception as e:
+            logger.error(f"Failed to commit {len(commands)} commands of game {self.game_id}: {e}")
+            for command in commands:
+                if not command.future.done():
+                    command.future.set_exception(e)
+            return
+
+        self.processed += len(commands)
+        self.batches += 1
+        for command, result, error in outcomes:
+            if command.future.done():
+                continue
+            if error is not None:
+                command.future.set_exception(error)
+            else:
+                command.future.set_result(result)
+
+
+class GameActorPool:
+    """按 game_id 管理 Actor，空闲的 Actor 自动移除"""
+
+    def __init__(
+        self,
+        batch_factory: Callable[[str], AsyncContextManager],
+        batch_size: Optional[int] = None,
+        command_factory: Optional[Callable[[str], AsyncContextManager]] = None
+    ):
+        self.batch_factory = batch_factory
+        self.batch_size = batch_size
+        self.command_factory = command_factory
+        self._actors: Dict[str, GameActor] = {}
+        # Counters of actors that went idle
+        self._processed = 0
+        self._batches = 0
+
+    async def run(self, game_id: str, name: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """在游戏的 Actor 中执行命令；已在该 Actor 中时直接执行"""
+        actor = self._actors.get(game_id)
+        if actor is not None and actor.is_current():
+            return await run()
+        if actor is None:
+            actor = GameActor(
+                game_id, self.batch_factory, self.batch_size,
+                on_idle=self._remove, command_factory=self.command_factory
+            )
+            self._actors[game_id] = actor
+        return await actor.submit(name, run)
+
+    def _remove(self, actor: GameActor):
+        if self._actors.get(actor.game_id) is actor:
+            del self._actors[actor.game_id]
+        self._processed += actor.processed
+        self._batches += actor.batches
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取 Actor 指标"""
+        return {
+            "active_actors": len(self._actors),
+            "mailbox_depth": sum(actor.mailbox.qsize() for actor in self._actors.values()),
+            "commands_processed": self._processed + sum(actor.processed for actor in self._actors.values()),
+            "command_batches": self._batches + sum(actor.batches for actor in self._actors.values())
+        }
@@ -0,0 +1,265 @@
+"""Cold storage for finished games - compressed, append-only segment files
+
+Once a game has ended its events are packed into one compressed block and
+appended to the current segment file; the ``archived_games`` table is the
+per-game offset index (segment, offset, length). The hot ``events`` table
+then only holds rows of live games.
+
+Block layout::
+
+    magic "CWEA" | format version (1 byte) | body length (4 bytes) | crc32 (4 bytes) | body
+
+The body is zlib-compressed msgpack holding the full event rows, including
+hashes, so archived chains verify exactly like hot ones. Segments are read
+through memory maps; a block is decoded only when its game is requested.
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime
+from contextlib import closing
+import argparse
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import msgpack
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Game, Event as EventModel, ChainCheckpoint, ArchivedGame
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b"CWEA"
+ARCHIVE_FORMAT_VERSION = 1
+_BLOCK_HEADER = struct.Struct(">4sBII")
+
+
+@dataclass
+class ArchivedEvent:
+    """从段文件读出的事件，字段与 events 表一致"""
+    id: str
+    game_id: str
+    idx: int
+    timestamp: datetime
+    type: str
+    actor: Optional[str]
+    payload: Optional[Dict[str, Any]]
+    payload_codec: str
+    payload_bin: Optional[bytes]
+    hash: str
+    prev_hash: Optional[str]
+
+
+def encode_block(events) -> bytes:
+    """将按 idx 排序的事件打包成压缩块"""
+    records = [
+        [
+            event.id, event.idx, event.timestamp.isoformat(), event.type, event.actor,
+            event.payload_codec or "json", event.payload, event.payload_bin, event.hash, event.prev_hash
+        ]
+        for event in events
+    ]
+    body = zlib.compress(msgpack.packb(records, use_bin_type=True))
+    return _BLOCK_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_FORMAT_VERSION, len(body), zlib.crc32(body)) + body
+
+
+def decode_block(game_id: str, block: bytes) -> List[ArchivedEvent]:
+    """解码压缩块，校验头部与 CRC"""
+    magic, version, length, crc = _BLOCK_HEADER.unpack_from(block)
+    if magic != ARCHIVE_MAGIC or version != ARCHIVE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported archive block for game {game_id}")
+
+    body = block[_BLOCK_HEADER.size:_BLOCK_HEADER.size + length]
+    if len(body) != length or zlib.crc32(body) != crc:
+        raise ValueError(f"Corrupted archive block for game {game_id}")
+
+    return [
+        ArchivedEvent(
+            id=record[0],
+            game_id=game_id,
+            idx=record[1],
+            timestamp=datetime.fromisoformat(record[2]),
+            type=record[3],
+            actor=record[4],
+            payload_codec=record[5],
+            payload=record[6],
+            payload_bin=record[7],
+            hash=record[8],
+            prev_hash=record[9]
+        )
+        for record in msgpack.unpackb(zlib.decompress(body), raw=False)
+    ]
+
+
+class SegmentStore:
+    """段文件存储 - 追加写入，通过内存映射读取"""
+
+    def __init__(self, directory: str, max_segment_bytes: int):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self._maps: Dict[str, Tuple[Any, mmap.mmap]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _segment_names(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".seg"))
+
+    def _current_segment(self, incoming: int) -> str:
+        """获取可写入的段，当前段写满后滚动到新段"""
+        names = self._segment_names()
+        if names:
+            current = names[-1]
+            size = os.path.getsize(os.path.join(self.directory, current))
+            if size == 0 or size + incoming <= self.max_segment_bytes:
+                return current
+            number = int(current.split("-")[1].split(".")[0]) + 1
+        else:
+            number = 1
+        return f"segment-{number:06d}.seg"
+
+    def append(self, block: bytes) -> Tuple[str, int, int]:
+        """追加一个块并落盘，返回 (segment, offset, length)"""
+        with self._lock:
+            segment = self._current_segment(len(block))
+            with open(os.path.join(self.directory, segment), "ab") as f:
+                offset = f.tell()
+                f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+        return segment, offset, len(block)
+
+    def read(self, segment: str, offset: int, length: int) -> bytes:
+        """通过内存映射读取块；段在映射之后增长时重新映射"""
+        with self._lock:
+            cached = self._maps.get(segment)
+            if cached is None or offset + length > len(cached[1]):
+                if cached is not None:
+                    cached[1].close()
+                    cached[0].close()
+                f = open(os.path.join(self.directory, segment), "rb")
+                cached = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                self._maps[segment] = cached
+            return cached[1][offset:offset + length]
+
+    def close(self):
+        """关闭所有内存映射"""
+        with self._lock:
+            for f, mapped in self._maps.values():
+                mapped.close()
+                f.close()
+            self._maps.clear()
+
+
+_segment_stores: Dict[str, SegmentStore] = {}
+
+
+def get_segment_store(directory: Optional[str] = None) -> SegmentStore:
+    """获取目录对应的段存储（进程内共享）"""
+    directory = directory or settings.event_archive_dir
+    store = _segment_stores.get(directory)
+    if store is None:
+        store = SegmentStore(directory, settings.event_archive_segment_bytes)
+        _segment_stores[directory] = store
+    return store
+
+
+def read_archived_events(entry: ArchivedGame) -> List[ArchivedEvent]:
+    """按偏移索引读取并解码已归档游戏的事件"""
+    block = get_segment_store().read(entry.segment, entry.offset, entry.length)
+    return decode_block(entry.game_id, block)
+
+
+def load_archived_events(db: Session, game_id: str) -> Optional[List[ArchivedEvent]]:
+    """读取已归档游戏的全部事件，未归档时返回 None"""
+    entry = db.get(ArchivedGame, game_id)
+    return read_archived_events(entry) if entry is not None else None
+
+
+class EventArchiver:
+    """归档器 - 将已结束游戏的事件移出热表"""
+
+    def __init__(self, db: Session, segments: Optional[SegmentStore] = None):
+        self.db = db
+        self.segments = segments or get_segment_store()
+
+    def archive_game(self, game_id: str) -> ArchivedGame:
+        """归档单个已结束的游戏：校验、写段、登记偏移、删除热表事件"""
+        from app.game.event_sourcing import EventStore, chain_heads, _verify_events
+
+        game = self.db.get(Game, game_id)
+        if not game or game.ended_at is None:
+            raise ValueError("Only finished games can be archived")
+        if self.db.get(ArchivedGame, game_id):
+            raise ValueError("Game is already archived")
+
+        event_store = EventStore(self.db)
+        if event_store.get_latest_event(game_id) is None:
+            raise ValueError(f"Game {game_id} has no events to archive")
+        if not event_store.verify_chain_integrity(game_id, full=True):
+            raise ValueError(f"Hash chain of game {game_id} is broken, refusing to archive")
+
+        with closing(event_store.iter_events(game_id)) as events:
+            block = encode_block(events)
+
+        # Read the block back through the segment store before the hot rows go away
+        segment, offset, length = self.segments.append(block)
+        archived = decode_block(game_id, self.segments.read(segment, offset, length))
+        head = _verify_events(game_id, archived)
+        if head is None:
+            raise ValueError(f"Archived block of game {game_id} failed verification")
+
+        entry = ArchivedGame(
+            game_id=game_id,
+            segment=segment,
+            offset=offset,
+            length=length,
+            event_count=len(archived),
+            last_idx=head[0],
+            last_hash=head[1]
+        )
+        self.db.add(entry)
+        self.db.query(EventModel).filter(EventModel.game_id == game_id).delete(synchronize_session=False)
+        self.db.query(ChainCheckpoint).filter(ChainCheckpoint.game_id == game_id).delete(synchronize_session=False)
+        self.db.commit()
+        chain_heads.invalidate(game_id)
+
+        logger.info(f"Archived {len(archived)} events of game {game_id} to {segment}@{offset} ({length} bytes)")
+        return entry
+
+    def archive_ended_games(self, limit: Optional[int] = None) -> List[str]:
+        """归档所有已结束但尚未归档的游戏"""
+        query = select(Game.id).where(
+            Game.ended_at.is_not(None),
+            Game.id.not_in(select(ArchivedGame.game_id))
+        ).order_by(Game.ended_at)
+        if limit:
+            query = query.limit(limit)
+
+        archived = []
+        for game_id in self.db.execute(query).scalars().all():
+            try:
+                self.archive_game(game_id)
+                archived.append(game_id)
+            except Exception as e:
+                self.db.rollback()
+                logger.error(f"Failed to archive game {game_id}: {e}")
+        return archived
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Move events of finished games to cold storage")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum number of games to archive")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    with SessionLocal() as db:
+        archived_ids = EventArchiver(db).archive_ended_games(limit=args.limit)
+    logger.info(f"Archived {len(archived_ids)} games")
@@ -0,0 +1,98 @@
+"""Bulk hash-chain audit - verifies many games in parallel across a process pool
+
+Games still in the hot ``events`` table are verified incrementally from their
+checkpoint; archived games are verified against their segment files.
+"""
+
+from typing import Dict, List, Optional, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import argparse
+import logging
+
+from sqlalchemy import create_engine, select, union
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Event as EventModel, ArchivedGame
+from app.game.event_sourcing import EventStore
+
+logger = logging.getLogger(__name__)
+
+# One engine per worker process, created lazily on first use
+_worker_engines: Dict[str, object] = {}
+
+
+def _get_worker_engine(database_url: str):
+    """获取当前进程的数据库引擎"""
+    engine = _worker_engines.get(database_url)
+    if engine is None:
+        engine = create_engine(database_url)
+        _worker_engines[database_url] = engine
+    return engine
+
+
+def _verify_game(database_url: str, game_id: str, full: bool) -> tuple[str, bool]:
+    """在工作进程中校验单个游戏"""
+    with Session(_get_worker_engine(database_url)) as db:
+        try:
+            return game_id, EventStore(db).verify_chain_integrity(game_id, full=full)
+        except Exception as e:
+            logger.error(f"Error verifying game {game_id}: {e}")
+            return game_id, False
+
+
+def list_game_ids(database_url: str) -> List[str]:
+    """列出所有有事件的游戏ID（包括已归档的游戏）"""
+    with Session(_get_worker_engine(database_url)) as db:
+        result = db.execute(
+            union(select(EventModel.game_id), select(ArchivedGame.game_id))
+            .execution_options(stream_results=True, yield_per=1000)
+        )
+        return [row[0] for row in result]
+
+
+def verify_all_games(
+    database_url: Optional[str] = None,
+    game_ids: Optional[Iterable[str]] = None,
+    max_workers: Optional[int] = None,
+    full: bool = False,
+    chunksize: int = 8
+) -> Dict[str, bool]:
+    """并行校验所有游戏的事件链，返回 game_id -> 是否完整
+
+    每个游戏从其检查点开始增量校验（full=True 时从头校验），
+    事件通过服务端游标流式读取。
+    """
+    database_url = database_url or settings.database_url
+    if game_ids is None:
+        game_ids = list_game_ids(database_url)
+
+    game_ids = list(game_ids)
+    if not game_ids:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = dict(pool.map(
+            partial(_verify_game, database_url, full=full),
+            game_ids,
+            chunksize=chunksize
+        ))
+
+    failed = [game_id for game_id, ok in results.items() if not ok]
+    logger.info(f"Verified {len(results)} games, {len(failed)} failed")
+    if failed:
+        logger.error(f"Hash chain verification failed for games: {failed}")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify event hash chains of all games")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--full", action="store_true", help="Ignore checkpoints and verify from idx 0")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    results = verify_all_games(max_workers=args.workers, full=args.full)
+    raise SystemExit(0 if all(results.values()) else 1)
@@ -1,18 +1,127 @@
 """Event sourcing system for game replay and audit"""
 
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Type, Tuple, Iterator, Union
 from datetime import datetime
 from dataclasses import dataclass, asdict
-import json
+import asyncio
 import hashlib
+import inspect
 import logging
+import threading
+import uuid
 from abc import ABC, abstractmethod
+from contextlib import contextmanager, asynccontextmanager, closing
+from contextvars import ContextVar
 
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import Session
-from app.database import Event as EventModel
+from app.config import settings
+from app.database import (
+    Event as EventModel, ChainCheckpoint, MerkleCommitment, GameSnapshot, NightActionRecord, ArchivedGame,
+    OutboxMessage
+)
+from app.game.state_machine import GameState
+from app.game.projection import rebuild_state
+from app.game.read_models import READ_MODELS, read_model_projector, needs_inspectors
+from app.game.payload_codec import PAYLOAD_CODECS, encode_payload, event_payload, hash_material
+from app.game.archive import load_archived_events, read_archived_events
+from app.game.outbox import outbox_rows
+from app.game.summaries import (
+    new_summary, fold_summary, summary_to_dict, summary_values, summary_select, summary_statement, needs_fold
+)
+from app.game.merkle import (
+    SEGMENT_OPEN_TYPE, SEGMENT_CLOSE_TYPE, seal_segments, inclusion_proof, merkle_root
+)
 
 logger = logging.getLogger(__name__)
 
+# Maximum attempts to append when another writer advanced the chain concurrently
+MAX_APPEND_RETRIES = 5
+
+# Unique constraint whose violation means another writer advanced the chain
+CHAIN_CONSTRAINT = "uq_events_game_idx"
+
+# Events fetched per keyset page when streaming a replay
+REPLAY_PAGE_SIZE = 500
+
+
+def compute_event_hash(
+    prev_hash: Optional[str],
+    event_type: str,
+    payload: Union[str, bytes],
+    idx: int,
+    timestamp: datetime
+) -> str:
+    """计算事件链哈希 - payload 为 JSON 文本或二进制编码后的字节"""
+    if isinstance(payload, str):
+        payload = payload.encode()
+    hash_input = f"{prev_hash or ''}{event_type}".encode() + payload + f"{idx}{timestamp.isoformat()}".encode()
+    return hashlib.sha256(hash_input).hexdigest()
+
+
+class ChainHeadCache:
+    """进程内事件链头缓存 - game_id -> (last_idx, last_hash)
+
+    链头只在首次访问或检测到 (game_id, idx) 唯一约束冲突时从数据库加载，
+    之后每次追加成功都在内存中推进。
+    """
+    
+    def __init__(self):
+        self._heads: Dict[str, Tuple[int, Optional[str]]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, game_id: str) -> Optional[Tuple[int, Optional[str]]]:
+        """获取缓存的链头，未缓存时返回 None"""
+        return self._heads.get(game_id)
+    
+    def set(self, game_id: str, last_idx: int, last_hash: Optional[str]):
+        """设置链头"""
+        with self._lock:
+            self._heads[game_id] = (last_idx, last_hash)
+    
+    def advance(self, game_id: str, prev_idx: int, last_idx: int, last_hash: str):
+        """推进链头 - 仅当缓存仍指向 prev_idx 时生效"""
+        with self._lock:
+            head = self._heads.get(game_id)
+            if head is None or head[0] == prev_idx:
+                self._heads[game_id] = (last_idx, last_hash)
+    
+    def invalidate(self, game_id: str):
+        """使链头失效，下次追加时从数据库重新加载"""
+        with self._lock:
+            self._heads.pop(game_id, None)
+    
+    def clear(self):
+        """清空所有链头"""
+        with self._lock:
+            self._heads.clear()
+
+
+# Process-wide chain heads shared by every EventStore instance
+chain_heads = ChainHeadCache()
+
+
+def _is_chain_conflict(exc: IntegrityError) -> bool:
+    """是否为 (game_id, idx) 唯一约束冲突（其他完整性错误不应重试）"""
+    orig = exc.orig
+    diag = getattr(orig, "diag", None)
+    constraint = getattr(orig, "constraint_name", None) or getattr(diag, "constraint_name", None)
+    if constraint is not None:
+        return constraint == CHAIN_CONSTRAINT
+    # SQLite only reports the columns of the violated constraint
+    message = str(orig)
+    return CHAIN_CONSTRAINT in message or "events.game_id, events.idx" in message
+
+
+def _advance_chain_head(game_id: str, last_idx: int, rows: List[Dict[str, Any]]):
+    """推进缓存的链头；游戏结束后不再追加，直接移出缓存"""
+    if any(row["type"] == "GameEnded" for row in rows):
+        chain_heads.invalidate(game_id)
+    else:
+        chain_heads.advance(game_id, last_idx, rows[-1]["idx"], rows[-1]["hash"])
+
 @dataclass
 class BaseEvent(ABC):
     """基础事件类"""
@@ -99,6 +208,7 @@ class SpeakEvent(BaseEvent):
     content: str
     phase: str
     visibility: str = "public"  # public/team/private
+    finished: bool = False  # speaker is done for this day
     
     def get_event_type(self) -> str:
         return "Speak"
@@ -166,49 +276,317 @@ class AgentDecisionProducedEvent(BaseEvent):
     def get_event_type(self) -> str:
         return "AgentDecisionProduced"
 
+def _resolve_codec(codec: Optional[str]) -> str:
+    """确定新事件使用的载荷编码（默认取配置）"""
+    codec = codec or settings.event_payload_codec
+    if codec not in PAYLOAD_CODECS:
+        raise ValueError(f"Unknown payload codec: {codec}")
+    return codec
+
+
+def _prepare_events(events: List[BaseEvent], codec: str) -> Tuple[str, List[Tuple[BaseEvent, str, Dict[str, Any], Dict[str, Any]]]]:
+    """校验批次并编码载荷（每个载荷只编码一次） - 重试时只需重新计算 idx 和哈希"""
+    game_id = events[0].game_id
+    if any(event.game_id != game_id for event in events):
+        raise ValueError("All events in a batch must belong to the same game")
+    
+    prepared = []
+    for event in events:
+        payload = event.to_payload()
+        _, payload_bin, material = encode_payload(payload, codec)
+        prepared.append((event, event.get_event_type(), payload, {
+            "payload_codec": codec,
+            "payload_bin": payload_bin,
+            "material": material
+        }))
+    return game_id, prepared
+
+
+def _build_event_rows(
+    game_id: str,
+    prepared: List[Tuple[BaseEvent, str, Dict[str, Any], Dict[str, Any]]],
+    event_ids: List[str],
+    last_idx: int,
+    last_hash: Optional[str]
+) -> List[Dict[str, Any]]:
+    """从链头开始在内存中延伸哈希链，生成待插入的事件行"""
+    rows = []
+    prev_hash = last_hash
+    for offset, (event, event_type, payload, encoded) in enumerate(prepared):
+        idx = last_idx + 1 + offset
+        event_hash = compute_event_hash(prev_hash, event_type, encoded["material"], idx, event.timestamp)
+        rows.append({
+            "id": event_ids[offset],
+            "game_id": game_id,
+            "idx": idx,
+            "timestamp": event.timestamp,
+            "type": event_type,
+            "actor": event.actor,
+            "payload": payload,
+            "payload_codec": encoded["payload_codec"],
+            "payload_bin": encoded["payload_bin"],
+            "hash": event_hash,
+            "prev_hash": prev_hash
+        })
+        prev_hash = event_hash
+    return rows
+
+
+def _storage_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """生成写入数据库的行 - 二进制编码的事件不再重复存储 JSON 载荷"""
+    return [{**row, "payload": None} if row["payload_bin"] is not None else row for row in rows]
+
+
+def _has_segment_boundary(rows: List[Dict[str, Any]]) -> bool:
+    """批次中是否包含阶段边界事件"""
+    return any(row["type"] in (SEGMENT_OPEN_TYPE, SEGMENT_CLOSE_TYPE) for row in rows)
+
+
+def _build_commitment_rows(game_id: str, earlier, rows: List[Dict[str, Any]], last_sealed_idx: int) -> List[Dict[str, Any]]:
+    """合并已存储和新写入的事件，生成 Merkle 承诺行"""
+    events = [(event.idx, event.hash, event.type, event_payload(event)) for event in earlier]
+    events.extend((row["idx"], row["hash"], row["type"], row["payload"]) for row in rows)
+    return [{"game_id": game_id, **commitment} for commitment in seal_segments(events, last_sealed_idx)]
+
+
+def _build_snapshot_row(game_id: str, rows: List[Dict[str, Any]], snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    """快照对应批次中最后一个事件之后的状态"""
+    return {
+        "game_id": game_id,
+        "idx": rows[-1]["idx"],
+        "phase": snapshot.get("current_phase"),
+        "round": snapshot.get("current_round"),
+        "state": snapshot
+    }
+
+
+def _verify_events(
+    game_id: str,
+    events,
+    prev_hash: Optional[str] = None,
+    last_idx: int = -1
+) -> Optional[Tuple[int, Optional[str]]]:
+    """校验按 idx 排序的事件哈希链，成功返回最后的 (idx, hash)，失败返回 None"""
+    for event in events:
+        # Recalculate hash
+        calculated_hash = compute_event_hash(prev_hash, event.type, hash_material(event), event.idx, event.timestamp)
+        
+        if calculated_hash != event.hash:
+            logger.error(f"Hash mismatch at event {event.idx} in game {game_id}")
+            return None
+            
+        if event.prev_hash != prev_hash:
+            logger.error(f"Chain break at event {event.idx} in game {game_id}")
+            return None
+        
+        prev_hash = event.hash
+        last_idx = event.idx
+    
+    return last_idx, prev_hash
+
+
+def _filter_archived(events, from_idx: int = 0, to_idx: Optional[int] = None, limit: Optional[int] = None) -> List[Any]:
+    """按 idx 区间筛选已归档事件"""
+    selected = [e for e in events if e.idx >= from_idx and (to_idx is None or e.idx <= to_idx)]
+    return selected[:limit] if limit else selected
+
+
+def _event_to_replay_dict(event: Any) -> Dict[str, Any]:
+    """将事件记录（或同名列的行）转换为回放数据"""
+    return {
+        "idx": event.idx,
+        "timestamp": event.timestamp.isoformat(),
+        "type": event.type,
+        "actor": event.actor,
+        "payload": event_payload(event)
+    }
+
+
+def _summarize_events(game_id: str, events: List[EventModel]) -> Dict[str, Any]:
+    """根据事件列表计算游戏摘要（摘要表缺失时的回退路径）"""
+    return summary_to_dict(fold_summary(new_summary(game_id), (
+        (event.idx, event.type, event.timestamp, event_payload(event)) for event in events
+    )))
+
+
 class EventStore:
     """事件存储"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, codec: Optional[str] = None, outbox: Optional[bool] = None):
         self.db = db
+        self.codec = _resolve_codec(codec)
+        self.outbox = settings.event_outbox_enabled if outbox is None else outbox
         
     def append_event(self, event: BaseEvent) -> str:
         """追加事件到存储"""
+        return self.append_events([event])[0]
+    
+    def append_events(
+        self,
+        events: List[BaseEvent],
+        event_ids: Optional[List[str]] = None,
+        snapshot: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """批量追加同一游戏的事件 - 在内存中延伸哈希链，一次 INSERT、一次提交"""
+        if not events:
+            return []
         
-        # Get last event to calculate hash chain
-        last_event = self.db.query(EventModel).filter(
-            EventModel.game_id == event.game_id
-        ).order_by(EventModel.idx.desc()).first()
+        game_id, prepared = _prepare_events(events, self.codec)
+        if event_ids is None:
+            event_ids = [str(uuid.uuid4()) for _ in events]
         
-        # Calculate next index
-        next_idx = (last_event.idx + 1) if last_event else 0
+        for attempt in range(MAX_APPEND_RETRIES):
+            last_idx, last_hash = self._get_chain_head(game_id)
+            rows = _build_event_rows(game_id, prepared, event_ids, last_idx, last_hash)
+            
+            try:
+                # The (game_id, idx) unique constraint detects concurrent writers
+                with self.db.begin_nested():
+                    self.db.execute(insert(EventModel), _storage_rows(rows))
+                    self._project_read_models(game_id, rows)
+                    self._update_summary(game_id, rows)
+                    if self.outbox:
+                        self.db.execute(insert(OutboxMessage), outbox_rows(rows))
+                    if _has_segment_boundary(rows):
+                        self._seal_merkle_segments(game_id, rows)
+                    if snapshot is not None:
+                        self.db.execute(insert(GameSnapshot), [_build_snapshot_row(game_id, rows, snapshot)])
+                self.db.commit()
+            except IntegrityError as e:
+                if not _is_chain_conflict(e):
+                    raise
+                logger.warning(
+                    f"Chain head conflict at idx={last_idx + 1} in game {game_id}, "
+                    f"reloading (attempt {attempt + 1})"
+                )
+                chain_heads.invalidate(game_id)
+                continue
+            
+            _advance_chain_head(game_id, last_idx, rows)
+            
+            for row in rows:
+                logger.info(f"Appended event {row['type']} (idx={row['idx']}) to game {game_id}")
+            
+            return event_ids
         
-        # Calculate hash
-        payload = event.to_payload()
-        payload_json = json.dumps(payload, sort_keys=True)
-        
-        hash_input = f"{last_event.hash if last_event else ''}{event.get_event_type()}{payload_json}{next_idx}{event.timestamp.isoformat()}"
-        event_hash = hashlib.sha256(hash_input.encode()).hexdigest()
-        
-        # Create event record
-        event_record = EventModel(
-            game_id=event.game_id,
-            idx=next_idx,
-            timestamp=event.timestamp,
-            type=event.get_event_type(),
-            actor=event.actor,
-            payload=payload,
-            hash=event_hash,
-            prev_hash=last_event.hash if last_event else None
-        )
+        raise RuntimeError(f"Failed to append events to game {game_id}: chain head contention")
+    
+    def _project_read_models(self, game_id: str, rows: List[Dict[str, Any]], inspectors: Optional[Dict[int, int]] = None):
+        """将事件投影到读模型表（与事件同一事务）"""
+        if inspectors is None and needs_inspectors(rows):
+            inspectors = dict(self.db.execute(
+                select(NightActionRecord.target_seat, NightActionRecord.seat).where(
+                    NightActionRecord.game_id == game_id,
+                    NightActionRecord.action == "inspect"
+                ).order_by(NightActionRecord.idx)
+            ).all())
+        
+        for model, model_rows in read_model_projector.project(rows, inspectors).items():
+            self.db.execute(insert(model), model_rows)
+    
+    def _update_summary(self, game_id: str, rows: List[Dict[str, Any]]):
+        """维护游戏摘要（与事件同一事务）"""
+        current = self.db.execute(summary_select(game_id)).mappings().first() if needs_fold(rows) else None
+        statement = summary_statement(game_id, rows, current)
+        if statement is not None:
+            self.db.execute(statement)
+    
+    def get_summary(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """读取已维护的游戏摘要"""
+        row = self.db.execute(summary_select(game_id)).mappings().first()
+        return summary_to_dict(summary_values(row)) if row else None
+    
+    def rebuild_read_models(self, game_id: str, batch_size: int = 500) -> int:
+        """从事件日志重建某个游戏的读模型，返回处理的事件数"""
+        for model in READ_MODELS:
+            self.db.query(model).filter(model.game_id == game_id).delete(synchronize_session=False)
+        
+        count, inspectors, chunk = 0, {}, []
+        with closing(self.iter_events(game_id, batch_size=batch_size)) as events:
+            for event in events:
+                chunk.append({
+                    "game_id": game_id,
+                    "idx": event.idx,
+                    "timestamp": event.timestamp,
+                    "type": event.type,
+                    "payload": event_payload(event)
+                })
+                if len(chunk) >= batch_size:
+                    self._project_read_models(game_id, chunk, inspectors)
+                    count += len(chunk)
+                    chunk = []
+        if chunk:
+            self._project_read_models(game_id, chunk, inspectors)
+            count += len(chunk)
         
-        self.db.add(event_record)
         self.db.commit()
-        self.db.refresh(event_record)
+        logger.info(f"Rebuilt read models for game {game_id} from {count} events")
+        return count
+    
+    def _seal_merkle_segments(self, game_id: str, rows: List[Dict[str, Any]]):
+        """在阶段边界封存事件段的 Merkle 根（与事件同一事务）"""
+        last_sealed_idx = self.db.query(func.max(MerkleCommitment.to_idx)).filter(
+            MerkleCommitment.game_id == game_id
+        ).scalar()
+        last_sealed_idx = -1 if last_sealed_idx is None else last_sealed_idx
         
-        logger.info(f"Appended event {event.get_event_type()} (idx={next_idx}) to game {event.game_id}")
+        earlier = self.db.query(EventModel.idx, EventModel.hash, EventModel.type, EventModel.payload,
+            EventModel.payload_codec, EventModel.payload_bin
+        ).filter(
+            EventModel.game_id == game_id,
+            EventModel.idx > last_sealed_idx,
+            EventModel.idx < rows[0]["idx"]
+        ).order_by(EventModel.idx).all()
         
-        return event_record.id
+        commitments = _build_commitment_rows(game_id, earlier, rows, last_sealed_idx)
+        if commitments:
+            self.db.execute(insert(MerkleCommitment), commitments)
+    
+    def get_inclusion_proof(self, game_id: str, idx: int) -> Optional[Dict[str, Any]]:
+        """获取事件的 Merkle 包含证明，事件所在阶段尚未封存时返回 None"""
+        commitment = self.db.query(MerkleCommitment).filter(
+            MerkleCommitment.game_id == game_id,
+            MerkleCommitment.from_idx <= idx,
+            MerkleCommitment.to_idx >= idx
+        ).first()
+        if not commitment:
+            return None
+        
+        segment = self.get_events(game_id, from_idx=commitment.from_idx, to_idx=commitment.to_idx)
+        hashes = [event.hash for event in segment]
+        if merkle_root(hashes) != commitment.root:
+            logger.error(f"Merkle root mismatch for segment {commitment.from_idx}-{commitment.to_idx} in game {game_id}")
+            return None
+        
+        event = segment[idx - commitment.from_idx]
+        return {
+            "game_id": game_id,
+            "event": {**_event_to_replay_dict(event), "hash": event.hash, "prev_hash": event.prev_hash},
+            "segment": {
+                "from_idx": commitment.from_idx,
+                "to_idx": commitment.to_idx,
+                "phase": commitment.phase,
+                "round": commitment.round,
+                "leaf_count": commitment.leaf_count
+            },
+            "root": commitment.root,
+            "proof": inclusion_proof(hashes, idx - commitment.from_idx)
+        }
+    
+    def _get_chain_head(self, game_id: str) -> Tuple[int, Optional[str]]:
+        """获取链头 (last_idx, last_hash)，未缓存时从数据库加载"""
+        head = chain_heads.get(game_id)
+        if head is not None:
+            return head
+        
+        last_event = self.get_latest_event(game_id)
+        if last_event:
+            head = (last_event.idx, last_event.hash)
+        else:
+            head = (-1, None)
+        
+        chain_heads.set(game_id, *head)
+        return head
     
     def get_events(
         self, 
@@ -232,7 +610,13 @@ class EventStore:
         if limit:
             query = query.limit(limit)
         
-        return query.all()
+        events = query.all()
+        if not events:
+            # Finished games may have been moved to cold storage
+            archived = load_archived_events(self.db, game_id)
+            if archived is not None:
+                return _filter_archived(archived, from_idx, to_idx, limit)
+        return events
     
     def get_latest_event(self, game_id: str) -> Optional[EventModel]:
         """获取最新事件"""
@@ -240,52 +624,349 @@ class EventStore:
             EventModel.game_id == game_id
         ).order_by(EventModel.idx.desc()).first()
     
-    def verify_chain_integrity(self, game_id: str) -> bool:
-        """验证事件链完整性"""
-        events = self.get_events(game_id)
-        
-        prev_hash = None
-        for event in events:
-            # Recalculate hash
-            payload_json = json.dumps(event.payload, sort_keys=True)
-            hash_input = f"{prev_hash or ''}{event.type}{payload_json}{event.idx}{event.timestamp.isoformat()}"
-            calculated_hash = hashlib.sha256(hash_input.encode()).hexdigest()
+    def get_latest_snapshot(self, game_id: str, to_idx: Optional[int] = None) -> Optional[GameSnapshot]:
+        """获取 to_idx 及之前的最新快照"""
+        query = self.db.query(GameSnapshot).filter(GameSnapshot.game_id == game_id)
+        if to_idx is not None:
+            query = query.filter(GameSnapshot.idx <= to_idx)
+        return query.order_by(GameSnapshot.idx.desc()).first()
+    
+    def load_game_state(self, game_id: str, to_idx: Optional[int] = None) -> Optional[GameState]:
+        """重建游戏状态 - 恢复最近的快照后只应用其后的尾部事件"""
+        snapshot = self.get_latest_snapshot(game_id, to_idx)
+        from_idx = snapshot.idx + 1 if snapshot else 0
+        
+        tail = self.get_events(game_id, from_idx=from_idx, to_idx=to_idx)
+        
+        if snapshot is None and not tail:
+            return None
+        return rebuild_state(game_id, snapshot.state if snapshot else None, tail)
+    
+    def iter_events(self, game_id: str, from_idx: int = 0, batch_size: int = 500) -> Iterator[EventModel]:
+        """流式读取事件 - 服务端游标，内存占用与游戏长度无关"""
+        result = self.db.execute(
+            select(EventModel).where(
+                EventModel.game_id == game_id,
+                EventModel.idx >= from_idx
+            ).order_by(EventModel.idx).execution_options(stream_results=True, yield_per=batch_size)
+        )
+        found = False
+        try:
+            for event in result.scalars():
+                found = True
+                yield event
+        finally:
+            # Release the server-side cursor even when the caller stops early
+            result.close()
+        
+        if not found:
+            yield from _filter_archived(load_archived_events(self.db, game_id) or [], from_idx)
+    
+    def iter_replay_pages(
+        self,
+        game_id: str,
+        from_idx: int = 0,
+        to_idx: Optional[int] = None,
+        types: Optional[List[str]] = None,
+        page_size: int = REPLAY_PAGE_SIZE
+    ) -> Iterator[List[Any]]:
+        """键集分页读取回放行 - 每页按 (game_id, idx > cursor) 查询，不占用长连接游标
+        
+        只选取回放所需的列，行不进入 Session 身份映射，内存占用与游戏长度无关。
+        """
+        cursor = from_idx - 1
+        while True:
+            query = select(
+                EventModel.idx, EventModel.timestamp, EventModel.type,
+                EventModel.actor, EventModel.payload, EventModel.payload_codec, EventModel.payload_bin
+            ).where(EventModel.game_id == game_id, EventModel.idx > cursor)
+            if to_idx is not None:
+                query = query.where(EventModel.idx <= to_idx)
+            if types:
+                query = query.where(EventModel.type.in_(types))
             
-            if calculated_hash != event.hash:
-                logger.error(f"Hash mismatch at event {event.idx} in game {game_id}")
-                return False
-                
-            if event.prev_hash != prev_hash:
-                logger.error(f"Chain break at event {event.idx} in game {game_id}")
+            page = self.db.execute(query.order_by(EventModel.idx).limit(page_size)).all()
+            if not page:
+                if cursor == from_idx - 1:
+                    yield from self._iter_archived_pages(game_id, from_idx, to_idx, types, page_size)
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            cursor = page[-1].idx
+    
+    def _iter_archived_pages(
+        self,
+        game_id: str,
+        from_idx: int,
+        to_idx: Optional[int],
+        types: Optional[List[str]],
+        page_size: int
+    ) -> Iterator[List[Any]]:
+        """从冷存储分页读取已归档游戏的回放行"""
+        archived = load_archived_events(self.db, game_id)
+        if not archived:
+            return
+        events = [e for e in _filter_archived(archived, from_idx, to_idx) if not types or e.type in types]
+        for start in range(0, len(events), page_size):
+            yield events[start:start + page_size]
+    
+    def get_checkpoint(self, game_id: str) -> Optional[ChainCheckpoint]:
+        """获取已验证的链检查点"""
+        return self.db.get(ChainCheckpoint, game_id)
+    
+    def verify_chain_integrity(self, game_id: str, full: bool = False) -> bool:
+        """验证事件链完整性 - 默认从上一个已验证检查点开始增量校验"""
+        entry = self.db.get(ArchivedGame, game_id)
+        if entry is not None:
+            # Archived chains are immutable: verify the whole block against the indexed head
+            head = _verify_events(game_id, read_archived_events(entry))
+            return head == (entry.last_idx, entry.last_hash)
+        
+        checkpoint = None if full else self.get_checkpoint(game_id)
+        
+        prev_hash, last_idx = None, -1
+        if checkpoint:
+            # The checkpointed event itself must be untouched
+            anchor = self.db.query(EventModel).filter(
+                EventModel.game_id == game_id,
+                EventModel.idx == checkpoint.idx
+            ).first()
+            if not anchor or anchor.hash != checkpoint.hash:
+                logger.error(f"Checkpoint mismatch at event {checkpoint.idx} in game {game_id}")
                 return False
-            
-            prev_hash = event.hash
+            prev_hash, last_idx = checkpoint.hash, checkpoint.idx
+        
+        with closing(self.iter_events(game_id, from_idx=last_idx + 1)) as events:
+            head = _verify_events(game_id, events, prev_hash, last_idx)
+        if head is None:
+            return False
+        
+        last_idx, last_hash = head
+        if last_idx >= 0 and (checkpoint is None or last_idx > checkpoint.idx):
+            if checkpoint is None:
+                checkpoint = self.get_checkpoint(game_id) or ChainCheckpoint(game_id=game_id)
+                self.db.add(checkpoint)
+            checkpoint.idx = last_idx
+            checkpoint.hash = last_hash
+            checkpoint.verified_at = datetime.utcnow()
+            self.db.commit()
         
         return True
 
+class _GameDispatchQueue:
+    """单个游戏的有界分发队列，由一个消费任务按顺序排空"""
+    
+    def __init__(self, max_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.consumer: Optional[asyncio.Task] = None
+        # Publishers waiting for room; the consumer must not exit while any are pending
+        self.pending_puts = 0
+
+
 class EventPublisher:
-    """事件发布器 - 用于通知外部系统"""
+    """事件发布器 - 用于通知外部系统
     
-    def __init__(self):
+    同步处理器在发布时直接调用；异步处理器的事件进入按游戏划分的有界队列，
+    每个游戏一个消费任务按发布顺序批量投递，队列为空时消费任务退出。
+    """
+    
+    def __init__(self, max_queue_size: Optional[int] = None, batch_size: Optional[int] = None):
         self.subscribers: List = []
+        self.max_queue_size = max_queue_size or settings.event_dispatch_queue_size
+        self.batch_size = batch_size or settings.event_dispatch_batch_size
+        self._queues: Dict[str, _GameDispatchQueue] = {}
+        self._error_handlers: List = []
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.max_depth_seen = 0
     
     def subscribe(self, handler):
         """订阅事件"""
         self.subscribers.append(handler)
     
+    def on_error(self, handler):
+        """订阅处理器异常 handler(event, subscriber, exc)"""
+        self._error_handlers.append(handler)
+    
     def publish(self, event: BaseEvent):
-        """发布事件，支持同步与异步处理器"""
-        import asyncio
-        import inspect
+        """发布事件，支持同步与异步处理器 - 队列已满时丢弃异步投递并计数"""
+        dispatch = self._publish_sync(event)
+        if dispatch is None:
+            return
+        try:
+            dispatch.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error(f"Dispatch queue full for game {event.game_id}, dropped {event.get_event_type()}")
+            return
+        self._ensure_consumer(event.game_id, dispatch)
+    
+    async def publish_async(self, event: BaseEvent):
+        """发布事件 - 队列已满时等待消费（背压）"""
+        dispatch = self._publish_sync(event)
+        if dispatch is None:
+            return
+        self._ensure_consumer(event.game_id, dispatch)
+        dispatch.pending_puts += 1
+        try:
+            await dispatch.queue.put(event)
+        finally:
+            dispatch.pending_puts -= 1
+        self.max_depth_seen = max(self.max_depth_seen, dispatch.queue.qsize())
+    
+    def _publish_sync(self, event: BaseEvent) -> Optional[_GameDispatchQueue]:
+        """调用同步处理器，有异步处理器时返回该游戏的分发队列"""
+        has_async = False
         for handler in self.subscribers:
+            if inspect.iscoroutinefunction(handler):
+                has_async = True
+                continue
             try:
-                if inspect.iscoroutinefunction(handler):
-                    # Schedule async handler without blocking
-                    asyncio.create_task(handler(event))
-                else:
-                    handler(event)
+                handler(event)
+                self.delivered += 1
             except Exception as e:
-                logger.error(f"Error in event handler: {e}")
+                self._record_error(event, handler, e)
+        
+        if not has_async:
+            return None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            logger.error(f"No running event loop, async handlers skipped for {event.get_event_type()}")
+            return None
+        
+        dispatch = self._queues.get(event.game_id)
+        if dispatch is None:
+            dispatch = _GameDispatchQueue(self.max_queue_size)
+            self._queues[event.game_id] = dispatch
+        return dispatch
+    
+    def _ensure_consumer(self, game_id: str, dispatch: _GameDispatchQueue):
+        """确保游戏有一个运行中的消费任务"""
+        self.max_depth_seen = max(self.max_depth_seen, dispatch.queue.qsize())
+        if dispatch.consumer is None or dispatch.consumer.done():
+            dispatch.consumer = asyncio.create_task(self._consume(game_id, dispatch))
+    
+    async def _consume(self, game_id: str, dispatch: _GameDispatchQueue):
+        """按顺序批量投递，队列排空后退出"""
+        while True:
+            batch = [await dispatch.queue.get()]
+            while len(batch) < self.batch_size and not dispatch.queue.empty():
+                batch.append(dispatch.queue.get_nowait())
+            
+            for event in batch:
+                for handler in self.subscribers:
+                    if not inspect.iscoroutinefunction(handler):
+                        continue
+                    try:
+                        await handler(event)
+                        self.delivered += 1
+                    except Exception as e:
+                        self._record_error(event, handler, e)
+                dispatch.queue.task_done()
+            
+            if dispatch.queue.empty() and not dispatch.pending_puts:
+                # No await between the check and the removal, so no event can slip in
+                if self._queues.get(game_id) is dispatch:
+                    del self._queues[game_id]
+                return
+    
+    def _record_error(self, event: BaseEvent, handler, exc: Exception):
+        """记录处理器异常并通知错误订阅者"""
+        self.errors += 1
+        self.last_error = f"{event.get_event_type()} in game {event.game_id}: {exc!r}"
+        logger.error(f"Error in event handler {getattr(handler, '__qualname__', handler)}: {exc}", exc_info=exc)
+        for error_handler in self._error_handlers:
+            try:
+                error_handler(event, handler, exc)
+            except Exception:
+                logger.exception("Error in dispatch error handler")
+    
+    async def drain(self, game_id: Optional[str] = None):
+        """等待已发布事件全部投递完成"""
+        game_ids = [game_id] if game_id else list(self._queues)
+        for pending_game_id in game_ids:
+            dispatch = self._queues.get(pending_game_id)
+            if dispatch is not None:
+                await dispatch.queue.join()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取分发指标"""
+        depths = {game_id: dispatch.queue.qsize() for game_id, dispatch in self._queues.items()}
+        return {
+            "active_games": len(depths),
+            "queue_depth": sum(depths.values()),
+            "queue_depth_by_game": depths,
+            "max_depth_seen": self.max_depth_seen,
+            "max_queue_size": self.max_queue_size,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+class EventBatch:
+    """事件批次 - 缓冲同一游戏的事件，退出时统一写入"""
+    
+    def __init__(self, owner: Any, game_id: str, session: Optional[AsyncSession] = None):
+        self.owner = owner
+        self.game_id = game_id
+        # Unit-of-work session for async batches; other writes on it commit with the events
+        self.session = session
+        self.events: List[BaseEvent] = []
+        self.event_ids: List[str] = []
+        # Serialized GameState after the last buffered event, stored with it
+        self.snapshot: Optional[Dict[str, Any]] = None
+        # Tasks spawned inside the batch inherit the context variable; they must not
+        # buffer into a batch that has already been flushed
+        self.active = True
+    
+    def add(self, event: BaseEvent) -> str:
+        """缓冲事件，返回预分配的事件ID"""
+        if event.game_id != self.game_id:
+            raise ValueError(f"Event for game {event.game_id} emitted inside batch for game {self.game_id}")
+        event_id = str(uuid.uuid4())
+        self.events.append(event)
+        self.event_ids.append(event_id)
+        return event_id
+    
+    def mark(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """记录当前缓冲位置（嵌套批次开始时）"""
+        return len(self.events), self.snapshot
+    
+    def rewind(self, mark: Tuple[int, Optional[Dict[str, Any]]]):
+        """丢弃标记之后缓冲的事件（嵌套批次失败时）"""
+        count, snapshot = mark
+        del self.events[count:]
+        del self.event_ids[count:]
+        self.snapshot = snapshot
+
+
+# Active batch of the current task/thread, if any
+_current_batch: ContextVar[Optional[EventBatch]] = ContextVar("event_batch", default=None)
+
+
+def _savepoint(session: Session):
+    """开启保存点；pysqlite 在首条 DML 前不发 BEGIN，此时 SAVEPOINT 自己开启事务并在释放时提交，
+    所以先显式 BEGIN"""
+    connection = session.connection()
+    if connection.dialect.name == "sqlite" and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN")
+    return session.begin_nested()
+
+
+async def _async_savepoint(session: AsyncSession):
+    """开启保存点（异步会话，SQLite 处理同 _savepoint）"""
+    connection = await session.connection()
+    if connection.dialect.name == "sqlite":
+        raw = await connection.get_raw_connection()
+        if not raw.driver_connection.in_transaction:
+            await connection.exec_driver_sql("BEGIN")
+    return session.begin_nested()
+
 
 class GameEventManager:
     """游戏事件管理器"""
@@ -296,6 +977,10 @@ class GameEventManager:
     
     def emit(self, event: BaseEvent) -> str:
         """发出事件"""
+        batch = _current_batch.get()
+        if batch is not None and batch.owner is self and batch.active:
+            return batch.add(event)
+        
         # Store event
         event_id = self.event_store.append_event(event)
         
@@ -304,46 +989,349 @@ class GameEventManager:
         
         return event_id
     
+    @contextmanager
+    def batch(self, game_id: str):
+        """批量发出事件 - 一次 INSERT、一次提交，提交成功后再发布
+
+        同一会话中的其他待提交修改（如 Game 记录）随事件一起提交。
+        嵌套调用会并入外层批次，失败时回滚到保存点并丢弃自己缓冲的事件。
+        """
+        current = _current_batch.get()
+        if current is not None and current.owner is self and current.active:
+            if current.game_id != game_id:
+                raise ValueError("Cannot nest event batches for different games")
+            mark = current.mark()
+            try:
+                with _savepoint(self.event_store.db):
+                    yield current
+            except BaseException:
+                current.rewind(mark)
+                raise
+            return
+        
+        batch = EventBatch(self, game_id)
+        token = _current_batch.set(batch)
+        try:
+            yield batch
+        except BaseException:
+            self.event_store.db.rollback()
+            raise
+        finally:
+            batch.active = False
+            _current_batch.reset(token)
+        
+        if batch.events:
+            self.event_store.append_events(batch.events, batch.event_ids, batch.snapshot)
+            for event in batch.events:
+                self.publisher.publish(event)
+        else:
+            self.event_store.db.commit()
+    
     def replay_game(self, game_id: str, to_idx: Optional[int] = None) -> List[Dict[str, Any]]:
         """重放游戏到指定事件"""
-        events = self.event_store.get_events(game_id, to_idx=to_idx)
+        return list(self.stream_replay(game_id, to_idx=to_idx))
+    
+    def stream_replay(
+        self,
+        game_id: str,
+        from_idx: int = 0,
+        to_idx: Optional[int] = None,
+        types: Optional[List[str]] = None,
+        page_size: int = REPLAY_PAGE_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """流式重放 - 逐页产出回放数据，支持区间和事件类型过滤"""
+        for page in self.event_store.iter_replay_pages(game_id, from_idx, to_idx, types, page_size):
+            for row in page:
+                yield _event_to_replay_dict(row)
+    
+    def get_state_at(self, game_id: str, idx: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """获取游戏在指定事件之后的状态（用于回放定位）"""
+        state = self.event_store.load_game_state(game_id, to_idx=idx)
+        return state.to_snapshot() if state else None
+    
+    def get_game_summary(self, game_id: str) -> Dict[str, Any]:
+        """获取游戏摘要 - 读取摘要表单行，尚未回填的旧游戏回退到事件计算"""
+        summary = self.event_store.get_summary(game_id)
+        if summary is not None:
+            return summary
+        return _summarize_events(game_id, self.event_store.get_events(game_id))
+
+
+class AsyncEventStore:
+    """异步事件存储 - 基于 AsyncSession，数据库往返期间不阻塞事件循环"""
+    
+    def __init__(self, session: AsyncSession, codec: Optional[str] = None, outbox: Optional[bool] = None):
+        self.session = session
+        self.codec = _resolve_codec(codec)
+        self.outbox = settings.event_outbox_enabled if outbox is None else outbox
+    
+    async def append_event(self, event: BaseEvent) -> str:
+        """追加事件到存储"""
+        return (await self.append_events([event]))[0]
+    
+    async def append_events(
+        self,
+        events: List[BaseEvent],
+        event_ids: Optional[List[str]] = None,
+        snapshot: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """批量追加同一游戏的事件 - 在内存中延伸哈希链，一次 INSERT、一次提交"""
+        if not events:
+            return []
         
-        replay_data = []
-        for event in events:
-            replay_data.append({
-                "idx": event.idx,
-                "timestamp": event.timestamp.isoformat(),
-                "type": event.type,
-                "actor": event.actor,
-                "payload": event.payload
-            })
+        game_id, prepared = _prepare_events(events, self.codec)
+        if event_ids is None:
+            event_ids = [str(uuid.uuid4()) for _ in events]
         
-        return replay_data
+        for attempt in range(MAX_APPEND_RETRIES):
+            last_idx, last_hash = await self._get_chain_head(game_id)
+            rows = _build_event_rows(game_id, prepared, event_ids, last_idx, last_hash)
+            
+            try:
+                # The (game_id, idx) unique constraint detects concurrent writers
+                async with self.session.begin_nested():
+                    await self.session.execute(insert(EventModel), _storage_rows(rows))
+                    await self._project_read_models(game_id, rows)
+                    await self._update_summary(game_id, rows)
+                    if self.outbox:
+                        await self.session.execute(insert(OutboxMessage), outbox_rows(rows))
+                    if _has_segment_boundary(rows):
+                        await self._seal_merkle_segments(game_id, rows)
+                    if snapshot is not None:
+                        await self.session.execute(insert(GameSnapshot), [_build_snapshot_row(game_id, rows, snapshot)])
+                await self.session.commit()
+            except IntegrityError as e:
+                if not _is_chain_conflict(e):
+                    raise
+                logger.warning(
+                    f"Chain head conflict at idx={last_idx + 1} in game {game_id}, "
+                    f"reloading (attempt {attempt + 1})"
+                )
+                chain_heads.invalidate(game_id)
+                continue
+            
+            _advance_chain_head(game_id, last_idx, rows)
+            
+            for row in rows:
+                logger.info(f"Appended event {row['type']} (idx={row['idx']}) to game {game_id}")
+            
+            return event_ids
+        
+        raise RuntimeError(f"Failed to append events to game {game_id}: chain head contention")
     
-    def get_game_summary(self, game_id: str) -> Dict[str, Any]:
-        """获取游戏摘要"""
-        events = self.event_store.get_events(game_id)
+    async def _project_read_models(self, game_id: str, rows: List[Dict[str, Any]]):
+        """将事件投影到读模型表（与事件同一事务）"""
+        inspectors = None
+        if needs_inspectors(rows):
+            inspectors = dict((await self.session.execute(
+                select(NightActionRecord.target_seat, NightActionRecord.seat).where(
+                    NightActionRecord.game_id == game_id,
+                    NightActionRecord.action == "inspect"
+                ).order_by(NightActionRecord.idx)
+            )).all())
         
-        summary = {
-            "game_id": game_id,
-            "total_events": len(events),
-            "start_time": events[0].timestamp.isoformat() if events else None,
-            "end_time": None,
-            "winner": None,
-            "rounds": 0,
-            "phases": []
-        }
+        for model, model_rows in read_model_projector.project(rows, inspectors).items():
+            await self.session.execute(insert(model), model_rows)
+    
+    async def _update_summary(self, game_id: str, rows: List[Dict[str, Any]]):
+        """维护游戏摘要（与事件同一事务）"""
+        current = None
+        if needs_fold(rows):
+            current = (await self.session.execute(summary_select(game_id))).mappings().first()
+        statement = summary_statement(game_id, rows, current)
+        if statement is not None:
+            await self.session.execute(statement)
+    
+    async def get_summary(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """读取已维护的游戏摘要"""
+        row = (await self.session.execute(summary_select(game_id))).mappings().first()
+        return summary_to_dict(summary_values(row)) if row else None
+    
+    async def _seal_merkle_segments(self, game_id: str, rows: List[Dict[str, Any]]):
+        """在阶段边界封存事件段的 Merkle 根（与事件同一事务）"""
+        last_sealed_idx = (await self.session.execute(
+            select(func.max(MerkleCommitment.to_idx)).where(MerkleCommitment.game_id == game_id)
+        )).scalar()
+        last_sealed_idx = -1 if last_sealed_idx is None else last_sealed_idx
         
-        for event in events:
-            if event.type == "GameEnded":
-                summary["end_time"] = event.timestamp.isoformat()
-                summary["winner"] = event.payload.get("winner")
-            elif event.type == "PhaseChanged":
-                summary["rounds"] = max(summary["rounds"], event.payload.get("round_number", 0))
-                summary["phases"].append({
-                    "phase": event.payload.get("to_phase"),
-                    "round": event.payload.get("round_number"),
-                    "timestamp": event.timestamp.isoformat()
-                })
+        earlier = (await self.session.execute(
+            select(EventModel.idx, EventModel.hash, EventModel.type, EventModel.payload,
+                   EventModel.payload_codec, EventModel.payload_bin).where(
+                EventModel.game_id == game_id,
+                EventModel.idx > last_sealed_idx,
+                EventModel.idx < rows[0]["idx"]
+            ).order_by(EventModel.idx)
+        )).all()
+        
+        commitments = _build_commitment_rows(game_id, earlier, rows, last_sealed_idx)
+        if commitments:
+            await self.session.execute(insert(MerkleCommitment), commitments)
+    
+    async def _get_chain_head(self, game_id: str) -> Tuple[int, Optional[str]]:
+        """获取链头 (last_idx, last_hash)，未缓存时从数据库加载"""
+        head = chain_heads.get(game_id)
+        if head is not None:
+            return head
+        
+        last_event = await self.get_latest_event(game_id)
+        if last_event:
+            head = (last_event.idx, last_event.hash)
+        else:
+            head = (-1, None)
         
-        return summary
+        chain_heads.set(game_id, *head)
+        return head
+    
+    async def get_events(
+        self, 
+        game_id: str, 
+        from_idx: int = 0, 
+        to_idx: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[EventModel]:
+        """获取事件列表"""
+        
+        query = select(EventModel).where(
+            EventModel.game_id == game_id,
+            EventModel.idx >= from_idx
+        )
+        
+        if to_idx is not None:
+            query = query.where(EventModel.idx <= to_idx)
+        
+        query = query.order_by(EventModel.idx)
+        
+        if limit:
+            query = query.limit(limit)
+        
+        result = await self.session.execute(query)
+        events = result.scalars().all()
+        if not events:
+            # Finished games may have been moved to cold storage
+            entry = await self.session.get(ArchivedGame, game_id)
+            if entry is not None:
+                return _filter_archived(read_archived_events(entry), from_idx, to_idx, limit)
+        return events
+    
+    async def get_latest_event(self, game_id: str) -> Optional[EventModel]:
+        """获取最新事件"""
+        result = await self.session.execute(
+            select(EventModel).where(
+                EventModel.game_id == game_id
+            ).order_by(EventModel.idx.desc()).limit(1)
+        )
+        return result.scalars().first()
+    
+    async def get_latest_snapshot(self, game_id: str, to_idx: Optional[int] = None) -> Optional[GameSnapshot]:
+        """获取 to_idx 及之前的最新快照"""
+        query = select(GameSnapshot).where(GameSnapshot.game_id == game_id)
+        if to_idx is not None:
+            query = query.where(GameSnapshot.idx <= to_idx)
+        result = await self.session.execute(query.order_by(GameSnapshot.idx.desc()).limit(1))
+        return result.scalars().first()
+    
+    async def load_game_state(self, game_id: str, to_idx: Optional[int] = None) -> Optional[GameState]:
+        """重建游戏状态 - 恢复最近的快照后只应用其后的尾部事件"""
+        snapshot = await self.get_latest_snapshot(game_id, to_idx)
+        from_idx = snapshot.idx + 1 if snapshot else 0
+        
+        tail = await self.get_events(game_id, from_idx=from_idx, to_idx=to_idx)
+        
+        if snapshot is None and not tail:
+            return None
+        return rebuild_state(game_id, snapshot.state if snapshot else None, tail)
+    
+    async def verify_chain_integrity(self, game_id: str, full: bool = False) -> bool:
+        """验证事件链完整性 - 与同步版本相同，支持冷存储与检查点增量校验"""
+        return await self.session.run_sync(
+            lambda db: EventStore(db, self.codec, self.outbox).verify_chain_integrity(game_id, full=full)
+        )
+
+
+class AsyncGameEventManager:
+    """异步游戏事件管理器 - 每个工作单元使用独立的 AsyncSession"""
+    
+    def __init__(self, session_factory: async_sessionmaker):
+        self.session_factory = session_factory
+        self.publisher = EventPublisher()
+    
+    async def emit(self, event: BaseEvent) -> str:
+        """发出事件"""
+        batch = _current_batch.get()
+        if batch is not None and batch.owner is self and batch.active:
+            return batch.add(event)
+        
+        # Store event
+        async with self.session_factory() as session:
+            event_id = await AsyncEventStore(session).append_event(event)
+        
+        # Publish to subscribers
+        await self.publisher.publish_async(event)
+        
+        return event_id
+    
+    @asynccontextmanager
+    async def batch(self, game_id: str):
+        """批量发出事件 - 一次 INSERT、一次提交，提交成功后再发布
+
+        产出的批次带有工作单元会话 (batch.session)，在其上的其他修改随事件一起提交。
+        嵌套调用会并入外层批次，失败时回滚到保存点并丢弃自己缓冲的事件。
+        """
+        current = _current_batch.get()
+        if current is not None and current.owner is self and current.active:
+            if current.game_id != game_id:
+                raise ValueError("Cannot nest event batches for different games")
+            mark = current.mark()
+            try:
+                async with await _async_savepoint(current.session):
+                    yield current
+            except BaseException:
+                current.rewind(mark)
+                raise
+            return
+        
+        async with self.session_factory() as session:
+            batch = EventBatch(self, game_id, session)
+            token = _current_batch.set(batch)
+            try:
+                yield batch
+            except BaseException:
+                await session.rollback()
+                raise
+            finally:
+                batch.active = False
+                _current_batch.reset(token)
+            
+            if batch.events:
+                await AsyncEventStore(session).append_events(batch.events, batch.event_ids, batch.snapshot)
+            else:
+                await session.commit()
+        
+        for event in batch.events:
+            await self.publisher.publish_async(event)
+    
+    async def replay_game(self, game_id: str, to_idx: Optional[int] = None) -> List[Dict[str, Any]]:
+        """重放游戏到指定事件"""
+        async with self.session_factory() as session:
+            events = await AsyncEventStore(session).get_events(game_id, to_idx=to_idx)
+        return [_event_to_replay_dict(event) for event in events]
+    
+    async def load_game_state(self, game_id: str, to_idx: Optional[int] = None) -> Optional[GameState]:
+        """从快照和尾部事件重建游戏状态"""
+        async with self.session_factory() as session:
+            return await AsyncEventStore(session).load_game_state(game_id, to_idx)
+    
+    async def get_game_summary(self, game_id: str) -> Dict[str, Any]:
+        """获取游戏摘要 - 读取摘要表单行，尚未回填的旧游戏回退到事件计算"""
+        async with self.session_factory() as session:
+            event_store = AsyncEventStore(session)
+            summary = await event_store.get_summary(game_id)
+            if summary is not None:
+                return summary
+            events = await event_store.get_events(game_id)
+        return _summarize_events(game_id, events)
+    
+    async def verify_chain_integrity(self, game_id: str, full: bool = False) -> bool:
+        """验证事件链完整性"""
+        async with self.session_factory() as session:
+            return await AsyncEventStore(session).verify_chain_integrity(game_id, full=full)
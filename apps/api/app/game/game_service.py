@@ -1,14 +1,22 @@
 """Game service - integrates state machine, event sourcing, and WebSocket broadcasting"""
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 from datetime import datetime
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from sqlalchemy import select, update, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
 import logging
 import asyncio
+import uuid
 
-from app.game.state_machine import GameStateMachine, GamePhase
+from app.game.state_machine import GameStateMachine, GamePhase, GameState
+from app.game.actor import GameActorPool
+from app.game.timer_wheel import TimerWheel
+from app.game.timer_leases import PhaseTimerLeases
+from app.game.room_index import GameRoomIndex
+from app.config import settings
 from app.game.event_sourcing import *
-from app.database import Game, GamePlayer, RoomMember, Room
+from app.database import Game, GamePlayer, RoomMember, Room, AsyncSessionLocal
 from app.websocket_manager import ConnectionManager
 
 logger = logging.getLogger(__name__)
@@ -16,25 +24,41 @@ logger = logging.getLogger(__name__)
 class GameService:
     """游戏服务 - 统一管理游戏逻辑、事件和WebSocket通信"""
     
-    def __init__(self, db: Session, ws_manager: ConnectionManager):
-        self.db = db
+    def __init__(self, ws_manager: ConnectionManager, session_factory: async_sessionmaker = AsyncSessionLocal):
         self.ws_manager = ws_manager
+        self.session_factory = session_factory
         self.state_machine = GameStateMachine()
-        self.event_manager = GameEventManager(db)
+        self.event_manager = AsyncGameEventManager(session_factory)
+        # In-flight rebuilds, so concurrent callers share one load per game
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Every command touching a game's state runs on that game's actor
+        self.actors = GameActorPool(self._command_batch, command_factory=self._command_scope)
+        # Phase deadlines of every resident game, keyed (game_id, phase, round)
+        self.timers = TimerWheel()
+        # Deadlines are persisted on the game row; the lease decides which worker fires them
+        self.leases = PhaseTimerLeases(session_factory)
+        # game <-> room lookups for broadcasting and WebSocket actions
+        self.rooms = GameRoomIndex()
+        # With the outbox on, the relay publishes events and the gateway fans them out
+        self.broadcast = not settings.event_outbox_enabled
         
         # Subscribe to events for WebSocket broadcasting
         self.event_manager.publisher.subscribe(self._on_event)
     
     async def _on_event(self, event: BaseEvent):
-        """事件处理器 - 将事件广播到WebSocket"""
+        """事件处理器 - 将事件广播到WebSocket；启用发件箱时由中继经网关投递"""
+        if self.broadcast:
+            await self._broadcast(event)
+        if isinstance(event, GameEndedEvent):
+            self.rooms.remove(event.game_id)
+    
+    async def _broadcast(self, event: BaseEvent):
+        """将事件广播到房间的WebSocket连接"""
         try:
-            # Find room_id for the game
-            game_record = self.db.query(Game).filter(Game.id == event.game_id).first()
-            if not game_record:
+            room_id = await self.room_for_game(event.game_id)
+            if not room_id:
                 return
             
-            room_id = game_record.room_id
-            
             # Convert event to WebSocket message format
             ws_message = {
                 "type": self._event_to_ws_type(event.get_event_type()),
@@ -56,6 +80,35 @@ class GameService:
         except Exception as e:
             logger.error(f"Error broadcasting event: {e}")
     
+    async def room_for_game(self, game_id: str) -> Optional[str]:
+        """获取游戏所属房间 - 走缓存，只有本进程之前创建的游戏才查询一次数据库"""
+        room_id = self.rooms.room_of(game_id)
+        if room_id is None:
+            async with self.session_factory() as session:
+                row = (await session.execute(
+                    select(Game.room_id, Game.ended_at).where(Game.id == game_id)
+                )).first()
+            if row is None:
+                return None
+            room_id, ended_at = row
+            # Ended games were evicted on GameEnded and are not cached again
+            if ended_at is None:
+                self.rooms.add(game_id, room_id, current=False)
+        return room_id
+    
+    async def game_for_room(self, room_id: str) -> Optional[str]:
+        """获取房间当前进行中的游戏 - 走缓存，未命中时查询一次数据库"""
+        game_id = self.rooms.game_of(room_id)
+        if game_id is None:
+            async with self.session_factory() as session:
+                game_id = await session.scalar(
+                    select(Game.id).where(Game.room_id == room_id, Game.ended_at.is_(None))
+                    .order_by(Game.started_at.desc()).limit(1)
+                )
+            if game_id:
+                self.rooms.add(game_id, room_id)
+        return game_id
+    
     def _event_to_ws_type(self, event_type: str) -> str:
         """将事件类型转换为WebSocket消息类型"""
         mapping = {
@@ -84,122 +137,289 @@ class GameService:
         if isinstance(event, SystemNoticeEvent):
             return event.target_seats
         elif isinstance(event, NightActionEvent):
-            # Only visible to werewolves during night
+            # Only visible to werewolves during night; without the game's state nobody can be sent to
             game_state = self.state_machine.get_game(event.game_id)
-            if game_state:
-                return game_state.get_players_by_alignment("Werewolf")
+            if game_state is None:
+                logger.warning(f"Game {event.game_id} is not resident, not broadcasting its night action")
+                return []
+            return game_state.get_players_by_alignment("Werewolf")
         return None
     
-    async def create_game(self, room_id: str, config: Dict[str, Any]) -> str:
-        """创建游戏"""
-        
-        # Get room and members
-        room = self.db.query(Room).filter(Room.id == room_id).first()
-        if not room:
-            raise ValueError("Room not found")
-        
-        members = self.db.query(RoomMember).filter(
-            RoomMember.room_id == room_id,
-            RoomMember.left_at.is_(None)
-        ).all()
-        
-        # Create game record
-        import uuid
-        game_id = str(uuid.uuid4())
+    async def load_game(self, game_id: str) -> Optional[GameState]:
+        """获取游戏状态 - 不在内存中时从事件日志懒加载（重启后恢复）"""
+        game_state = self.state_machine.get_game(game_id)
+        if game_state:
+            return game_state
+        
+        task = self._loading.get(game_id)
+        if task is None:
+            task = asyncio.create_task(self._rehydrate_game(game_id))
+            self._loading[game_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(game_id, None))
+        return await task
+    
+    async def _rehydrate_game(self, game_id: str) -> Optional[GameState]:
+        """从快照和事件重建游戏状态并重新调度阶段计时器"""
+        game_state = await self.event_manager.load_game_state(game_id)
+        if not game_state:
+            return None
         
-        game_record = Game(
-            id=game_id,
-            room_id=room_id,
-            seed=str(uuid.uuid4()),
-            config=config,
-            current_phase=GamePhase.LOBBY.value,
-            current_round=0
-        )
+        # Finished games are served read-only and not kept resident
+        if game_state.current_phase == GamePhase.END:
+            return game_state
         
-        self.db.add(game_record)
-        self.db.commit()
+        self.state_machine.register_game(game_state)
+        logger.info(f"Rehydrated game {game_id} from event log")
         
-        # Create game state
-        game_state = self.state_machine.create_game(game_id, config)
+        # Re-arm the phase timer from the stored deadline; overdue phases fire immediately
+        self._arm_phase_timer(game_state)
         
-        # Emit game created event
-        players_data = [{
-            "user_id": member.user_id,
-            "seat": member.seat,
-            "is_bot": member.is_bot,
-            "agent_id": member.agent_id
-        } for member in members]
+        return game_state
+    
+    @asynccontextmanager
+    async def _command_batch(self, game_id: str):
+        """Actor 批次 - 一批命令的事件一起提交，快照对应批次末尾的状态"""
+        try:
+            async with self.event_manager.batch(game_id) as batch:
+                yield batch
+                game_state = self.state_machine.get_game(game_id)
+                if batch.snapshot is not None and game_state is not None:
+                    batch.snapshot = game_state.to_snapshot()
+        except Exception:
+            # The commands already changed the in-memory state; rebuild it from the log on next use
+            self.state_machine.remove_game(game_id)
+            raise
+    
+    @asynccontextmanager
+    async def _command_scope(self, game_id: str):
+        """单个命令 - 失败时回滚到保存点、丢弃其事件，并把内存状态恢复到命令之前"""
+        game_state = self.state_machine.get_game(game_id)
+        if game_state is not None:
+            snapshot, rng_state = game_state.to_snapshot(), game_state.rng.getstate()
+        try:
+            async with self.event_manager.batch(game_id):
+                yield
+        except Exception:
+            if game_state is None:
+                # Created or loaded by the failed command; rebuilt from the log on next use
+                self.state_machine.remove_game(game_id)
+            else:
+                self._restore_game(game_state, snapshot, rng_state)
+            raise
+    
+    def _restore_game(self, game_state: GameState, snapshot: Dict[str, Any], rng_state: Any):
+        """恢复失败命令之前的内存状态，并补回被该命令取消的阶段计时器"""
+        game_state.restore(snapshot)
+        game_state.rng.setstate(rng_state)
+        if self.state_machine.get_game(game_state.game_id) is not game_state:
+            self.state_machine.register_game(game_state)
+        if (game_state.game_id, game_state.current_phase.value, game_state.current_round) not in self.timers:
+            self._arm_phase_timer(game_state)
+    
+    async def _run_command(self, game_id: str, name: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        """在游戏的 Actor 上执行命令"""
+        return await self.actors.run(game_id, name, run)
+    
+    async def create_game(self, room_id: str, config: Dict[str, Any]) -> str:
+        """创建游戏"""
         
-        event = GameCreatedEvent(
-            game_id=game_id,
-            timestamp=datetime.utcnow(),
-            actor="system",
-            config=config,
-            players=players_data
-        )
+        game_id = str(uuid.uuid4())
         
-        self.event_manager.emit(event)
+        async with self.event_manager.batch(game_id) as batch:
+            session = batch.session
+            
+            # Get room and members
+            room = await session.get(Room, room_id)
+            if not room:
+                raise ValueError("Room not found")
+            
+            players_by_seat = await self._room_players(session, room_id)
+            
+            # Create game record
+            game_record = Game(
+                id=game_id,
+                room_id=room_id,
+                seed=str(uuid.uuid4()),
+                config=config,
+                current_phase=GamePhase.LOBBY.value,
+                current_round=0
+            )
+            
+            session.add(game_record)
+            
+            # Create game state
+            game_state = self.state_machine.create_game(game_id, config, seed=game_record.seed)
+            
+            # Emit game created event
+            event = GameCreatedEvent(
+                game_id=game_id,
+                timestamp=datetime.utcnow(),
+                actor="system",
+                config=config,
+                players=list(players_by_seat.values())
+            )
+            
+            await self.event_manager.emit(event)
+            
+            # Cached before commit so the GameCreated broadcast already hits it
+            self.rooms.add(game_id, room_id)
         
         logger.info(f"Created game {game_id} for room {room_id}")
         return game_id
     
+    async def start_room_game(self, room_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """创建并开始房间的游戏 - 单个事务：游戏记录只写一次，玩家批量插入"""
+        game_id = str(uuid.uuid4())
+        return await self._run_command(game_id, "start", lambda: self._start_room_game(game_id, room_id, config))
+    
+    async def _start_room_game(self, game_id: str, room_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await self._claim_and_start(game_id, room_id, config)
+        except Exception:
+            # The batch rolled back the room claim; nothing of the game may outlive it
+            self.state_machine.remove_game(game_id)
+            self.rooms.remove(game_id)
+            raise
+    
+    async def _claim_and_start(self, game_id: str, room_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.event_manager.batch(game_id) as batch:
+            session = batch.session
+            
+            # Validate before claiming, so a start that cannot deal roles leaves the room open
+            players_by_seat = await self._room_players(session, room_id)
+            players_data = list(players_by_seat.values())
+            if len(players_data) != len(config.get("roles", [])):
+                raise ValueError("Player count doesn't match role count")
+            
+            # Claim the room so two concurrent starts cannot both create a game
+            claimed = await session.execute(
+                update(Room).where(Room.id == room_id, Room.status == "open").values(status="playing")
+                .execution_options(synchronize_session=False)
+            )
+            if not claimed.rowcount:
+                raise ValueError("Game already started or room closed")
+            
+            seed = str(uuid.uuid4())
+            game_state = self.state_machine.create_game(game_id, config, seed=seed)
+            role_assignments = self.state_machine.assign_roles(game_id, players_data)
+            phase_data = self.state_machine.start_phase(game_id, GamePhase.NIGHT)
+            
+            # The game row is inserted once, already in its first phase
+            game_record = Game(
+                id=game_id,
+                room_id=room_id,
+                seed=seed,
+                config=config,
+                current_phase=GamePhase.NIGHT.value,
+                current_round=phase_data["round"],
+                started_at=game_state.phase_start_time
+            )
+            self.leases.hold(game_record, game_state.phase_deadline)
+            session.add(game_record)
+            await session.flush()
+            await self._insert_players(session, game_id, role_assignments, players_by_seat)
+            
+            self.rooms.add(game_id, room_id)
+            timestamp = datetime.utcnow()
+            await self.event_manager.emit(GameCreatedEvent(
+                game_id=game_id,
+                timestamp=timestamp,
+                actor="system",
+                config=config,
+                players=players_data
+            ))
+            await self.event_manager.emit(RolesAssignedEvent(
+                game_id=game_id,
+                timestamp=timestamp,
+                actor="system",
+                assignments=role_assignments,
+                seed=seed
+            ))
+            await self.event_manager.emit(PhaseChangedEvent(
+                game_id=game_id,
+                timestamp=timestamp,
+                actor="system",
+                from_phase=GamePhase.LOBBY.value,
+                to_phase=GamePhase.NIGHT.value,
+                round_number=phase_data["round"],
+                deadline=phase_data.get("deadline")
+            ))
+            batch.snapshot = game_state.to_snapshot()
+        
+        self._arm_phase_timer(game_state)
+        logger.info(f"Created and started game {game_id} for room {room_id}")
+        return {"message": "Game started", "game_id": game_id, "assignments": role_assignments}
+    
+    async def _room_players(self, session, room_id: str) -> Dict[int, Dict[str, Any]]:
+        """查询房间内未离开的成员，按座位索引"""
+        result = await session.execute(
+            select(RoomMember.user_id, RoomMember.seat, RoomMember.is_bot, RoomMember.agent_id)
+            .where(RoomMember.room_id == room_id, RoomMember.left_at.is_(None))
+            .order_by(RoomMember.seat)
+        )
+        return {
+            seat: {"user_id": user_id, "seat": seat, "is_bot": is_bot, "agent_id": agent_id}
+            for user_id, seat, is_bot, agent_id in result.all()
+        }
+    
+    async def _insert_players(
+        self,
+        session,
+        game_id: str,
+        role_assignments: List[Dict[str, Any]],
+        players_by_seat: Dict[int, Dict[str, Any]]
+    ):
+        """一条 INSERT 批量写入所有 GamePlayer"""
+        if not role_assignments:
+            return
+        await session.execute(insert(GamePlayer), [{
+            "game_id": game_id,
+            "user_id": players_by_seat[assignment["seat"]]["user_id"],
+            "seat": assignment["seat"],
+            "role": assignment["role"],
+            "alignment": assignment["alignment"],
+            "alive": True,
+            "is_bot": bool(players_by_seat[assignment["seat"]]["is_bot"]),
+            "agent_id": players_by_seat[assignment["seat"]]["agent_id"]
+        } for assignment in role_assignments])
+    
     async def start_game(self, game_id: str) -> Dict[str, Any]:
         """开始游戏 - 分配角色"""
-        
-        game_record = self.db.query(Game).filter(Game.id == game_id).first()
-        if not game_record:
-            raise ValueError("Game not found")
-        
-        # Get members
-        members = self.db.query(RoomMember).filter(
-            RoomMember.room_id == game_record.room_id,
-            RoomMember.left_at.is_(None)
-        ).all()
-        
-        players_data = [{
-            "user_id": member.user_id,
-            "seat": member.seat,
-            "is_bot": member.is_bot,
-            "agent_id": member.agent_id
-        } for member in members]
-        
-        # Assign roles
-        role_assignments = self.state_machine.assign_roles(game_id, players_data)
-        
-        # Create GamePlayer records
-        for assignment in role_assignments:
-            game_player = GamePlayer(
+        return await self._run_command(game_id, "start", lambda: self._start_game(game_id))
+    
+    async def _start_game(self, game_id: str) -> Dict[str, Any]:
+        # Roles, players, the first phase and the game record are committed together
+        async with self.event_manager.batch(game_id) as batch:
+            session = batch.session
+            
+            game_record = await session.get(Game, game_id)
+            if not game_record:
+                raise ValueError("Game not found")
+            
+            players_by_seat = await self._room_players(session, game_record.room_id)
+            
+            # Assign roles
+            role_assignments = self.state_machine.assign_roles(game_id, list(players_by_seat.values()))
+            
+            # Create GamePlayer records
+            await self._insert_players(session, game_id, role_assignments, players_by_seat)
+            
+            # Update game record (phase and round are written by _start_phase)
+            game_record.started_at = datetime.utcnow()
+            
+            # Emit events
+            roles_event = RolesAssignedEvent(
                 game_id=game_id,
-                user_id=next(p["user_id"] for p in players_data if p["seat"] == assignment["seat"]),
-                seat=assignment["seat"],
-                role=assignment["role"],
-                alignment=assignment["alignment"],
-                alive=True,
-                is_bot=next(p["is_bot"] for p in players_data if p["seat"] == assignment["seat"]),
-                agent_id=next((p["agent_id"] for p in players_data if p["seat"] == assignment["seat"]), None)
+                timestamp=datetime.utcnow(),
+                actor="system",
+                assignments=role_assignments,
+                seed=game_record.seed
             )
-            self.db.add(game_player)
-        
-        # Update game record
-        game_record.current_phase = GamePhase.NIGHT.value
-        game_record.current_round = 1
-        game_record.started_at = datetime.utcnow()
-        
-        self.db.commit()
-        
-        # Emit events
-        roles_event = RolesAssignedEvent(
-            game_id=game_id,
-            timestamp=datetime.utcnow(),
-            actor="system",
-            assignments=role_assignments,
-            seed=game_record.seed
-        )
-        
-        self.event_manager.emit(roles_event)
-        
-        # Start first night phase
-        await self._start_phase(game_id, GamePhase.NIGHT)
+            
+            await self.event_manager.emit(roles_event)
+            
+            # Start first night phase
+            await self._start_phase(game_id, GamePhase.NIGHT)
         
         return {"message": "Game started", "assignments": role_assignments}
     
@@ -208,68 +428,132 @@ class GameService:
         
         phase_data = self.state_machine.start_phase(game_id, phase)
         
-        # Update game record
-        game_record = self.db.query(Game).filter(Game.id == game_id).first()
-        if game_record:
-            game_record.current_phase = phase.value
-            game_record.current_round = phase_data["round"]
-            self.db.commit()
-        
-        # Emit phase change event
-        event = PhaseChangedEvent(
-            game_id=game_id,
-            timestamp=datetime.utcnow(),
-            actor="system",
-            from_phase=game_record.current_phase if game_record else "unknown",
-            to_phase=phase.value,
-            round_number=phase_data["round"],
-            deadline=phase_data.get("deadline")
-        )
-        
-        self.event_manager.emit(event)
+        async with self.event_manager.batch(game_id) as batch:
+            # Update game record
+            game_record = await batch.session.get(Game, game_id)
+            if game_record:
+                game_record.current_phase = phase.value
+                game_record.current_round = phase_data["round"]
+                self.leases.hold(game_record, self.state_machine.get_game(game_id).phase_deadline)
+            
+            # Emit phase change event
+            event = PhaseChangedEvent(
+                game_id=game_id,
+                timestamp=datetime.utcnow(),
+                actor="system",
+                from_phase=game_record.current_phase if game_record else "unknown",
+                to_phase=phase.value,
+                round_number=phase_data["round"],
+                deadline=phase_data.get("deadline")
+            )
+            
+            await self.event_manager.emit(event)
+            batch.snapshot = self.state_machine.get_game(game_id).to_snapshot()
         
         # Schedule phase timeout
-        if phase_data.get("deadline"):
-            asyncio.create_task(self._schedule_phase_timeout(game_id, phase))
+        self._arm_phase_timer(self.state_machine.get_game(game_id))
     
-    async def _schedule_phase_timeout(self, game_id: str, phase: GamePhase):
-        """调度阶段超时"""
-        game_state = self.state_machine.get_game(game_id)
-        if not game_state or not game_state.phase_deadline:
-            return
-        
-        # Wait until deadline
-        now = datetime.utcnow()
-        if game_state.phase_deadline > now:
-            wait_seconds = (game_state.phase_deadline - now).total_seconds()
-            await asyncio.sleep(wait_seconds)
-        
-        # Check if phase is still active
-        current_game_state = self.state_machine.get_game(game_id)
-        if not current_game_state or current_game_state.current_phase != phase:
+    def _arm_phase_timer(self, game_state: GameState, delay: Optional[float] = None):
+        """按阶段截止时间布置计时器（挂钟截止时间换算为单调时钟延迟），delay 覆盖截止时间"""
+        if not game_state.phase_deadline or game_state.current_phase == GamePhase.END:
             return
         
-        # Emit timer ended event
-        event = TimerEndedEvent(
-            game_id=game_id,
-            timestamp=datetime.utcnow(),
-            actor="system",
-            phase=phase.value
+        if delay is None:
+            delay = (game_state.phase_deadline - datetime.utcnow()).total_seconds()
+        self._arm_timer(game_state.game_id, game_state.current_phase, game_state.current_round, delay)
+    
+    def _arm_timer(self, game_id: str, phase: GamePhase, round_number: int, delay: float):
+        self.timers.arm(
+            (game_id, phase.value, round_number),
+            delay,
+            lambda: self._run_command(game_id, "timer", lambda: self._on_phase_timeout(game_id, phase, round_number))
         )
+    
+    def _cancel_phase_timer(self, game_state: GameState):
+        """取消当前阶段的计时器（阶段提前结束时）"""
+        self.timers.cancel((game_state.game_id, game_state.current_phase.value, game_state.current_round))
+    
+    async def _complete_phase_early(self, game_state: GameState):
+        """所有需要行动的玩家都已行动时提前结束阶段，可留一段宽限时间"""
+        if not self.state_machine.is_phase_complete(game_state.game_id):
+            return
         
-        self.event_manager.emit(event)
+        grace = game_state.config.get("phase_completion_grace", settings.phase_completion_grace)
+        if grace <= 0:
+            await self._advance_phase(game_state.game_id)
+            return
         
-        # Auto-advance phase
-        await self.advance_phase(game_id)
+        remaining = (game_state.phase_deadline - datetime.utcnow()).total_seconds() if game_state.phase_deadline else grace
+        if grace < remaining:
+            # The phase timer fires at the end of the grace window instead of the deadline
+            self._arm_phase_timer(game_state, grace)
     
-    async def submit_speak(self, game_id: str, seat: int, content: str) -> Dict[str, Any]:
-        """提交发言"""
+    async def recover_phase_timers(self) -> int:
+        """认领无人持有或租约过期的阶段计时器并批量重新布置（启动时及定期执行）"""
+        pending = await self.leases.claim_pending()
+        now = datetime.utcnow()
+        for timer in pending:
+            # The game itself is loaded lazily when its timer fires
+            self._arm_timer(timer.game_id, GamePhase(timer.phase), timer.round_number, (timer.deadline - now).total_seconds())
+        if pending:
+            logger.info(f"Recovered {len(pending)} phase timers")
+        return len(pending)
+    
+    async def run_timer_recovery(self, stop: Optional[asyncio.Event] = None):
+        """持续续期本进程的租约并接管失效的计时器，直到 stop 被设置；退出时释放租约"""
+        stop = stop or asyncio.Event()
+        interval = self.leases.lease.total_seconds() / 3
+        while not stop.is_set():
+            try:
+                await self.leases.renew()
+                await self.recover_phase_timers()
+            except Exception as e:
+                logger.error(f"Phase timer recovery error: {e}")
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+        await self.timers.close()
+        await self.leases.release()
+    
+    async def _on_phase_timeout(self, game_id: str, phase: GamePhase, round_number: int):
+        """阶段计时结束 - 阶段仍未变化且本进程持有租约时推进"""
+        # Check if phase is still active (recovered timers may fire before the game is loaded)
+        current_game_state = await self.load_game(game_id)
+        if (
+            not current_game_state
+            or current_game_state.current_phase != phase
+            or current_game_state.current_round != round_number
+        ):
+            return
         
-        game_state = self.state_machine.get_game(game_id)
+        async with self.event_manager.batch(game_id) as batch:
+            if not await self.leases.claim_for_fire(batch.session, game_id):
+                return
+            
+            # Emit timer ended event
+            event = TimerEndedEvent(
+                game_id=game_id,
+                timestamp=datetime.utcnow(),
+                actor="system",
+                phase=phase.value
+            )
+            
+            await self.event_manager.emit(event)
+            
+            # Auto-advance phase
+            await self._advance_phase(game_id)
+    
+    async def submit_speak(self, game_id: str, seat: int, content: str, finished: bool = False) -> Dict[str, Any]:
+        """提交发言，finished 表示本轮发言结束"""
+        return await self._run_command(game_id, "speak", lambda: self._submit_speak(game_id, seat, content, finished))
+    
+    async def _submit_speak(self, game_id: str, seat: int, content: str, finished: bool = False) -> Dict[str, Any]:
+        game_state = await self.load_game(game_id)
         if not game_state:
             raise ValueError("Game not found")
         
-        if seat not in game_state.get_alive_players():
+        if not game_state.is_alive(seat):
             raise ValueError("Player is not alive")
         
         # Phase validation: allow DayTalk publicly; allow Night for werewolves team chat
@@ -286,6 +570,11 @@ class GameService:
                 # Non-werewolves cannot speak at night
                 raise ValueError("Speaking not allowed at night for this role")
         
+        # Only day speeches count towards ending the talk phase
+        finished = finished and game_state.current_phase == GamePhase.DAY_TALK
+        if finished:
+            self.state_machine.finish_speech(game_id, seat)
+        
         # Emit speak event
         event = SpeakEvent(
             game_id=game_id,
@@ -294,15 +583,25 @@ class GameService:
             seat=seat,
             content=content,
             phase=game_state.current_phase.value,
-            visibility=visibility
+            visibility=visibility,
+            finished=finished
         )
         
-        self.event_manager.emit(event)
+        await self.event_manager.emit(event)
+        
+        if finished:
+            await self._complete_phase_early(game_state)
         
         return {"success": True, "visibility": visibility}
     
     async def submit_vote(self, game_id: str, seat: int, target_seat: Optional[int]) -> Dict[str, Any]:
         """提交投票"""
+        return await self._run_command(game_id, "vote", lambda: self._submit_vote(game_id, seat, target_seat))
+    
+    async def _submit_vote(self, game_id: str, seat: int, target_seat: Optional[int]) -> Dict[str, Any]:
+        game_state = await self.load_game(game_id)
+        if not game_state:
+            raise ValueError("Game not found")
         
         vote_data = self.state_machine.submit_vote(game_id, seat, target_seat)
         
@@ -316,7 +615,8 @@ class GameService:
             phase=GamePhase.VOTE.value
         )
         
-        self.event_manager.emit(event)
+        await self.event_manager.emit(event)
+        await self._complete_phase_early(game_state)
         
         return vote_data
     
@@ -328,8 +628,18 @@ class GameService:
         target_seat: Optional[int] = None
     ) -> Dict[str, Any]:
         """提交夜间行动"""
-        
-        game_state = self.state_machine.get_game(game_id)
+        return await self._run_command(
+            game_id, "night_action", lambda: self._submit_night_action(game_id, seat, action, target_seat)
+        )
+    
+    async def _submit_night_action(
+        self,
+        game_id: str,
+        seat: int,
+        action: str,
+        target_seat: Optional[int] = None
+    ) -> Dict[str, Any]:
+        game_state = await self.load_game(game_id)
         if not game_state:
             raise ValueError("Game not found")
         
@@ -350,128 +660,140 @@ class GameService:
             role=player["role"]
         )
         
-        self.event_manager.emit(event)
+        await self.event_manager.emit(event)
+        await self._complete_phase_early(game_state)
         
         return action_data
     
     async def advance_phase(self, game_id: str) -> Optional[Dict[str, Any]]:
         """推进阶段"""
-        
-        game_state = self.state_machine.get_game(game_id)
+        return await self._run_command(game_id, "advance", lambda: self._advance_phase(game_id))
+    
+    async def _advance_phase(self, game_id: str) -> Optional[Dict[str, Any]]:
+        game_state = await self.load_game(game_id)
         if not game_state:
             raise ValueError("Game not found")
         
         current_phase = game_state.current_phase
-        
-        # Handle phase-specific logic before advancing
-        if current_phase == GamePhase.VOTE:
-            # Resolve voting
-            vote_result = self.state_machine.resolve_vote(game_id)
-            
-            # Emit vote result event
-            event = VoteResultEvent(
-                game_id=game_id,
-                timestamp=datetime.utcnow(),
-                actor="system",
-                votes=dict(game_state.votes),
-                executed_seat=vote_result.get("executed_seat"),
-                reason=vote_result.get("reason", "unknown")
-            )
-            
-            self.event_manager.emit(event)
-            
-            # Emit player death event if someone was executed
-            if vote_result.get("executed_seat"):
-                death_event = PlayerDiedEvent(
-                    game_id=game_id,
-                    timestamp=datetime.utcnow(),
-                    actor="system",
-                    seat=vote_result["executed_seat"],
-                    cause="voted"
-                )
-                self.event_manager.emit(death_event)
-        
-        elif current_phase == GamePhase.NIGHT:
-            # Resolve night actions
-            night_result = self.state_machine.resolve_night(game_id)
-            
-            # Emit night result event
-            event = NightResultEvent(
-                game_id=game_id,
-                timestamp=datetime.utcnow(),
-                actor="system",
-                results=night_result
-            )
-            
-            self.event_manager.emit(event)
-            
-            # Emit player death events
-            for seat in night_result.get("killed", []):
-                death_event = PlayerDiedEvent(
+        self._cancel_phase_timer(game_state)
+        
+        # VoteResult/PlayerDied/PhaseChanged/GameEnded and the game record are committed together
+        async with self.event_manager.batch(game_id) as batch:
+            # Handle phase-specific logic before advancing
+            if current_phase == GamePhase.VOTE:
+                # Resolve voting
+                vote_result = self.state_machine.resolve_vote(game_id)
+                
+                # Emit vote result event
+                event = VoteResultEvent(
                     game_id=game_id,
                     timestamp=datetime.utcnow(),
                     actor="system",
-                    seat=seat,
-                    cause="killed"
+                    votes=dict(game_state.votes),
+                    executed_seat=vote_result.get("executed_seat"),
+                    reason=vote_result.get("reason", "unknown")
                 )
-                self.event_manager.emit(death_event)
+                
+                await self.event_manager.emit(event)
+                
+                # Emit player death event if someone was executed
+                if vote_result.get("executed_seat"):
+                    death_event = PlayerDiedEvent(
+                        game_id=game_id,
+                        timestamp=datetime.utcnow(),
+                        actor="system",
+                        seat=vote_result["executed_seat"],
+                        cause="voted"
+                    )
+                    await self.event_manager.emit(death_event)
             
-            for seat in night_result.get("poisoned", []):
-                death_event = PlayerDiedEvent(
+            elif current_phase == GamePhase.NIGHT:
+                # Resolve night actions
+                night_result = self.state_machine.resolve_night(game_id)
+                
+                # Emit night result event
+                event = NightResultEvent(
                     game_id=game_id,
                     timestamp=datetime.utcnow(),
                     actor="system",
-                    seat=seat,
-                    cause="poisoned"
+                    results=night_result
                 )
-                self.event_manager.emit(death_event)
-        
-        # Advance to next phase
-        next_phase_data = self.state_machine.advance_to_next_phase(game_id)
-        
-        if next_phase_data:
-            # Update game record
-            game_record = self.db.query(Game).filter(Game.id == game_id).first()
-            if game_record:
-                game_record.current_phase = game_state.current_phase.value
-                game_record.current_round = game_state.current_round
                 
-                if game_state.current_phase == GamePhase.END:
-                    game_record.ended_at = datetime.utcnow()
+                await self.event_manager.emit(event)
                 
-                self.db.commit()
-            
-            # Emit phase change event
-            phase_event = PhaseChangedEvent(
-                game_id=game_id,
-                timestamp=datetime.utcnow(),
-                actor="system",
-                from_phase=current_phase.value,
-                to_phase=game_state.current_phase.value,
-                round_number=game_state.current_round,
-                deadline=next_phase_data.get("deadline")
-            )
+                # Emit player death events
+                for seat in night_result.get("killed", []):
+                    death_event = PlayerDiedEvent(
+                        game_id=game_id,
+                        timestamp=datetime.utcnow(),
+                        actor="system",
+                        seat=seat,
+                        cause="killed"
+                    )
+                    await self.event_manager.emit(death_event)
+                
+                for seat in night_result.get("poisoned", []):
+                    death_event = PlayerDiedEvent(
+                        game_id=game_id,
+                        timestamp=datetime.utcnow(),
+                        actor="system",
+                        seat=seat,
+                        cause="poisoned"
+                    )
+                    await self.event_manager.emit(death_event)
             
-            self.event_manager.emit(phase_event)
+            # Advance to next phase
+            next_phase_data = self.state_machine.advance_to_next_phase(game_id)
             
-            # Check if game ended
-            if game_state.current_phase == GamePhase.END:
-                end_event = GameEndedEvent(
+            if next_phase_data:
+                # Update game record
+                game_record = await batch.session.get(Game, game_id)
+                if game_record:
+                    game_record.current_phase = game_state.current_phase.value
+                    game_record.current_round = game_state.current_round
+                    self.leases.hold(
+                        game_record, None if game_state.current_phase == GamePhase.END else game_state.phase_deadline
+                    )
+                    
+                    if game_state.current_phase == GamePhase.END:
+                        game_record.ended_at = datetime.utcnow()
+                
+                # Emit phase change event
+                phase_event = PhaseChangedEvent(
                     game_id=game_id,
                     timestamp=datetime.utcnow(),
                     actor="system",
-                    winner=game_state.winner or "unknown",
-                    final_state={
-                        "players": dict(game_state.players),
-                        "rounds": game_state.current_round
-                    }
+                    from_phase=current_phase.value,
+                    to_phase=game_state.current_phase.value,
+                    round_number=game_state.current_round,
+                    deadline=next_phase_data.get("deadline")
                 )
                 
-                self.event_manager.emit(end_event)
-            else:
-                # Schedule next phase timeout
-                if next_phase_data.get("deadline"):
-                    asyncio.create_task(self._schedule_phase_timeout(game_id, game_state.current_phase))
+                await self.event_manager.emit(phase_event)
+                
+                # Check if game ended
+                if game_state.current_phase == GamePhase.END:
+                    end_event = GameEndedEvent(
+                        game_id=game_id,
+                        timestamp=datetime.utcnow(),
+                        actor="system",
+                        winner=game_state.winner or "unknown",
+                        final_state={
+                            "players": {seat: player.to_dict() for seat, player in game_state.players.items()},
+                            "rounds": game_state.current_round
+                        }
+                    )
+                    
+                    await self.event_manager.emit(end_event)
+                else:
+                    # Schedule next phase timeout
+                    self._arm_phase_timer(game_state)
+                
+                batch.snapshot = game_state.to_snapshot()
+        
+        # Finished games no longer need to be resident
+        if game_state.current_phase == GamePhase.END:
+            self.state_machine.remove_game(game_id)
         
         return next_phase_data
     
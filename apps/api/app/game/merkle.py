@@ -0,0 +1,119 @@
+"""Merkle commitments over event segments for O(log n) inclusion proofs
+
+Leaves are the chain hashes of the events in a segment. Hashing is domain
+separated (RFC 6962 style) so a leaf can never be confused with a node:
+
+    leaf = sha256(0x00 || bytes.fromhex(event.hash))
+    node = sha256(0x01 || left || right)
+
+An odd node at the end of a level is promoted unchanged to the next level.
+A proof is the list of sibling hashes from the leaf up to the root; each
+step says on which side the sibling sits.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import hashlib
+
+# Event types that delimit a segment: PhaseChanged opens a new one, GameEnded closes the last
+SEGMENT_OPEN_TYPE = "PhaseChanged"
+SEGMENT_CLOSE_TYPE = "GameEnded"
+
+
+def leaf_hash(event_hash: str) -> bytes:
+    """计算叶子哈希"""
+    return hashlib.sha256(b"\x00" + bytes.fromhex(event_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """计算内部节点哈希"""
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    return [
+        node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+        for i in range(0, len(level), 2)
+    ]
+
+
+def merkle_root(event_hashes: Sequence[str]) -> str:
+    """计算一组事件哈希的 Merkle 根（十六进制）"""
+    if not event_hashes:
+        raise ValueError("Cannot compute the Merkle root of an empty segment")
+
+    level = [leaf_hash(h) for h in event_hashes]
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def inclusion_proof(event_hashes: Sequence[str], index: int) -> List[Dict[str, str]]:
+    """生成第 index 个事件的包含证明"""
+    if not 0 <= index < len(event_hashes):
+        raise IndexError(f"Leaf index {index} out of range")
+
+    proof = []
+    level = [leaf_hash(h) for h in event_hashes]
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({
+                "position": "left" if sibling < index else "right",
+                "hash": level[sibling].hex()
+            })
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def verify_inclusion(event_hash: str, proof: Sequence[Dict[str, str]], root: str) -> bool:
+    """校验包含证明"""
+    current = leaf_hash(event_hash)
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        if step["position"] == "left":
+            current = node_hash(sibling, current)
+        else:
+            current = node_hash(current, sibling)
+    return current.hex() == root
+
+
+def seal_segments(
+    events: Sequence[Tuple[int, str, str, Optional[Dict[str, Any]]]],
+    last_sealed_idx: int
+) -> List[Dict[str, Any]]:
+    """根据阶段边界切分事件段并计算 Merkle 根
+
+    events 为 last_sealed_idx 之后按 idx 排序的 (idx, hash, type, payload)。
+    PhaseChanged 开启新段（之前的段随之封存），GameEnded 封存最后一段（含自身）。
+    返回待写入的承诺行；尚未结束的当前段不会出现在结果中。
+    """
+    commitments = []
+    segment: List[Tuple[int, str, str, Optional[Dict[str, Any]]]] = []
+
+    def seal():
+        opener_type, opener_payload = segment[0][2], segment[0][3] or {}
+        if opener_type == SEGMENT_OPEN_TYPE:
+            phase, round_number = opener_payload.get("to_phase"), opener_payload.get("round_number", 0)
+        else:
+            phase, round_number = "Lobby", 0
+        commitments.append({
+            "from_idx": segment[0][0],
+            "to_idx": segment[-1][0],
+            "phase": phase,
+            "round": round_number,
+            "leaf_count": len(segment),
+            "root": merkle_root([event[1] for event in segment])
+        })
+        segment.clear()
+
+    for event in events:
+        if event[0] <= last_sealed_idx:
+            continue
+        if event[2] == SEGMENT_OPEN_TYPE and segment:
+            seal()
+        segment.append(event)
+        if event[2] == SEGMENT_CLOSE_TYPE:
+            seal()
+
+    return commitments
@@ -0,0 +1,298 @@
+"""Transactional outbox - relays committed events to an external message bus
+
+When ``event_outbox_enabled`` is set, every appended event also gets an
+``event_outbox`` row in the same transaction, and the bus replaces the API's
+in-process WebSocket fan-out: the WebSocket gateway subscribes to ``game.>``
+and delivers to its clients. ``OutboxRelay`` claims pending rows in batches
+(a short UPDATE, so no row locks are held while publishing), publishes them
+to ``game.<room_id>`` and marks each row once the bus accepted it. Delivery
+is at-least-once: a crash between publish and mark republishes the message
+once its claim lapses, so every message carries the event id as its dedup id
+(``Nats-Msg-Id`` header and ``id`` field).
+
+Events that are not for the whole room (night actions, targeted notices,
+team chat) go to ``game.<room_id>.private`` with the ``target_seats`` that
+may see them; the gateway delivers those only to clients sitting in one of
+those seats.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import fnmatch
+import json
+import logging
+
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.database import Game, GamePlayer, OutboxMessage
+
+try:
+    import nats
+except ImportError:  # pragma: no cover - optional dependency
+    nats = None
+
+logger = logging.getLogger(__name__)
+
+SUBJECT_PREFIX = "game"
+
+
+def outbox_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """根据待插入的事件行生成发件箱行"""
+    return [{
+        "id": row["id"],
+        "game_id": row["game_id"],
+        "idx": row["idx"],
+        "type": row["type"],
+        "message": {
+            "id": row["id"],
+            "game_id": row["game_id"],
+            "idx": row["idx"],
+            "type": row["type"],
+            "actor": row["actor"],
+            "payload": row["payload"],
+            "timestamp": int(row["timestamp"].timestamp() * 1000)
+        },
+        "created_at": row["timestamp"]
+    } for row in rows]
+
+
+def is_room_wide(event_type: str, payload: Dict[str, Any]) -> bool:
+    """事件是否对整个房间可见"""
+    if event_type == "NightAction":
+        return False
+    if event_type == "SystemNotice" and payload.get("target_seats") is not None:
+        return False
+    if event_type == "Speak" and payload.get("visibility", "public") != "public":
+        return False
+    return True
+
+
+def subject_for(room_id: str, event_type: str, payload: Dict[str, Any]) -> str:
+    """获取消息主题"""
+    subject = f"{SUBJECT_PREFIX}.{room_id}"
+    return subject if is_room_wide(event_type, payload) else f"{subject}.private"
+
+
+def private_seats(event_type: str, payload: Dict[str, Any], wolves: List[int]) -> List[int]:
+    """非全房间事件的可见座位：定向通知给目标座位，夜间行动和队伍聊天给狼人"""
+    if event_type == "SystemNotice":
+        return list(payload.get("target_seats") or [])
+    return wolves
+
+
+class InProcessBus:
+    """进程内消息总线 - 测试与单进程部署时代替 NATS"""
+
+    def __init__(self):
+        self.messages: List[Tuple[str, Dict[str, Any], Dict[str, str]]] = []
+        self._subscriptions: List[Tuple[str, Callable[[str, Dict[str, Any]], Awaitable[None]]]] = []
+
+    async def subscribe(self, pattern: str, handler: Callable[[str, Dict[str, Any]], Awaitable[None]]):
+        """订阅主题，支持 NATS 风格通配符 * 和 >"""
+        self._subscriptions.append((pattern, handler))
+
+    async def publish(self, subject: str, data: bytes, headers: Optional[Dict[str, str]] = None):
+        """发布消息"""
+        message = json.loads(data)
+        self.messages.append((subject, message, headers or {}))
+        for pattern, handler in self._subscriptions:
+            if _subject_matches(pattern, subject):
+                await handler(subject, message)
+
+    async def close(self):
+        pass
+
+
+def _subject_matches(pattern: str, subject: str) -> bool:
+    pattern_tokens, subject_tokens = pattern.split("."), subject.split(".")
+    for position, token in enumerate(pattern_tokens):
+        if token == ">":
+            return len(subject_tokens) > position
+        if position >= len(subject_tokens) or not fnmatch.fnmatchcase(subject_tokens[position], token.replace("*", "?*")):
+            return False
+    return len(pattern_tokens) == len(subject_tokens)
+
+
+class NatsBus:
+    """NATS 消息总线"""
+
+    def __init__(self, servers: Optional[str] = None):
+        if nats is None:
+            raise RuntimeError("nats-py is required to relay events to NATS")
+        self.servers = servers or settings.nats_url
+        self._client = None
+
+    async def publish(self, subject: str, data: bytes, headers: Optional[Dict[str, str]] = None):
+        """发布消息，首次使用时建立连接"""
+        if self._client is None or self._client.is_closed:
+            self._client = await nats.connect(servers=self.servers.split(","))
+        await self._client.publish(subject, data, headers=headers)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.drain()
+            self._client = None
+
+
+class OutboxRelay:
+    """发件箱中继 - 批量读取未发布的消息并投递到消息总线"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        bus,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.session_factory = session_factory
+        self.bus = bus
+        self.batch_size = batch_size or settings.event_outbox_batch_size
+        self.poll_interval = poll_interval or settings.event_outbox_poll_interval
+        self.claim = timedelta(seconds=settings.event_outbox_claim_seconds)
+        self.published = 0
+        self.failed = 0
+
+    async def relay_once(self) -> int:
+        """投递一批待发布消息，返回成功数量
+
+        同一游戏的消息按 idx 顺序投递；某条失败后该游戏本批剩余消息留待下次重试。
+        """
+        pending = await self._claim()
+        if not pending:
+            return 0
+
+        rooms, wolves = await self._routing({game_id for _, game_id, *_ in pending})
+
+        published_ids, released_ids, failures, blocked_games = [], [], {}, set()
+        for message_id, game_id, idx, event_type, message in sorted(pending, key=lambda m: (m[1], m[2])):
+            if game_id in blocked_games:
+                released_ids.append(message_id)
+                continue
+            payload = message.get("payload") or {}
+            try:
+                room_id = rooms.get(game_id)
+                if room_id is None:
+                    raise ValueError(f"Game {game_id} has no room")
+                if not is_room_wide(event_type, payload):
+                    message = {**message, "target_seats": private_seats(event_type, payload, wolves.get(game_id, []))}
+                await self.bus.publish(
+                    subject_for(room_id, event_type, payload),
+                    json.dumps(message, ensure_ascii=False).encode(),
+                    headers={"Nats-Msg-Id": message_id}
+                )
+                published_ids.append(message_id)
+            except Exception as e:
+                blocked_games.add(game_id)
+                failures[message_id] = str(e)
+                self.failed += 1
+                logger.error(f"Failed to relay event {idx} of game {game_id}: {e}")
+
+        async with self.session_factory() as session:
+            if published_ids:
+                await session.execute(
+                    update(OutboxMessage).where(OutboxMessage.id.in_(published_ids))
+                    .values(published_at=datetime.utcnow(), claimed_until=None)
+                )
+            if released_ids:
+                await session.execute(
+                    update(OutboxMessage).where(OutboxMessage.id.in_(released_ids)).values(claimed_until=None)
+                )
+            for message_id, error in failures.items():
+                await session.execute(
+                    update(OutboxMessage).where(OutboxMessage.id == message_id)
+                    .values(attempts=OutboxMessage.attempts + 1, last_error=error, claimed_until=None)
+                )
+            await session.commit()
+
+        self.published += len(published_ids)
+        return len(published_ids)
+
+    async def _claim(self) -> List[Tuple[str, str, int, str, Dict[str, Any]]]:
+        """认领一批待发布消息并立即提交，发布期间不持有行锁
+
+        已有消息被其他中继认领中的游戏整体跳过，保证同一游戏按顺序投递。
+        """
+        now = datetime.utcnow()
+        in_flight = select(OutboxMessage.game_id).where(
+            OutboxMessage.published_at.is_(None),
+            OutboxMessage.claimed_until >= now
+        )
+        batch = (
+            select(OutboxMessage.id)
+            .where(
+                OutboxMessage.published_at.is_(None),
+                or_(OutboxMessage.claimed_until.is_(None), OutboxMessage.claimed_until < now),
+                OutboxMessage.game_id.not_in(in_flight)
+            )
+            .order_by(OutboxMessage.created_at, OutboxMessage.game_id, OutboxMessage.idx)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id.in_(batch.scalar_subquery()))
+                .values(claimed_until=now + self.claim)
+                .returning(
+                    OutboxMessage.id, OutboxMessage.game_id, OutboxMessage.idx,
+                    OutboxMessage.type, OutboxMessage.message
+                )
+                .execution_options(synchronize_session=False)
+            )).all()
+            await session.commit()
+        return [tuple(row) for row in rows]
+
+    async def _routing(self, game_ids) -> Tuple[Dict[str, str], Dict[str, List[int]]]:
+        """查询游戏所属房间和存活狼人座位（私密消息的接收者）"""
+        async with self.session_factory() as session:
+            rooms = dict((await session.execute(
+                select(Game.id, Game.room_id).where(Game.id.in_(game_ids))
+            )).all())
+            wolves: Dict[str, List[int]] = {}
+            for game_id, seat in (await session.execute(
+                select(GamePlayer.game_id, GamePlayer.seat)
+                .where(
+                    GamePlayer.game_id.in_(game_ids),
+                    GamePlayer.alignment == "Werewolf",
+                    GamePlayer.alive.is_(True)
+                )
+                .order_by(GamePlayer.seat)
+            )).all():
+                wolves.setdefault(game_id, []).append(seat)
+        return rooms, wolves
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """持续中继，直到 stop 被设置"""
+        stop = stop or asyncio.Event()
+        logger.info("Outbox relay started")
+        while not stop.is_set():
+            try:
+                relayed = await self.relay_once()
+            except Exception as e:
+                logger.error(f"Outbox relay error: {e}")
+                relayed = 0
+            if relayed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info("Outbox relay stopped")
+
+    async def purge_published(self, older_than: timedelta = timedelta(hours=1)) -> int:
+        """删除已发布且超过保留时间的消息"""
+        async with self.session_factory() as session:
+            result = await session.execute(
+                delete(OutboxMessage).where(
+                    OutboxMessage.published_at.is_not(None),
+                    OutboxMessage.published_at < datetime.utcnow() - older_than
+                )
+            )
+            await session.commit()
+            return result.rowcount
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取中继指标"""
+        return {"published": self.published, "failed": self.failed}
@@ -0,0 +1,76 @@
+"""Versioned event payload codecs
+
+Every event row records the codec its payload was written with, so chains
+written with an older codec keep verifying after the default changes:
+
+- ``json``: payload stored in the JSON column; the hash covers
+  ``json.dumps(payload, sort_keys=True)``, re-serialized on verification.
+- ``msgpack-v1``: payload canonicalized (string keys in sorted order, lists
+  for tuples) and packed once with msgpack; the bytes are stored in
+  ``payload_bin`` and hashed as-is, so verification never re-serializes.
+"""
+
+from typing import Dict, Any, Optional, Tuple, Union
+import json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+PAYLOAD_CODEC_JSON = "json"
+PAYLOAD_CODEC_MSGPACK = "msgpack-v1"
+PAYLOAD_CODECS = (PAYLOAD_CODEC_JSON, PAYLOAD_CODEC_MSGPACK)
+
+
+def canonicalize(value: Any) -> Any:
+    """规范化载荷：字典键转为字符串并排序，元组转为列表"""
+    if isinstance(value, dict):
+        items = ((str(key), canonicalize(item)) for key, item in value.items())
+        return dict(sorted(items))
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item) for item in value]
+    return value
+
+
+def encode_payload(
+    payload: Dict[str, Any],
+    codec: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[bytes], Union[str, bytes]]:
+    """编码载荷，返回 (JSON 列值, 二进制列值, 参与哈希的内容)"""
+    if codec == PAYLOAD_CODEC_JSON:
+        return payload, None, json.dumps(payload, sort_keys=True)
+    if codec == PAYLOAD_CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is required for the msgpack-v1 payload codec")
+        packed = msgpack.packb(canonicalize(payload), use_bin_type=True)
+        return None, packed, packed
+    raise ValueError(f"Unknown payload codec: {codec}")
+
+
+def decode_payload(codec: Optional[str], payload: Optional[Dict[str, Any]], payload_bin: Optional[bytes]) -> Dict[str, Any]:
+    """按行记录的编码解出载荷字典（codec 为空视为 json）"""
+    if codec in (None, PAYLOAD_CODEC_JSON):
+        return payload
+    if codec == PAYLOAD_CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is required to read msgpack-v1 payloads")
+        return msgpack.unpackb(payload_bin, raw=False)
+    raise ValueError(f"Unknown payload codec: {codec}")
+
+
+def event_payload(event: Any) -> Dict[str, Any]:
+    """读取事件记录（或含同名列的行）的载荷"""
+    return decode_payload(
+        getattr(event, "payload_codec", None), event.payload, getattr(event, "payload_bin", None)
+    )
+
+
+def hash_material(event: Any) -> Union[str, bytes]:
+    """获取校验哈希时使用的载荷内容 - 二进制编码直接使用存储的字节"""
+    codec = getattr(event, "payload_codec", None)
+    if codec in (None, PAYLOAD_CODEC_JSON):
+        return json.dumps(event.payload, sort_keys=True)
+    if codec == PAYLOAD_CODEC_MSGPACK:
+        return event.payload_bin
+    raise ValueError(f"Unknown payload codec: {codec}")
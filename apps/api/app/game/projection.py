@@ -0,0 +1,107 @@
+"""Game state projection - rebuilds GameState by folding stored events"""
+
+from typing import Dict, Any, Optional, Callable, Iterable
+from datetime import datetime
+import logging
+import random
+
+from app.game.state_machine import GameState, GamePhase
+from app.game.payload_codec import event_payload
+
+logger = logging.getLogger(__name__)
+
+
+class GameStateProjector:
+    """游戏状态投影器 - 将事件依次应用到 GameState
+
+    规则与 GameStateMachine 保持一致：投影出的状态与实时状态机在同一事件位置上相同。
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[[GameState, Dict[str, Any], datetime], None]] = {
+            "GameCreated": self._on_game_created,
+            "RolesAssigned": self._on_roles_assigned,
+            "PhaseChanged": self._on_phase_changed,
+            "Speak": self._on_speak,
+            "Vote": self._on_vote,
+            "NightAction": self._on_night_action,
+            "PlayerDied": self._on_player_died,
+            "GameEnded": self._on_game_ended,
+        }
+
+    def apply(self, state: GameState, event_type: str, payload: Dict[str, Any], timestamp: datetime):
+        """应用单个事件，无状态影响的事件类型会被忽略"""
+        handler = self._handlers.get(event_type)
+        if handler:
+            handler(state, payload or {}, timestamp)
+
+    def apply_events(self, state: GameState, events: Iterable) -> GameState:
+        """按顺序应用事件记录"""
+        for event in events:
+            self.apply(state, event.type, event_payload(event), event.timestamp)
+        return state
+
+    def _on_game_created(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        state.config = payload.get("config") or {}
+        for player in payload.get("players", []):
+            state.add_player(
+                player["seat"],
+                user_id=player.get("user_id"),
+                is_bot=player.get("is_bot", False),
+                agent_id=player.get("agent_id")
+            )
+
+    def _on_roles_assigned(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        if payload.get("seed") is not None:
+            state.seed = payload["seed"]
+            state.rng = random.Random(state.seed)
+        for assignment in payload.get("assignments", []):
+            state.set_role(assignment["seat"], assignment["role"], assignment["alignment"])
+        state.current_phase = GamePhase.NIGHT
+        state.current_round = 1
+
+    def _on_phase_changed(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        phase = GamePhase(payload["to_phase"])
+        state.current_phase = phase
+        state.current_round = payload.get("round_number", state.current_round)
+        state.phase_start_time = timestamp
+        deadline = payload.get("deadline")
+        state.phase_deadline = datetime.fromtimestamp(deadline / 1000) if deadline else None
+
+        # Clear phase-specific data
+        if phase in [GamePhase.VOTE, GamePhase.TRIAL]:
+            state.votes.clear()
+        elif phase == GamePhase.NIGHT:
+            state.night_actions.clear()
+        elif phase == GamePhase.DAY_TALK:
+            state.speakers_done.clear()
+
+    def _on_speak(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        if payload.get("finished") and payload.get("phase") == GamePhase.DAY_TALK.value:
+            state.speakers_done.add(payload["seat"])
+
+    def _on_vote(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        state.votes[payload["seat"]] = payload.get("target_seat")
+
+    def _on_night_action(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        state.night_actions[payload["seat"]] = {
+            "action": payload["action"],
+            "target_seat": payload.get("target_seat"),
+            "actor_role": payload.get("role")
+        }
+
+    def _on_player_died(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        state.mark_dead(payload["seat"])
+
+    def _on_game_ended(self, state: GameState, payload: Dict[str, Any], timestamp: datetime):
+        state.current_phase = GamePhase.END
+        state.winner = payload.get("winner")
+
+
+projector = GameStateProjector()
+
+
+def rebuild_state(game_id: str, snapshot: Optional[Dict[str, Any]], events: Iterable) -> GameState:
+    """从快照（可为空）加尾部事件重建游戏状态"""
+    state = GameState.from_snapshot(snapshot) if snapshot else GameState(game_id, {})
+    return projector.apply_events(state, events)
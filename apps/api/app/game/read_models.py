@@ -0,0 +1,161 @@
+"""Read-model projection - keeps narrow, indexed tables in sync with the event stream
+
+Agents and analytics read chat, night actions, deaths and private notes from
+these tables with plain column lookups instead of scanning JSON payloads of
+the events table. Rows are derived only from events, written in the same
+transaction as the events themselves, and can be rebuilt at any time. Games
+that were running before the tables existed are filled in by
+``backfill_read_models``.
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Iterable, Type
+import argparse
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import (
+    ChatMessageRecord, NightActionRecord, DeathRecord, PrivateNoteRecord, Game, Event as EventModel
+)
+
+logger = logging.getLogger(__name__)
+
+READ_MODELS = (ChatMessageRecord, NightActionRecord, DeathRecord, PrivateNoteRecord)
+
+
+def needs_inspectors(rows: Iterable[Dict[str, Any]]) -> bool:
+    """判断是否需要查验者映射（含查验结果的夜晚结算）"""
+    return any(
+        row["type"] == "NightResult" and ((row["payload"] or {}).get("results") or {}).get("inspected")
+        for row in rows
+    )
+
+
+class ReadModelProjector:
+    """读模型投影器 - 将事件行转换为读模型表的待插入行
+
+    inspectors 为 被查验座位 -> 预言家座位 的映射，用于把查验结果投递给查验者；
+    投影过程中遇到的 inspect 行动会更新该映射，因此可以跨批次复用。
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, Callable[[Dict[str, Any], Dict[str, Any], Dict[int, int], Dict[Type, List[Dict[str, Any]]]], None]] = {
+            "Speak": self._on_speak,
+            "NightAction": self._on_night_action,
+            "PlayerDied": self._on_player_died,
+            "SystemNotice": self._on_system_notice,
+            "NightResult": self._on_night_result,
+        }
+
+    def project(
+        self,
+        rows: Iterable[Dict[str, Any]],
+        inspectors: Optional[Dict[int, int]] = None
+    ) -> Dict[Type, List[Dict[str, Any]]]:
+        """投影事件行，返回 模型 -> 行列表（只包含非空的表）"""
+        inspectors = {} if inspectors is None else inspectors
+        output: Dict[Type, List[Dict[str, Any]]] = {}
+        for row in rows:
+            handler = self._handlers.get(row["type"])
+            if handler:
+                handler(row, row["payload"] or {}, inspectors, output)
+        return output
+
+    @staticmethod
+    def _base(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {"game_id": row["game_id"], "idx": row["idx"], "created_at": row["timestamp"]}
+
+    def _on_speak(self, row, payload, inspectors, output):
+        output.setdefault(ChatMessageRecord, []).append({
+            **self._base(row),
+            "seat": payload.get("seat"),
+            "phase": payload.get("phase"),
+            "visibility": payload.get("visibility", "public"),
+            "content": payload.get("content", "")
+        })
+
+    def _on_night_action(self, row, payload, inspectors, output):
+        output.setdefault(NightActionRecord, []).append({
+            **self._base(row),
+            "seat": payload["seat"],
+            "role": payload.get("role"),
+            "action": payload["action"],
+            "target_seat": payload.get("target_seat")
+        })
+        if payload["action"] == "inspect" and payload.get("target_seat") is not None:
+            inspectors[payload["target_seat"]] = payload["seat"]
+
+    def _on_player_died(self, row, payload, inspectors, output):
+        output.setdefault(DeathRecord, []).append({
+            **self._base(row),
+            "seat": payload["seat"],
+            "cause": payload.get("cause", "died")
+        })
+
+    def _on_system_notice(self, row, payload, inspectors, output):
+        target_seats = payload.get("target_seats")
+        for seat in (target_seats if target_seats is not None else [None]):
+            output.setdefault(PrivateNoteRecord, []).append({
+                **self._base(row),
+                "seat": seat,
+                "content": payload.get("message", "")
+            })
+
+    def _on_night_result(self, row, payload, inspectors, output):
+        results = payload.get("results") or {}
+
+        # Keys are ints in memory but strings once the payload went through JSON
+        for target, alignment in (results.get("inspected") or {}).items():
+            seer_seat = inspectors.get(int(target))
+            if seer_seat is None:
+                logger.warning(f"No inspector found for seat {target} in game {row['game_id']}")
+                continue
+            output.setdefault(PrivateNoteRecord, []).append({
+                **self._base(row),
+                "seat": seer_seat,
+                "content": f"你查验了{int(target)}号玩家，结果：{alignment}阵营"
+            })
+
+        for seat in results.get("saved", []):
+            output.setdefault(PrivateNoteRecord, []).append({
+                **self._base(row),
+                "seat": seat,
+                "content": "你被女巫救了！"
+            })
+
+
+read_model_projector = ReadModelProjector()
+
+
+def backfill_read_models(db: Session, game_ids: Optional[List[str]] = None) -> int:
+    """为进行中的游戏从事件日志重建读模型，返回重建的游戏数"""
+    from app.game.event_sourcing import EventStore
+
+    if game_ids is None:
+        game_ids = db.execute(
+            select(Game.id).where(
+                Game.ended_at.is_(None),
+                Game.id.in_(select(EventModel.game_id).distinct())
+            )
+        ).scalars().all()
+
+    event_store = EventStore(db)
+    for game_id in game_ids:
+        event_store.rebuild_read_models(game_id)
+
+    logger.info(f"Backfilled read models for {len(game_ids)} games")
+    return len(game_ids)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild read models of running games recorded before the read-model tables")
+    parser.add_argument("game_ids", nargs="*", help="Games to rebuild (default: every game that has not ended)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    with SessionLocal() as db:
+        backfill_read_models(db, args.game_ids or None)
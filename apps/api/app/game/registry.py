@@ -0,0 +1,70 @@
+"""Process-level game registry - one GameService and state machine per API worker
+
+Every game hosted by this process lives in the registry's single
+``GameStateMachine``; requests are routed to it by game_id and games that
+are not resident (e.g. after a restart) are rebuilt from the event log on
+first use. The service opens its own session per unit of work, so it never
+holds on to a request-scoped session.
+"""
+
+from typing import Dict, Any, Optional
+import logging
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import AsyncSessionLocal
+from app.game.game_service import GameService
+from app.game.room_index import GameRoomIndex
+from app.game.state_machine import GameState
+from app.websocket_manager import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+
+class GameRegistry:
+    """游戏注册表 - 持有进程内唯一的游戏服务，按 game_id 路由"""
+
+    def __init__(self, ws_manager: ConnectionManager = manager, session_factory: async_sessionmaker = AsyncSessionLocal):
+        self.ws_manager = ws_manager
+        self.session_factory = session_factory
+        self._service: Optional[GameService] = None
+
+    @property
+    def service(self) -> GameService:
+        """获取游戏服务，首次使用时创建并挂到 WebSocket 管理器"""
+        if self._service is None:
+            self._service = GameService(self.ws_manager, self.session_factory)
+            if self.ws_manager is not None:
+                self.ws_manager.game_service = self._service
+            logger.info("Game registry initialized")
+        return self._service
+
+    @property
+    def rooms(self) -> GameRoomIndex:
+        """游戏 <-> 房间映射缓存（广播与 WebSocket 行动使用）"""
+        return self.service.rooms
+    
+    async def get_game(self, game_id: str) -> Optional[GameState]:
+        """按 game_id 获取游戏状态，不在内存中时从事件日志重建"""
+        return await self.service.load_game(game_id)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取注册表指标"""
+        if self._service is None:
+            return {"active_games": 0, "loading_games": 0}
+        return {
+            "active_games": len(self._service.state_machine.games),
+            "loading_games": len(self._service._loading),
+            **self._service.actors.get_metrics(),
+            **self._service.timers.get_metrics(),
+            **self._service.leases.get_metrics(),
+            **self._service.rooms.get_metrics()
+        }
+
+
+game_registry = GameRegistry()
+
+
+def get_game_service() -> GameService:
+    """FastAPI 依赖 - 获取进程内的游戏服务"""
+    return game_registry.service
@@ -0,0 +1,62 @@
+"""In-memory game <-> room index used on the broadcast and WebSocket action paths
+
+Every event is broadcast to its game's room and every WebSocket action has to
+find the room's current game; both used to cost a database query. The index
+is filled when a game is created and dropped once its GameEnded event has
+been handled. Running games created by an earlier process are looked up once
+on first use and cached from then on; ended games are never cached again.
+"""
+
+from typing import Dict, Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class GameRoomIndex:
+    """游戏 <-> 房间映射缓存"""
+
+    def __init__(self):
+        self._game_rooms: Dict[str, str] = {}  # game_id -> room_id
+        self._room_games: Dict[str, str] = {}  # room_id -> current game_id
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, game_id: str, room_id: str, current: bool = True):
+        """记录游戏所属房间；current 表示该游戏是房间当前的游戏"""
+        self._game_rooms[game_id] = room_id
+        if current:
+            self._room_games[room_id] = game_id
+
+    def remove(self, game_id: str):
+        """游戏结束后移除映射"""
+        room_id = self._game_rooms.pop(game_id, None)
+        if room_id is not None and self._room_games.get(room_id) == game_id:
+            del self._room_games[room_id]
+
+    def room_of(self, game_id: str) -> Optional[str]:
+        """获取游戏所属房间，未缓存时返回 None"""
+        room_id = self._game_rooms.get(game_id)
+        self._count(room_id)
+        return room_id
+
+    def game_of(self, room_id: str) -> Optional[str]:
+        """获取房间当前的游戏，未缓存时返回 None"""
+        game_id = self._room_games.get(room_id)
+        self._count(game_id)
+        return game_id
+
+    def _count(self, value: Optional[str]):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取缓存指标"""
+        return {
+            "cached_games": len(self._game_rooms),
+            "cached_rooms": len(self._room_games),
+            "room_cache_hits": self.hits,
+            "room_cache_misses": self.misses
+        }
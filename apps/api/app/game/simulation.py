@@ -0,0 +1,347 @@
+"""Headless batch simulation for role-balance analysis
+
+Encodes N games of one lineup as NumPy arrays (roles, alive mask, night
+actions, votes) and steps them with the rules of ``GameStateMachine``:
+``resolve_night`` (guard -> kill -> save -> poison) and ``resolve_vote``
+(strict plurality, ties and abstentions execute nobody), with the win check
+of ``GameState.is_game_over`` after every resolution. Seat ``i`` of the
+arrays is seat ``i + 1`` of a real game.
+
+Behaviour is supplied by a policy (``RandomPolicy``, ``HeuristicPolicy``)
+that produces the night actions and votes of every seat in every game at
+once. Results report win rates per lineup with a Wilson confidence interval.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence
+from dataclasses import dataclass
+import argparse
+import logging
+import math
+
+import numpy as np
+
+from app.game.state_machine import GameStateMachine
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("Villager", "Werewolf", "Seer", "Witch", "Guard", "Hunter", "Idiot")
+ROLE_CODES = {role: code for code, role in enumerate(ROLES)}
+WEREWOLF = ROLE_CODES["Werewolf"]
+
+NO_ACTION, KILL, INSPECT, SAVE, POISON, GUARD = range(6)
+ACTIONS = (None, "kill", "inspect", "save", "poison", "guard")
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS) if action}
+NO_TARGET = -1
+
+# VALID_ACTIONS[role, action] mirrors GameStateMachine._get_valid_night_actions
+VALID_ACTIONS = np.zeros((len(ROLES), len(ACTIONS)), dtype=bool)
+for _role, _code in ROLE_CODES.items():
+    for _action in GameStateMachine()._get_valid_night_actions(_role):
+        VALID_ACTIONS[_code, ACTION_CODES[_action]] = True
+
+VILLAGE_WIN, WEREWOLF_WIN, UNFINISHED = 0, 1, 2
+
+
+def encode_lineup(roles: Sequence[str]) -> np.ndarray:
+    """将角色列表编码为角色码数组"""
+    unknown = [role for role in roles if role not in ROLE_CODES]
+    if unknown:
+        raise ValueError(f"Unknown roles in lineup: {unknown}")
+    if WEREWOLF not in [ROLE_CODES[role] for role in roles]:
+        raise ValueError("Lineup needs at least one Werewolf")
+    return np.array([ROLE_CODES[role] for role in roles], dtype=np.int8)
+
+
+class BatchState:
+    """N 局游戏的批量状态"""
+
+    def __init__(self, roles: np.ndarray):
+        n_games, n_seats = roles.shape
+        self.roles = roles  # (N, S) role codes
+        self.werewolf = roles == WEREWOLF  # (N, S)
+        self.alive = np.ones((n_games, n_seats), dtype=bool)
+        self.inspected = np.zeros((n_games, n_seats), dtype=bool)  # seats the seer has checked
+        self.winner = np.full(n_games, UNFINISHED, dtype=np.int8)
+        self.rounds = np.zeros(n_games, dtype=np.int16)
+
+    @property
+    def n_games(self) -> int:
+        return self.roles.shape[0]
+
+    @property
+    def n_seats(self) -> int:
+        return self.roles.shape[1]
+
+    @property
+    def active(self) -> np.ndarray:
+        """尚未结束的游戏"""
+        return self.winner == UNFINISHED
+
+
+def check_game_over(state: BatchState) -> np.ndarray:
+    """批量胜负判断（同 is_game_over），记录新结束游戏的胜方，返回仍在进行的游戏"""
+    wolves = (state.alive & state.werewolf).sum(axis=1)
+    villagers = (state.alive & ~state.werewolf).sum(axis=1)
+    active = state.active
+    state.winner[active & (wolves == 0)] = VILLAGE_WIN
+    state.winner[active & (wolves > 0) & (wolves >= villagers)] = WEREWOLF_WIN
+    return state.active
+
+
+def resolve_night(state: BatchState, actions: np.ndarray, targets: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """批量结算夜间行动（同 resolve_night），返回本夜死亡掩码 (N, S)
+
+    actions/targets 为每个座位的行动码与目标座位下标；死亡行动者、无效行动与
+    死亡目标按 submit_night_action 的校验丢弃。mask 限定参与结算的游戏。
+    """
+    rows = np.arange(state.n_games)[:, None]
+    has_target = targets >= 0
+    safe_targets = np.where(has_target, targets, 0)
+    valid = (
+        state.alive & has_target & state.alive[rows, safe_targets]
+        & VALID_ACTIONS[state.roles, actions]
+    )
+    if mask is not None:
+        valid &= mask[:, None]
+
+    def targeted(action: int) -> np.ndarray:
+        hit = np.zeros_like(state.alive)
+        game, seat = np.nonzero(valid & (actions == action))
+        hit[game, targets[game, seat]] = True
+        return hit
+
+    died = targeted(KILL) & ~targeted(GUARD)
+    died &= ~targeted(SAVE)
+    died |= targeted(POISON)
+
+    game, seat = np.nonzero(valid & (actions == INSPECT))
+    state.inspected[game, targets[game, seat]] = True
+
+    state.alive &= ~died
+    return died
+
+
+def resolve_vote(state: BatchState, votes: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """批量结算投票（同 resolve_vote），返回被处决的座位下标，无人处决为 -1"""
+    rows = np.arange(state.n_games)[:, None]
+    safe_votes = np.where(votes >= 0, votes, 0)
+    valid = state.alive & (votes >= 0) & state.alive[rows, safe_votes]
+    if mask is not None:
+        valid &= mask[:, None]
+
+    counts = np.zeros(state.alive.shape, dtype=np.int16)
+    game, seat = np.nonzero(valid)
+    np.add.at(counts, (game, votes[game, seat]), 1)
+
+    top = counts.max(axis=1)
+    majority = (top > 0) & ((counts == top[:, None]).sum(axis=1) == 1)
+    executed = np.where(majority, counts.argmax(axis=1), NO_TARGET)
+
+    hit = np.nonzero(majority)[0]
+    state.alive[hit, executed[hit]] = False
+    return executed
+
+
+def pick_seats(rng: np.random.Generator, candidates: np.ndarray) -> np.ndarray:
+    """在候选掩码的最后一维上均匀抽取一个座位下标，无候选时为 -1"""
+    scores = rng.random(candidates.shape, dtype=np.float32)
+    scores[~candidates] = -1.0
+    picked = scores.argmax(axis=-1)
+    return np.where(candidates.any(axis=-1), picked, NO_TARGET)
+
+
+def _others(state: BatchState) -> np.ndarray:
+    """(N, S, S) 掩码：行动者之外的存活座位"""
+    candidates = np.repeat(state.alive[:, None, :], state.n_seats, axis=1)
+    candidates[:, np.arange(state.n_seats), np.arange(state.n_seats)] = False
+    return candidates
+
+
+class RandomPolicy:
+    """随机策略 - 每个有夜间行动的角色对随机存活目标行动，投票随机"""
+
+    def night_actions(self, state: BatchState, rng: np.random.Generator):
+        roles = state.roles
+        actions = np.full(roles.shape, NO_ACTION, dtype=np.int8)
+        actions[roles == WEREWOLF] = KILL
+        actions[roles == ROLE_CODES["Seer"]] = INSPECT
+        actions[roles == ROLE_CODES["Guard"]] = GUARD
+        witch = roles == ROLE_CODES["Witch"]
+        actions[witch] = np.where(rng.random(witch.sum()) < 0.5, SAVE, POISON)
+        targets = pick_seats(rng, _others(state))
+        return actions, np.where(actions != NO_ACTION, targets, NO_TARGET)
+
+    def votes(self, state: BatchState, rng: np.random.Generator) -> np.ndarray:
+        return pick_seats(rng, _others(state))
+
+
+class HeuristicPolicy:
+    """启发式策略 - 狼人统一刀一名好人，预言家不重复查验，
+    女巫按概率救下狼刀目标或毒人；查出的狼人公开后好人集中投票"""
+
+    def __init__(self, save_rate: float = 0.5, poison_rate: float = 0.2):
+        self.save_rate = save_rate
+        self.poison_rate = poison_rate
+
+    def night_actions(self, state: BatchState, rng: np.random.Generator):
+        roles = state.roles
+        n_games = state.n_games
+        actions = np.full(roles.shape, NO_ACTION, dtype=np.int8)
+        targets = np.full(roles.shape, NO_TARGET, dtype=np.int16)
+        others = _others(state)
+
+        victim = pick_seats(rng, state.alive & ~state.werewolf)
+        actions[state.werewolf] = KILL
+        targets[state.werewolf] = np.broadcast_to(victim[:, None], roles.shape)[state.werewolf]
+
+        seer = roles == ROLE_CODES["Seer"]
+        actions[seer] = INSPECT
+        targets[seer] = pick_seats(rng, others & ~state.inspected[:, None, :])[seer]
+
+        guard = roles == ROLE_CODES["Guard"]
+        actions[guard] = GUARD
+        targets[guard] = pick_seats(rng, np.repeat(state.alive[:, None, :], state.n_seats, axis=1))[guard]
+
+        witch = roles == ROLE_CODES["Witch"]
+        roll = rng.random(n_games)[:, None]
+        save = witch & (roll < self.save_rate)
+        poison = witch & (roll >= self.save_rate) & (roll < self.save_rate + self.poison_rate)
+        actions[save] = SAVE
+        targets[save] = np.broadcast_to(victim[:, None], roles.shape)[save]
+        actions[poison] = POISON
+        targets[poison] = pick_seats(rng, others)[poison]
+
+        return actions, targets
+
+    def votes(self, state: BatchState, rng: np.random.Generator) -> np.ndarray:
+        votes = pick_seats(rng, _others(state))
+
+        exposed = state.alive & state.werewolf & state.inspected
+        suspect = pick_seats(rng, exposed)
+        has_suspect = (suspect >= 0)[:, None]
+        village_votes = np.where(has_suspect, suspect[:, None], votes)
+        votes = np.where(state.werewolf, votes, village_votes)
+
+        wolf_pick = pick_seats(rng, state.alive & ~state.werewolf)
+        votes = np.where(state.werewolf, wolf_pick[:, None], votes)
+        return votes
+
+
+POLICIES = {"random": RandomPolicy, "heuristic": HeuristicPolicy}
+
+
+@dataclass
+class SimulationResult:
+    """单个阵容的模拟结果"""
+    lineup: List[str]
+    games: int
+    village_wins: int
+    werewolf_wins: int
+    unfinished: int
+    average_rounds: float
+
+    def win_rate(self, side: str = "Village") -> float:
+        """胜率（未结束的对局计入分母）"""
+        wins = self.village_wins if side == "Village" else self.werewolf_wins
+        return wins / self.games if self.games else 0.0
+
+    def confidence_interval(self, side: str = "Village", z: float = 1.96) -> tuple[float, float]:
+        """胜率的 Wilson 置信区间"""
+        if not self.games:
+            return 0.0, 1.0
+        p = self.win_rate(side)
+        denominator = 1 + z * z / self.games
+        center = (p + z * z / (2 * self.games)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / self.games + z * z / (4 * self.games ** 2)) / denominator
+        return max(0.0, center - margin), min(1.0, center + margin)
+
+    def to_dict(self) -> Dict[str, Any]:
+        low, high = self.confidence_interval("Village")
+        return {
+            "lineup": self.lineup,
+            "games": self.games,
+            "village_win_rate": self.win_rate("Village"),
+            "village_win_ci": [low, high],
+            "werewolf_win_rate": self.win_rate("Werewolf"),
+            "unfinished": self.unfinished,
+            "average_rounds": self.average_rounds
+        }
+
+
+def deal_roles(lineup: np.ndarray, n_games: int, rng: np.random.Generator) -> np.ndarray:
+    """为每局随机分配座位上的角色"""
+    return rng.permuted(np.tile(lineup, (n_games, 1)), axis=1)
+
+
+def run_batch(state: BatchState, policy, rng: np.random.Generator, max_rounds: int = 50) -> BatchState:
+    """将一批游戏推进到结束（或达到最大回合数）"""
+    active = check_game_over(state)
+    for _ in range(max_rounds):
+        if not active.any():
+            break
+        state.rounds[active] += 1
+
+        actions, targets = policy.night_actions(state, rng)
+        resolve_night(state, actions, targets, mask=active)
+        active = check_game_over(state)
+
+        resolve_vote(state, policy.votes(state, rng), mask=active)
+        active = check_game_over(state)
+    return state
+
+
+def simulate_lineup(
+    roles: Sequence[str],
+    games: int,
+    policy=None,
+    seed: Optional[int] = None,
+    batch_size: int = 10000,
+    max_rounds: int = 50
+) -> SimulationResult:
+    """模拟一个阵容的 games 局对局"""
+    lineup = encode_lineup(roles)
+    policy = policy or RandomPolicy()
+    rng = np.random.default_rng(seed)
+
+    winners, rounds = [], []
+    for start in range(0, games, batch_size):
+        state = BatchState(deal_roles(lineup, min(batch_size, games - start), rng))
+        run_batch(state, policy, rng, max_rounds)
+        winners.append(state.winner)
+        rounds.append(state.rounds)
+
+    winner = np.concatenate(winners) if winners else np.zeros(0, dtype=np.int8)
+    played = np.concatenate(rounds) if rounds else np.zeros(0, dtype=np.int16)
+    return SimulationResult(
+        lineup=list(roles),
+        games=games,
+        village_wins=int((winner == VILLAGE_WIN).sum()),
+        werewolf_wins=int((winner == WEREWOLF_WIN).sum()),
+        unfinished=int((winner == UNFINISHED).sum()),
+        average_rounds=float(played.mean()) if games else 0.0
+    )
+
+
+def compare_lineups(lineups: List[Sequence[str]], games: int, policy=None, seed: Optional[int] = None, **kwargs) -> List[SimulationResult]:
+    """模拟多个阵容，按好人胜率与 0.5 的接近程度排序（越平衡越靠前）"""
+    rng = np.random.default_rng(seed)
+    results = [
+        simulate_lineup(lineup, games, policy, seed=int(rng.integers(2 ** 32)), **kwargs)
+        for lineup in lineups
+    ]
+    return sorted(results, key=lambda result: abs(result.win_rate("Village") - 0.5))
+
+
+if __name__ == "__main__":
+    import json
+
+    parser = argparse.ArgumentParser(description="Estimate win rates of role lineups by batch simulation")
+    parser.add_argument("lineups", nargs="+", help="Comma-separated roles, e.g. Werewolf,Werewolf,Seer,Witch,Villager,Villager")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="heuristic")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    for result in compare_lineups([lineup.split(",") for lineup in args.lineups], args.games, POLICIES[args.policy](), args.seed):
+        print(json.dumps(result.to_dict(), ensure_ascii=False))
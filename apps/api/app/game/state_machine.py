@@ -1,9 +1,11 @@
 """Game state machine implementation"""
 
 from enum import Enum
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, Iterable, FrozenSet
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
+import random
 
 logger = logging.getLogger(__name__)
 
@@ -19,58 +21,402 @@ class GamePhase(str, Enum):
     DAY_RESULT = "DayResult"
     END = "End"
 
+class Player:
+    """玩家记录 - 紧凑的槽位对象，兼容按键读取（player["role"] / player.get("alive")）"""
+    
+    __slots__ = ("seat", "user_id", "role", "alignment", "alive", "is_bot", "agent_id")
+    
+    def __init__(
+        self,
+        seat: int,
+        user_id: Optional[str] = None,
+        role: Optional[str] = None,
+        alignment: Optional[str] = None,
+        alive: bool = True,
+        is_bot: bool = False,
+        agent_id: Optional[str] = None
+    ):
+        self.seat = seat
+        self.user_id = user_id
+        self.role = role
+        self.alignment = alignment
+        self.alive = alive
+        self.is_bot = is_bot
+        self.agent_id = agent_id
+    
+    @classmethod
+    def from_dict(cls, seat: int, data: Dict[str, Any]) -> "Player":
+        """从玩家信息字典创建"""
+        return cls(
+            seat=seat,
+            user_id=data.get("user_id"),
+            role=data.get("role"),
+            alignment=data.get("alignment"),
+            alive=data.get("alive", True),
+            is_bot=data.get("is_bot", False),
+            agent_id=data.get("agent_id")
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为玩家信息字典"""
+        return {field: getattr(self, field) for field in self.__slots__}
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.__slots__ else default
+    
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Player):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    def __repr__(self) -> str:
+        return f"Player({self.to_dict()})"
+
+
+def _is_seat(seat: Any) -> bool:
+    """是否为合法座位号（从 1 开始的整数，bool 除外）"""
+    return isinstance(seat, int) and not isinstance(seat, bool) and seat >= 1
+
+
+def _seats(mask: int) -> List[int]:
+    """将座位位图展开为升序座位列表"""
+    seats = []
+    while mask:
+        low = mask & -mask
+        seats.append(low.bit_length() - 1)
+        mask ^= low
+    return seats
+
+
 class GameState:
-    """游戏状态"""
+    """游戏状态
+    
+    存活与阵营信息以座位位图维护：存活判断与胜负判断为 O(1)。
+    玩家只能通过 players 整体赋值、add_player、set_role 与 mark_dead 修改，以保持位图同步。
+    """
     
-    def __init__(self, game_id: str, config: Dict[str, Any]):
+    __slots__ = (
+        "game_id", "config", "current_phase", "current_round", "phase_start_time", "phase_deadline",
+        "votes", "night_actions", "speakers_done", "dead_players", "winner", "seed", "rng",
+        "_players", "_alive_mask", "_role_masks", "_alignment_masks"
+    )
+    
+    def __init__(self, game_id: str, config: Dict[str, Any], seed: Optional[str] = None):
         self.game_id = game_id
         self.config = config
+        self.seed = seed
+        self.rng = random.Random(seed)  # per-game RNG, seeded from Game.seed so the game can be re-executed
         self.current_phase = GamePhase.LOBBY
         self.current_round = 0
-        self.players: Dict[int, Dict[str, Any]] = {}  # seat -> player_info
+        self._players: Dict[int, Player] = {}  # seat -> player
+        self._alive_mask = 0
+        self._role_masks: Dict[str, int] = {}  # role -> seats bitmap
+        self._alignment_masks: Dict[str, int] = {}  # alignment -> seats bitmap
         self.phase_start_time: Optional[datetime] = None
         self.phase_deadline: Optional[datetime] = None
         self.votes: Dict[int, Optional[int]] = {}  # voter_seat -> target_seat
         self.night_actions: Dict[int, Dict[str, Any]] = {}  # actor_seat -> action
+        self.speakers_done: Set[int] = set()  # seats that finished speaking this day
         self.dead_players: List[int] = []
         self.winner: Optional[str] = None
+    
+    @property
+    def players(self) -> Dict[int, Player]:
+        """座位 -> 玩家（只读使用；修改请通过 add_player / set_role / mark_dead）"""
+        return self._players
+    
+    @players.setter
+    def players(self, players: Dict[int, Any]):
+        self._players = {}
+        self._alive_mask = 0
+        self._role_masks = {}
+        self._alignment_masks = {}
+        for seat, player in players.items():
+            if not _is_seat(seat):
+                raise ValueError(f"Invalid seat {seat!r}")
+            player = Player.from_dict(seat, player if isinstance(player, dict) else player.to_dict())
+            self._players[seat] = player
+            self._index(player)
+    
+    def _index(self, player: Player):
+        bit = 1 << player.seat
+        if player.alive:
+            self._alive_mask |= bit
+        if player.role is not None:
+            self._role_masks[player.role] = self._role_masks.get(player.role, 0) | bit
+        if player.alignment is not None:
+            self._alignment_masks[player.alignment] = self._alignment_masks.get(player.alignment, 0) | bit
+    
+    def _unindex(self, player: Player):
+        bit = ~(1 << player.seat)
+        self._alive_mask &= bit
+        if player.role in self._role_masks:
+            self._role_masks[player.role] &= bit
+        if player.alignment in self._alignment_masks:
+            self._alignment_masks[player.alignment] &= bit
+    
+    def add_player(self, seat: int, **fields: Any) -> Player:
+        """添加（或替换）玩家"""
+        if not _is_seat(seat):
+            raise ValueError(f"Invalid seat {seat!r}")
+        existing = self._players.get(seat)
+        if existing is not None:
+            self._unindex(existing)
+        player = Player(seat, **fields)
+        self._players[seat] = player
+        self._index(player)
+        return player
+    
+    def set_role(self, seat: int, role: str, alignment: str) -> Player:
+        """设置玩家角色与阵营，玩家不存在时创建"""
+        player = self._players.get(seat)
+        if player is None:
+            return self.add_player(seat, role=role, alignment=alignment)
+        self._unindex(player)
+        player.role = role
+        player.alignment = alignment
+        self._index(player)
+        return player
+    
+    def mark_dead(self, seat: int):
+        """标记玩家死亡并更新存活位图"""
+        if not _is_seat(seat):
+            return
+        player = self._players.get(seat)
+        if player is not None and player.alive:
+            player.alive = False
+            self._alive_mask &= ~(1 << seat)
+        if seat not in self.dead_players:
+            self.dead_players.append(seat)
+    
+    def is_alive(self, seat: int) -> bool:
+        """玩家是否存活"""
+        return _is_seat(seat) and seat in self._players and bool(self._alive_mask >> seat & 1)
+    
+    def count_alive(self, alignment: Optional[str] = None) -> int:
+        """存活人数，可按阵营过滤"""
+        mask = self._alive_mask
+        if alignment is not None:
+            mask &= self._alignment_masks.get(alignment, 0)
+        return mask.bit_count()
         
     def get_alive_players(self) -> List[int]:
         """获取存活玩家座位列表"""
-        return [seat for seat, player in self.players.items() 
-                if player.get("alive", True)]
+        return _seats(self._alive_mask)
     
     def get_players_by_role(self, role: str) -> List[int]:
         """获取指定角色的玩家座位列表"""
-        return [seat for seat, player in self.players.items() 
-                if player.get("role") == role and player.get("alive", True)]
+        return _seats(self._role_masks.get(role, 0) & self._alive_mask)
     
     def get_players_by_alignment(self, alignment: str) -> List[int]:
         """获取指定阵营的玩家座位列表"""
-        return [seat for seat, player in self.players.items() 
-                if player.get("alignment") == alignment and player.get("alive", True)]
+        return _seats(self._alignment_masks.get(alignment, 0) & self._alive_mask)
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """序列化为可存储的快照"""
+        return {
+            "game_id": self.game_id,
+            "config": self.config,
+            "current_phase": self.current_phase.value,
+            "current_round": self.current_round,
+            "players": {str(seat): player.to_dict() for seat, player in self.players.items()},
+            "phase_start_time": self.phase_start_time.isoformat() if self.phase_start_time else None,
+            "phase_deadline": self.phase_deadline.isoformat() if self.phase_deadline else None,
+            "votes": {str(voter): target for voter, target in self.votes.items()},
+            "night_actions": {str(seat): dict(action) for seat, action in self.night_actions.items()},
+            "speakers_done": sorted(self.speakers_done),
+            "dead_players": list(self.dead_players),
+            "winner": self.winner,
+            "seed": self.seed
+        }
+    
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "GameState":
+        """从快照恢复游戏状态"""
+        state = cls(data["game_id"], data.get("config") or {}, data.get("seed"))
+        state.current_phase = GamePhase(data["current_phase"])
+        state.current_round = data["current_round"]
+        state.players = {int(seat): dict(player) for seat, player in data["players"].items()}
+        if data.get("phase_start_time"):
+            state.phase_start_time = datetime.fromisoformat(data["phase_start_time"])
+        if data.get("phase_deadline"):
+            state.phase_deadline = datetime.fromisoformat(data["phase_deadline"])
+        state.votes = {int(voter): target for voter, target in data["votes"].items()}
+        state.night_actions = {int(seat): dict(action) for seat, action in data["night_actions"].items()}
+        state.speakers_done = set(data.get("speakers_done", []))
+        state.dead_players = list(data["dead_players"])
+        state.winner = data.get("winner")
+        return state
+    
+    def restore(self, data: Dict[str, Any]):
+        """就地恢复为快照时的状态（已持有该对象的引用保持有效）"""
+        restored = self.from_snapshot(data)
+        for name in self.__slots__:
+            if name != "rng":
+                setattr(self, name, getattr(restored, name))
     
     def is_game_over(self) -> tuple[bool, Optional[str]]:
         """检查游戏是否结束，返回 (is_over, winner)"""
-        alive_werewolves = self.get_players_by_alignment("Werewolf")
-        alive_villagers = self.get_players_by_alignment("Village")
+        alive_werewolves = self.count_alive("Werewolf")
+        alive_villagers = self.count_alive("Village")
         
         if not alive_werewolves:
             return True, "Village"
-        elif len(alive_werewolves) >= len(alive_villagers):
+        elif alive_werewolves >= alive_villagers:
             return True, "Werewolf"
         else:
             return False, None
 
+# Role tables, built once; roles missing from them have no night action and side with the village
+WEREWOLF_ROLES = frozenset({"Werewolf"})
+ROLE_NIGHT_ACTIONS: Dict[str, Tuple[str, ...]] = {
+    "Werewolf": ("kill",),
+    "Seer": ("inspect",),
+    "Witch": ("save", "poison"),
+    "Guard": ("guard",),
+    "Hunter": (),  # No night action
+    "Villager": (),  # No night action
+    "Idiot": ()  # No night action
+}
+
+
+class _NightContext:
+    """单次夜间结算的中间状态"""
+    
+    __slots__ = ("game", "results", "guarded", "deaths")
+    
+    def __init__(self, game: GameState):
+        self.game = game
+        self.results = {
+            "killed": [],
+            "saved": [],
+            "poisoned": [],
+            "guarded": [],
+            "inspected": {}
+        }
+        self.guarded = set()
+        self.deaths: Dict[int, None] = {}  # ordered set of seats dying tonight
+
+
+def _guard(ctx: _NightContext, target: int):
+    ctx.guarded.add(target)
+    ctx.results["guarded"].append(target)
+
+
+def _kill(ctx: _NightContext, target: int):
+    # Several werewolves on one target kill it once
+    if target not in ctx.guarded and target not in ctx.deaths:
+        ctx.deaths[target] = None
+        ctx.results["killed"].append(target)
+
+
+def _save(ctx: _NightContext, target: int):
+    if target in ctx.deaths:
+        del ctx.deaths[target]
+        ctx.results["killed"].remove(target)
+        ctx.results["saved"].append(target)
+
+
+def _poison(ctx: _NightContext, target: int):
+    if target not in ctx.deaths:  # Don't double-kill
+        ctx.deaths[target] = None
+        ctx.results["poisoned"].append(target)
+
+
+def _inspect(ctx: _NightContext, target: int):
+    target_player = ctx.game.players.get(target)
+    if target_player:
+        ctx.results["inspected"][target] = target_player.alignment
+
+
+# Handlers in resolution order: guard -> kill -> save -> poison -> inspect
+NIGHT_ACTION_HANDLERS: Tuple[Tuple[str, Callable[[_NightContext, int], None]], ...] = (
+    ("guard", _guard),
+    ("kill", _kill),
+    ("save", _save),
+    ("poison", _poison),
+    ("inspect", _inspect),
+)
+
+
+class NightResolver:
+    """夜间结算器 - 按优先级排列的处理表，只包含给定角色可用的行动
+    
+    结算时对行动做一次遍历，按优先级分桶，再依次执行各桶，每个行动只处理一次。
+    """
+    
+    def __init__(self, actions: Iterable[str]):
+        actions = set(actions)
+        self._handlers = [handler for action, handler in NIGHT_ACTION_HANDLERS if action in actions]
+        self._buckets = {
+            action: index
+            for index, action in enumerate(action for action, _ in NIGHT_ACTION_HANDLERS if action in actions)
+        }
+    
+    def resolve(self, game: GameState) -> Dict[str, Any]:
+        """结算并应用死亡，返回结算结果"""
+        buckets: List[List[int]] = [[] for _ in self._handlers]
+        for action_data in game.night_actions.values():
+            index = self._buckets.get(action_data["action"])
+            if index is not None and action_data["target_seat"]:
+                buckets[index].append(action_data["target_seat"])
+        
+        ctx = _NightContext(game)
+        for handler, targets in zip(self._handlers, buckets):
+            for target in targets:
+                handler(ctx, target)
+        
+        for seat in ctx.deaths:
+            game.mark_dead(seat)
+        return ctx.results
+
+
+def _all_voted(game: GameState) -> bool:
+    return all(seat in game.votes for seat in game.get_alive_players())
+
+
+def _all_night_roles_acted(game: GameState) -> bool:
+    return all(
+        seat in game.night_actions
+        for role, actions in ROLE_NIGHT_ACTIONS.items() if actions
+        for seat in game.get_players_by_role(role)
+    )
+
+
+def _all_speakers_finished(game: GameState) -> bool:
+    return all(seat in game.speakers_done for seat in game.get_alive_players())
+
+
+# Phases that may end before their deadline once every required player has acted
+PHASE_COMPLETION_PREDICATES: Dict[GamePhase, Callable[[GameState], bool]] = {
+    GamePhase.VOTE: _all_voted,
+    GamePhase.NIGHT: _all_night_roles_acted,
+    GamePhase.DAY_TALK: _all_speakers_finished,
+}
+
+
+@lru_cache(maxsize=256)
+def get_night_resolver(roles: FrozenSet[str]) -> NightResolver:
+    """获取角色组合对应的夜间结算器（按角色集合缓存）"""
+    if not roles:
+        return NightResolver(action for action, _ in NIGHT_ACTION_HANDLERS)
+    return NightResolver(action for role in roles for action in ROLE_NIGHT_ACTIONS.get(role, ()))
+
+
 class GameStateMachine:
     """游戏状态机"""
     
     def __init__(self):
         self.games: Dict[str, GameState] = {}
         
-    def create_game(self, game_id: str, config: Dict[str, Any]) -> GameState:
-        """创建游戏"""
-        game_state = GameState(game_id, config)
+    def create_game(self, game_id: str, config: Dict[str, Any], seed: Optional[str] = None) -> GameState:
+        """创建游戏，seed 为游戏记录的随机种子"""
+        game_state = GameState(game_id, config, seed)
         self.games[game_id] = game_state
         logger.info(f"Created game {game_id}")
         return game_state
@@ -79,34 +425,43 @@ class GameStateMachine:
         """获取游戏状态"""
         return self.games.get(game_id)
     
+    def register_game(self, game_state: GameState) -> GameState:
+        """注册已重建的游戏状态"""
+        self.games[game_state.game_id] = game_state
+        logger.info(f"Registered game {game_state.game_id} at {game_state.current_phase} round {game_state.current_round}")
+        return game_state
+    
+    def remove_game(self, game_id: str) -> Optional[GameState]:
+        """移除游戏状态，释放内存"""
+        return self.games.pop(game_id, None)
+    
     def assign_roles(self, game_id: str, players: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """分配角色"""
         game = self.get_game(game_id)
         if not game:
             raise ValueError(f"Game {game_id} not found")
         
-        roles = game.config.get("roles", [])
+        roles = list(game.config.get("roles", []))
         if len(players) != len(roles):
             raise ValueError("Player count doesn't match role count")
         
-        import random
-        random.shuffle(roles)
+        # Shuffle a copy with the game's own RNG, in seat order, so the deal is reproducible from the seed
+        game.rng.shuffle(roles)
         
         role_assignments = []
-        for i, player in enumerate(players):
+        for i, player in enumerate(sorted(players, key=lambda p: p["seat"])):
             seat = player["seat"]
             role = roles[i]
             alignment = self._get_alignment(role)
             
-            game.players[seat] = {
-                "user_id": player["user_id"],
-                "seat": seat,
-                "role": role,
-                "alignment": alignment,
-                "alive": True,
-                "is_bot": player.get("is_bot", False),
-                "agent_id": player.get("agent_id")
-            }
+            game.add_player(
+                seat,
+                user_id=player["user_id"],
+                role=role,
+                alignment=alignment,
+                is_bot=player.get("is_bot", False),
+                agent_id=player.get("agent_id")
+            )
             
             role_assignments.append({
                 "seat": seat,
@@ -142,6 +497,8 @@ class GameStateMachine:
             game.votes.clear()
         elif phase == GamePhase.NIGHT:
             game.night_actions.clear()
+        elif phase == GamePhase.DAY_TALK:
+            game.speakers_done.clear()
         
         logger.info(f"Game {game_id}: Started phase {phase}, deadline {game.phase_deadline}")
         
@@ -161,10 +518,10 @@ class GameStateMachine:
         if game.current_phase != GamePhase.VOTE:
             raise ValueError("Not in voting phase")
         
-        if voter_seat not in game.get_alive_players():
+        if not game.is_alive(voter_seat):
             raise ValueError("Voter is not alive")
         
-        if target_seat is not None and target_seat not in game.get_alive_players():
+        if target_seat is not None and not game.is_alive(target_seat):
             raise ValueError("Target is not alive")
         
         game.votes[voter_seat] = target_seat
@@ -192,18 +549,17 @@ class GameStateMachine:
         if game.current_phase != GamePhase.NIGHT:
             raise ValueError("Not in night phase")
         
-        actor = game.players.get(actor_seat)
-        if not actor or not actor.get("alive", True):
+        if not game.is_alive(actor_seat):
             raise ValueError("Actor is not alive")
         
         # Validate action based on role
-        role = actor.get("role")
+        role = game.players[actor_seat].role
         valid_actions = self._get_valid_night_actions(role)
         
         if action not in valid_actions:
             raise ValueError(f"Action {action} not valid for role {role}")
         
-        if target_seat is not None and target_seat not in game.get_alive_players():
+        if target_seat is not None and not game.is_alive(target_seat):
             raise ValueError("Target is not alive")
         
         game.night_actions[actor_seat] = {
@@ -220,6 +576,29 @@ class GameStateMachine:
             "target_seat": target_seat
         }
     
+    def finish_speech(self, game_id: str, seat: int):
+        """标记玩家本轮发言结束"""
+        game = self.get_game(game_id)
+        if not game:
+            raise ValueError(f"Game {game_id} not found")
+        
+        if game.current_phase != GamePhase.DAY_TALK:
+            raise ValueError("Not in talk phase")
+        
+        if not game.is_alive(seat):
+            raise ValueError("Player is not alive")
+        
+        game.speakers_done.add(seat)
+    
+    def is_phase_complete(self, game_id: str) -> bool:
+        """当前阶段所有需要行动的玩家是否都已行动（可提前结束）"""
+        game = self.get_game(game_id)
+        if not game:
+            return False
+        
+        predicate = PHASE_COMPLETION_PREDICATES.get(game.current_phase)
+        return predicate is not None and predicate(game)
+    
     def resolve_vote(self, game_id: str) -> Dict[str, Any]:
         """结算投票"""
         game = self.get_game(game_id)
@@ -252,8 +631,7 @@ class GameStateMachine:
         executed_seat = tied_players[0]
         
         # Execute player
-        game.players[executed_seat]["alive"] = False
-        game.dead_players.append(executed_seat)
+        game.mark_dead(executed_seat)
         
         logger.info(f"Game {game_id}: Executed player {executed_seat}")
         
@@ -269,61 +647,8 @@ class GameStateMachine:
         if not game:
             raise ValueError(f"Game {game_id} not found")
         
-        results = {
-            "killed": [],
-            "saved": [],
-            "poisoned": [],
-            "guarded": [],
-            "inspected": {}
-        }
-        
-        # Process actions in order: guard -> kill -> save -> poison -> inspect
-        guarded_players = set()
-        
-        # Guard actions
-        for actor_seat, action_data in game.night_actions.items():
-            if action_data["action"] == "guard" and action_data["target_seat"]:
-                guarded_players.add(action_data["target_seat"])
-                results["guarded"].append(action_data["target_seat"])
-        
-        # Kill actions
-        kill_targets = set()
-        for actor_seat, action_data in game.night_actions.items():
-            if action_data["action"] == "kill" and action_data["target_seat"]:
-                target = action_data["target_seat"]
-                if target not in guarded_players:
-                    kill_targets.add(target)
-                    results["killed"].append(target)
-        
-        # Save actions (witch)
-        for actor_seat, action_data in game.night_actions.items():
-            if action_data["action"] == "save" and action_data["target_seat"]:
-                target = action_data["target_seat"]
-                if target in kill_targets:
-                    kill_targets.remove(target)
-                    results["killed"].remove(target)
-                    results["saved"].append(target)
-        
-        # Poison actions (witch)
-        for actor_seat, action_data in game.night_actions.items():
-            if action_data["action"] == "poison" and action_data["target_seat"]:
-                target = action_data["target_seat"]
-                if target not in kill_targets:  # Don't double-kill
-                    kill_targets.add(target)
-                    results["poisoned"].append(target)
-        
-        # Inspect actions (seer)
-        for actor_seat, action_data in game.night_actions.items():
-            if action_data["action"] == "inspect" and action_data["target_seat"]:
-                target = action_data["target_seat"]
-                target_player = game.players.get(target)
-                if target_player:
-                    results["inspected"][target] = target_player["alignment"]
-        
-        # Apply deaths
-        for seat in kill_targets:
-            game.players[seat]["alive"] = False
-            game.dead_players.append(seat)
+        roles = game.config.get("roles") or [player.role for player in game.players.values() if player.role]
+        results = get_night_resolver(frozenset(roles)).resolve(game)
         
         logger.info(f"Game {game_id}: Night results: {results}")
         
@@ -368,20 +693,8 @@ class GameStateMachine:
     
     def _get_alignment(self, role: str) -> str:
         """获取角色的阵营"""
-        werewolf_roles = {"Werewolf"}
-        if role in werewolf_roles:
-            return "Werewolf"
-        return "Village"
+        return "Werewolf" if role in WEREWOLF_ROLES else "Village"
     
-    def _get_valid_night_actions(self, role: str) -> List[str]:
+    def _get_valid_night_actions(self, role: str) -> Tuple[str, ...]:
         """获取角色的有效夜间行动"""
-        role_actions = {
-            "Werewolf": ["kill"],
-            "Seer": ["inspect"],
-            "Witch": ["save", "poison"],
-            "Guard": ["guard"],
-            "Hunter": [],  # No night action
-            "Villager": [],  # No night action
-            "Idiot": []  # No night action
-        }
-        return role_actions.get(role, [])
\ No newline at end of file
+        return ROLE_NIGHT_ACTIONS.get(role, ())
@@ -0,0 +1,176 @@
+"""Game summaries - maintained incrementally as events are appended
+
+The ``game_summaries`` row of a game is created with its first events and
+then touched once per append: a plain ``total_events`` update for ordinary
+events, and a fold of the new events for batches containing PhaseChanged or
+GameEnded. Summary reads are therefore a single primary-key lookup. Games
+recorded before the table existed are filled in by ``backfill_summaries``.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Mapping, Tuple
+from datetime import datetime
+from contextlib import closing
+import argparse
+import logging
+
+from sqlalchemy import select, insert, update, union
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import GameSummary, Event as EventModel, ArchivedGame
+
+logger = logging.getLogger(__name__)
+
+# Event types that change anything besides total_events
+SUMMARY_EVENT_TYPES = {"PhaseChanged", "GameEnded"}
+
+# (idx, type, timestamp, payload)
+SummaryEvent = Tuple[int, str, datetime, Dict[str, Any]]
+
+
+def new_summary(game_id: str) -> Dict[str, Any]:
+    """创建空摘要（列值形式）"""
+    return {
+        "game_id": game_id,
+        "total_events": 0,
+        "start_time": None,
+        "end_time": None,
+        "winner": None,
+        "rounds": 0,
+        "current_phase": None,
+        "phases": []
+    }
+
+
+def _summary_columns():
+    return [GameSummary.__table__.c[name] for name in new_summary("")]
+
+
+def summary_select(game_id: str):
+    """按主键读取摘要列（不经过 Session 身份映射，避免读到过期对象）"""
+    return select(*_summary_columns()).where(GameSummary.game_id == game_id)
+
+
+def summary_values(row: Mapping[str, Any]) -> Dict[str, Any]:
+    """将查询结果转换为可修改的列值字典"""
+    values = dict(row)
+    values["phases"] = list(values["phases"] or [])
+    return values
+
+
+def needs_fold(rows: List[Dict[str, Any]]) -> bool:
+    """新事件是否需要读取并折叠现有摘要"""
+    return rows[0]["idx"] > 0 and any(row["type"] in SUMMARY_EVENT_TYPES for row in rows)
+
+
+def summary_statement(game_id: str, rows: List[Dict[str, Any]], current: Optional[Mapping[str, Any]]):
+    """生成维护摘要的语句：首批事件插入，含阶段事件时折叠，否则只更新事件数
+
+    current 为 needs_fold 时读取的现有摘要；摘要缺失（尚未回填）时返回 None。
+    """
+    now = datetime.utcnow()
+    events = [(row["idx"], row["type"], row["timestamp"], row["payload"]) for row in rows]
+
+    if rows[0]["idx"] == 0:
+        return insert(GameSummary).values(**fold_summary(new_summary(game_id), events), updated_at=now)
+
+    if needs_fold(rows):
+        if current is None:
+            logger.debug(f"No summary for game {game_id} yet, leaving it to the backfill")
+            return None
+        return update(GameSummary).where(GameSummary.game_id == game_id).values(
+            **fold_summary(summary_values(current), events), updated_at=now
+        )
+
+    return update(GameSummary).where(GameSummary.game_id == game_id).values(
+        total_events=rows[-1]["idx"] + 1, updated_at=now
+    )
+
+
+def fold_summary(summary: Dict[str, Any], events: Iterable[SummaryEvent]) -> Dict[str, Any]:
+    """将按 idx 排序的事件折叠进摘要"""
+    for idx, event_type, timestamp, payload in events:
+        if summary["start_time"] is None:
+            summary["start_time"] = timestamp
+        summary["total_events"] = max(summary["total_events"], idx + 1)
+
+        if event_type == "GameEnded":
+            summary["end_time"] = timestamp
+            summary["winner"] = payload.get("winner")
+        elif event_type == "PhaseChanged":
+            summary["rounds"] = max(summary["rounds"], payload.get("round_number", 0))
+            summary["current_phase"] = payload.get("to_phase")
+            summary["phases"].append({
+                "phase": payload.get("to_phase"),
+                "round": payload.get("round_number"),
+                "timestamp": timestamp.isoformat()
+            })
+    return summary
+
+
+def summary_to_dict(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """摘要的对外表示"""
+    return {
+        "game_id": summary["game_id"],
+        "total_events": summary["total_events"],
+        "start_time": summary["start_time"].isoformat() if summary["start_time"] else None,
+        "end_time": summary["end_time"].isoformat() if summary["end_time"] else None,
+        "winner": summary["winner"],
+        "rounds": summary["rounds"],
+        "current_phase": summary["current_phase"],
+        "phases": summary["phases"]
+    }
+
+
+def list_summaries(db: Session, limit: int = 50, before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """按开始时间倒序列出游戏摘要，before 为上一页最后一条的开始时间（键集分页）"""
+    query = select(*_summary_columns()).where(GameSummary.start_time.is_not(None))
+    if before is not None:
+        query = query.where(GameSummary.start_time < before)
+    rows = db.execute(query.order_by(GameSummary.start_time.desc()).limit(limit)).mappings().all()
+    return [summary_to_dict(summary_values(row)) for row in rows]
+
+
+def backfill_summaries(db: Session, game_ids: Optional[List[str]] = None) -> int:
+    """为缺少摘要的游戏从事件日志（含冷存储）构建摘要，返回构建数量"""
+    from app.game.event_sourcing import EventStore
+    from app.game.payload_codec import event_payload
+
+    if game_ids is None:
+        with_events = union(
+            select(EventModel.game_id).distinct(),
+            select(ArchivedGame.game_id)
+        ).subquery()
+        game_ids = db.execute(
+            select(with_events.c.game_id).where(
+                with_events.c.game_id.not_in(select(GameSummary.game_id))
+            )
+        ).scalars().all()
+
+    event_store = EventStore(db)
+    built = 0
+    for game_id in game_ids:
+        with closing(event_store.iter_events(game_id)) as events:
+            summary = fold_summary(new_summary(game_id), (
+                (event.idx, event.type, event.timestamp, event_payload(event)) for event in events
+            ))
+        if summary["total_events"] == 0:
+            continue
+
+        db.merge(GameSummary(**summary, updated_at=datetime.utcnow()))
+        db.commit()
+        built += 1
+
+    logger.info(f"Backfilled summaries for {built} games")
+    return built
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Build game summaries for games recorded before the summaries table")
+    parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    with SessionLocal() as db:
+        backfill_summaries(db)
@@ -0,0 +1,140 @@
+"""Durable phase timers - deadlines on the ``games`` row, fired under a worker lease
+
+The deadline of every running phase is stored in ``games.phase_deadline``
+together with the worker that holds its timer (``timer_owner``) and how long
+that claim is valid (``timer_lease_until``). The worker that opens a phase
+takes the lease in the same transaction and keeps it alive with a periodic
+bulk renewal. Workers scan for timers whose lease is missing or expired (the
+owner crashed or shut down) and claim them in one UPDATE, so after a restart
+every pending or overdue deadline is re-armed.
+
+Before a timer fires, its worker re-claims the row inside the command's
+transaction; if another worker holds a live lease the firing is skipped, so
+each deadline is acted on by one worker only. Lease expiry is compared with
+each worker's clock, so worker clocks are assumed to be roughly in sync.
+"""
+
+from typing import Dict, Any, List, Optional
+from dataclasses import dataclass
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import uuid
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.config import settings
+from app.database import Game
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+@dataclass
+class PendingTimer:
+    """从数据库认领的阶段计时器"""
+    game_id: str
+    phase: str
+    round_number: int
+    deadline: datetime
+
+
+class PhaseTimerLeases:
+    """阶段计时器租约 - 持久化截止时间并保证每个计时器只由一个工作进程触发"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        worker_id: str = WORKER_ID,
+        lease_seconds: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.worker_id = worker_id
+        self.lease = timedelta(seconds=lease_seconds or settings.phase_timer_lease_seconds)
+        self.recovered = 0
+        self.skipped = 0
+
+    def hold(self, game_record: Game, deadline: Optional[datetime]):
+        """在游戏记录上写入阶段截止时间并由本进程持有租约（随所在事务提交）"""
+        game_record.phase_deadline = deadline
+        if deadline is None:
+            game_record.timer_owner = None
+            game_record.timer_lease_until = None
+        else:
+            game_record.timer_owner = self.worker_id
+            game_record.timer_lease_until = datetime.utcnow() + self.lease
+
+    @asynccontextmanager
+    async def _autocommit(self):
+        """单语句自动提交的连接 - 不跨 await 持有写锁（SQLite 下不会阻塞同步请求）"""
+        async with self.session_factory() as session:
+            yield await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+
+    async def claim_pending(self) -> List[PendingTimer]:
+        """批量认领无人持有或租约过期的计时器"""
+        now = datetime.utcnow()
+        async with self._autocommit() as connection:
+            rows = (await connection.execute(
+                update(Game)
+                .where(
+                    Game.phase_deadline.is_not(None),
+                    Game.ended_at.is_(None),
+                    or_(Game.timer_owner.is_(None), Game.timer_lease_until < now)
+                )
+                .values(timer_owner=self.worker_id, timer_lease_until=now + self.lease)
+                .returning(Game.id, Game.current_phase, Game.current_round, Game.phase_deadline)
+            )).all()
+
+        self.recovered += len(rows)
+        return [PendingTimer(game_id, phase, round_number, deadline) for game_id, phase, round_number, deadline in rows]
+
+    async def renew(self) -> int:
+        """续期本进程持有的所有租约"""
+        async with self._autocommit() as connection:
+            result = await connection.execute(
+                update(Game)
+                .where(Game.timer_owner == self.worker_id, Game.phase_deadline.is_not(None))
+                .values(timer_lease_until=datetime.utcnow() + self.lease)
+            )
+            return result.rowcount
+
+    async def claim_for_fire(self, session: AsyncSession, game_id: str) -> bool:
+        """触发前在命令事务中认领计时器；其他进程持有有效租约时返回 False"""
+        now = datetime.utcnow()
+        result = await session.execute(
+            update(Game)
+            .where(
+                Game.id == game_id,
+                or_(Game.timer_owner.is_(None), Game.timer_owner == self.worker_id, Game.timer_lease_until < now)
+            )
+            .values(timer_owner=self.worker_id, timer_lease_until=now + self.lease)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return True
+
+        # Games without a row have nothing to lease
+        owner = await session.scalar(select(Game.timer_owner).where(Game.id == game_id))
+        if owner is None:
+            return True
+        self.skipped += 1
+        logger.info(f"Phase timer of game {game_id} is leased by {owner}, skipping")
+        return False
+
+    async def release(self) -> int:
+        """释放本进程的所有租约（正常关闭时），其他进程可立即接管"""
+        async with self._autocommit() as connection:
+            result = await connection.execute(
+                update(Game)
+                .where(Game.timer_owner == self.worker_id)
+                .values(timer_owner=None, timer_lease_until=None)
+            )
+            return result.rowcount
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取租约指标"""
+        return {"timers_recovered": self.recovered, "timer_fires_skipped": self.skipped}
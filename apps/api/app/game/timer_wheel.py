@@ -0,0 +1,202 @@
+"""Hierarchical timer wheel - one scheduler task for all phase deadlines of a worker
+
+Timers are keyed (e.g. ``(game_id, phase, round)``) and placed in the slot of
+the wheel level whose span covers their remaining delay; arming, re-arming and
+cancelling a key are O(1) dict operations. A single driver task advances the
+wheel one tick at a time on the monotonic clock. When a lower level wraps, the
+matching slot of the level above is cascaded down, so each timer is touched at
+most once per level. Delays beyond the top level are parked in its last slot
+and re-placed when it cascades.
+
+Due callbacks are started as their own tasks so a slow callback never delays
+the wheel. The driver sleeps while no timer is armed.
+"""
+
+from typing import Dict, Any, Hashable, List, Optional, Callable, Awaitable, Tuple
+import asyncio
+import logging
+import math
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Slots per level: 256 ticks, then 64 x 256 ticks, then 64 x 64 x 256 ticks
+WHEEL_LEVELS = (256, 64, 64)
+
+
+class TimerHandle:
+    """已布置的计时器"""
+    __slots__ = ("key", "deadline", "tick", "callback", "slot")
+
+    def __init__(self, key: Hashable, deadline: float, tick: int, callback: Callable[[], Awaitable[Any]]):
+        self.key = key
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        # The slot dict currently holding this handle
+        self.slot: Optional[Dict[Hashable, "TimerHandle"]] = None
+
+
+class TimerWheel:
+    """分层时间轮 - 按键 O(1) 布置/取消，单个任务按单调时钟触发"""
+
+    def __init__(self, tick: Optional[float] = None, levels: Tuple[int, ...] = WHEEL_LEVELS):
+        self.tick = tick or settings.phase_timer_tick
+        self.levels = levels
+        # Ticks covered by one slot of each level
+        self._spans = [math.prod(levels[:level]) for level in range(len(levels))]
+        self._wheels: List[List[Dict[Hashable, TimerHandle]]] = [[{} for _ in range(size)] for size in levels]
+        self._due: Dict[Hashable, TimerHandle] = {}
+        self._timers: Dict[Hashable, TimerHandle] = {}
+        self._origin = time.monotonic()
+        self._current = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: set = set()
+
+        self.fired = 0
+        self.cancelled = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def arm(self, key: Hashable, delay: float, callback: Callable[[], Awaitable[Any]]) -> TimerHandle:
+        """布置计时器（delay 秒后触发），同键的旧计时器被替换"""
+        self.cancel(key, count=False)
+        now = time.monotonic()
+        if not self._timers:
+            # Empty wheel: skip the ticks that passed while the driver slept
+            self._current = max(self._current, math.floor((now - self._origin) / self.tick))
+        deadline = now + max(delay, 0.0)
+        handle = TimerHandle(key, deadline, math.ceil((deadline - self._origin) / self.tick), callback)
+        self._timers[key] = handle
+        self._place(handle)
+        self._ensure_driver()
+        self._wakeup.set()
+        return handle
+
+    def cancel(self, key: Hashable, count: bool = True) -> bool:
+        """取消计时器，返回是否存在"""
+        handle = self._timers.pop(key, None)
+        if handle is None:
+            return False
+        handle.slot.pop(key, None)
+        handle.slot = None
+        if count:
+            self.cancelled += 1
+        return True
+
+    def _place(self, handle: TimerHandle):
+        """按剩余 tick 数放入对应层级的槽位"""
+        delta = handle.tick - self._current
+        if delta <= 0:
+            slot = self._due
+        else:
+            top = len(self.levels) - 1
+            for level in range(len(self.levels)):
+                if delta < self._spans[level] * self.levels[level] or level == top:
+                    break
+            # Beyond the top level: park in its furthest slot and re-place on cascade
+            tick = min(handle.tick, self._current + self._spans[top] * (self.levels[top] - 1))
+            slot = self._wheels[level][(tick // self._spans[level]) % self.levels[level]]
+        slot[handle.key] = handle
+        handle.slot = slot
+
+    def _advance(self) -> List[TimerHandle]:
+        """前进一个 tick，返回到期的计时器"""
+        self._current += 1
+        # Cascade from the top so re-placed timers can fall through to level 0
+        for level in range(len(self.levels) - 1, 0, -1):
+            if self._current % self._spans[level] == 0:
+                slot = self._wheels[level][(self._current // self._spans[level]) % self.levels[level]]
+                handles = list(slot.values())
+                slot.clear()
+                for handle in handles:
+                    self._place(handle)
+
+        slot = self._wheels[0][self._current % self.levels[0]]
+        due = list(self._due.values()) + list(slot.values())
+        self._due.clear()
+        slot.clear()
+        return due
+
+    def _fire(self, handles: List[TimerHandle]):
+        now = time.monotonic()
+        for handle in handles:
+            del self._timers[handle.key]
+            handle.slot = None
+            lag = max(now - handle.deadline, 0.0)
+            self.fired += 1
+            self._lag_total += lag
+            self._lag_max = max(self._lag_max, lag)
+            task = asyncio.create_task(self._run_callback(handle))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _run_callback(self, handle: TimerHandle):
+        try:
+            await handle.callback()
+        except Exception as e:
+            logger.error(f"Timer {handle.key} callback failed: {e}")
+
+    def _ensure_driver(self):
+        """确保驱动任务在当前事件循环中运行"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._drive())
+
+    async def _drive(self):
+        """驱动时间轮：补齐落后的 tick，无计时器时休眠"""
+        while True:
+            if not self._timers:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if self._due:
+                self._fire(list(self._due.values()))
+                self._due.clear()
+                continue
+
+            target = math.floor((time.monotonic() - self._origin) / self.tick)
+            while self._current < target:
+                due = self._advance()
+                if due:
+                    self._fire(due)
+
+            self._wakeup.clear()
+            next_tick = self._origin + (self._current + 1) * self.tick
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(next_tick - time.monotonic(), 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        """停止驱动任务并丢弃所有计时器"""
+        for key in list(self._timers):
+            self.cancel(key, count=False)
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取计时器指标"""
+        return {
+            "armed_timers": len(self._timers),
+            "timers_fired": self.fired,
+            "timers_cancelled": self.cancelled,
+            "firing_lag_max_ms": round(self._lag_max * 1000, 3),
+            "firing_lag_avg_ms": round(self._lag_total / self.fired * 1000, 3) if self.fired else 0.0
+        }
@@ -0,0 +1,253 @@
+"""Semantic replay verification - re-executes recorded games through a fresh state machine
+
+The hash chain proves the event log was not altered; this verifier checks
+that the log is also *consistent with the rules*. Starting from GameCreated
+and the recorded seed it deals roles with the game's own RNG, feeds every
+recorded Vote and NightAction back through ``GameStateMachine`` and compares
+what the rules produce with the recorded RolesAssigned, NightResult,
+VoteResult, PlayerDied, PhaseChanged and GameEnded events.
+
+Verification of a log is pure CPU work, so ``verify_games`` loads the logs
+in bounded batches and fans each batch out over a process pool.
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+import argparse
+import json
+import logging
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Game
+from app.game.state_machine import GameStateMachine, GamePhase
+from app.game.payload_codec import event_payload
+
+logger = logging.getLogger(__name__)
+
+# (idx, type, payload)
+LoggedEvent = Tuple[int, str, Dict[str, Any]]
+
+
+@dataclass
+class VerificationResult:
+    """单局验证结果"""
+    game_id: str
+    events: int = 0
+    mismatches: List[str] = field(default_factory=list)
+    # Recorded before seeds were stored: the deal cannot be re-derived, only the rest of the game
+    legacy: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatches
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "game_id": self.game_id, "ok": self.ok, "events": self.events,
+            "mismatches": self.mismatches, "legacy": self.legacy
+        }
+
+
+def _normalize(value: Any) -> Any:
+    """按存储后的形式比较（整数键变为字符串等）"""
+    return json.loads(json.dumps(value, sort_keys=True))
+
+
+class ReplayVerifier:
+    """重放验证器 - 用全新状态机重新执行一局的玩家行动"""
+
+    def __init__(self, game_id: str):
+        self.game_id = game_id
+        self.state_machine = GameStateMachine()
+        self.result = VerificationResult(game_id)
+        self._players: List[Dict[str, Any]] = []
+        self._pending_deaths: List[Tuple[int, str]] = []
+        self._first_phase = True
+        self._handlers = {
+            "GameCreated": self._on_game_created,
+            "RolesAssigned": self._on_roles_assigned,
+            "PhaseChanged": self._on_phase_changed,
+            "Vote": self._on_vote,
+            "NightAction": self._on_night_action,
+            "VoteResult": self._on_vote_result,
+            "NightResult": self._on_night_result,
+            "PlayerDied": self._on_player_died,
+            "GameEnded": self._on_game_ended,
+        }
+
+    def verify(self, events: Iterable[LoggedEvent]) -> VerificationResult:
+        """按 idx 顺序验证事件"""
+        for idx, event_type, payload in events:
+            self.result.events += 1
+            handler = self._handlers.get(event_type)
+            if handler is None:
+                continue
+            try:
+                handler(idx, payload or {})
+            except (ValueError, KeyError) as e:
+                self._mismatch(idx, event_type, f"rejected by the rules: {e!r}")
+
+        if self._pending_deaths:
+            self._mismatch(None, "PlayerDied", f"missing deaths {self._pending_deaths}")
+        return self.result
+
+    def _mismatch(self, idx: Optional[int], event_type: str, message: str):
+        self.result.mismatches.append(f"#{idx} {event_type}: {message}")
+
+    def _expect(self, idx: int, event_type: str, what: str, expected: Any, recorded: Any):
+        if _normalize(expected) != _normalize(recorded):
+            self._mismatch(idx, event_type, f"{what} expected {expected!r}, recorded {recorded!r}")
+
+    @property
+    def _state(self):
+        state = self.state_machine.get_game(self.game_id)
+        if state is None:
+            raise ValueError("event recorded before GameCreated")
+        return state
+
+    def _on_game_created(self, idx: int, payload: Dict[str, Any]):
+        self.state_machine.create_game(self.game_id, dict(payload.get("config") or {}))
+        self._players = payload.get("players", [])
+
+    def _on_roles_assigned(self, idx: int, payload: Dict[str, Any]):
+        state = self._state
+        state.seed = payload.get("seed")
+        state.rng.seed(state.seed)
+
+        assignments = self.state_machine.assign_roles(self.game_id, self._players)
+        recorded = sorted(payload.get("assignments", []), key=lambda a: a["seat"])
+        if state.seed is None:
+            # Unseeded legacy game: the deal came from OS entropy and cannot be reproduced
+            self.result.legacy = True
+        else:
+            self._expect(idx, "RolesAssigned", "assignments", assignments, recorded)
+
+        # Keep checking the rest of the game against what was actually dealt
+        for assignment in recorded:
+            state.set_role(assignment["seat"], assignment["role"], assignment["alignment"])
+
+    def _on_phase_changed(self, idx: int, payload: Dict[str, Any]):
+        to_phase = GamePhase(payload["to_phase"])
+        if self._first_phase:
+            # start_game opens the first night directly, later phases come from advance_to_next_phase
+            self._first_phase = False
+            self.state_machine.start_phase(self.game_id, to_phase)
+        else:
+            if self._pending_deaths:
+                self._mismatch(idx, "PlayerDied", f"missing deaths {self._pending_deaths}")
+                self._pending_deaths = []
+            self.state_machine.advance_to_next_phase(self.game_id)
+            self._expect(idx, "PhaseChanged", "phase", self._state.current_phase.value, payload["to_phase"])
+
+        state = self._state
+        self._expect(idx, "PhaseChanged", "round", state.current_round, payload.get("round_number"))
+        if state.current_phase != to_phase:
+            # Follow the log so one divergence does not cascade
+            state.current_phase = to_phase
+            state.current_round = payload.get("round_number", state.current_round)
+
+    def _on_vote(self, idx: int, payload: Dict[str, Any]):
+        self.state_machine.submit_vote(self.game_id, payload["seat"], payload.get("target_seat"))
+
+    def _on_night_action(self, idx: int, payload: Dict[str, Any]):
+        self.state_machine.submit_night_action(
+            self.game_id, payload["seat"], payload["action"], payload.get("target_seat")
+        )
+
+    def _on_vote_result(self, idx: int, payload: Dict[str, Any]):
+        votes = dict(self._state.votes)
+        result = self.state_machine.resolve_vote(self.game_id)
+        self._expect(idx, "VoteResult", "votes", votes, payload.get("votes"))
+        self._expect(idx, "VoteResult", "executed seat", result.get("executed_seat"), payload.get("executed_seat"))
+        self._expect(idx, "VoteResult", "reason", result.get("reason", "unknown"), payload.get("reason"))
+        if result.get("executed_seat"):
+            self._pending_deaths.append((result["executed_seat"], "voted"))
+
+    def _on_night_result(self, idx: int, payload: Dict[str, Any]):
+        results = self.state_machine.resolve_night(self.game_id)
+        self._expect(idx, "NightResult", "results", results, payload.get("results"))
+        self._pending_deaths.extend((seat, "killed") for seat in results["killed"])
+        self._pending_deaths.extend((seat, "poisoned") for seat in results["poisoned"])
+
+    def _on_player_died(self, idx: int, payload: Dict[str, Any]):
+        death = (payload.get("seat"), payload.get("cause"))
+        if self._pending_deaths and self._pending_deaths[0] == death:
+            self._pending_deaths.pop(0)
+        else:
+            self._mismatch(idx, "PlayerDied", f"unexpected death {death}")
+
+    def _on_game_ended(self, idx: int, payload: Dict[str, Any]):
+        self._expect(idx, "GameEnded", "winner", self._state.winner or "unknown", payload.get("winner"))
+
+
+def verify_event_log(game_id: str, events: List[LoggedEvent]) -> VerificationResult:
+    """验证一局的事件日志（可在子进程中执行）"""
+    return ReplayVerifier(game_id).verify(events)
+
+
+def _verify_log(log: Tuple[str, List[LoggedEvent]]) -> VerificationResult:
+    return verify_event_log(*log)
+
+
+def load_event_log(db: Session, game_id: str) -> List[LoggedEvent]:
+    """读取一局的事件日志（含冷存储）"""
+    from app.game.event_sourcing import EventStore
+
+    with closing(EventStore(db).iter_events(game_id)) as events:
+        return [(event.idx, event.type, event_payload(event)) for event in events]
+
+
+def verify_games(
+    db: Session,
+    game_ids: Optional[List[str]] = None,
+    workers: Optional[int] = None
+) -> List[VerificationResult]:
+    """并行验证多局游戏，默认验证所有已开始的游戏；workers=1 时在当前进程执行"""
+    if game_ids is None:
+        game_ids = db.execute(
+            select(Game.id).where(Game.started_at.is_not(None)).order_by(Game.started_at)
+        ).scalars().all()
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [_verify_log((game_id, load_event_log(db, game_id))) for game_id in game_ids]
+    else:
+        # Executor.map drains its input up front, so only hand it one batch of loaded logs at a time
+        batch_size = workers * 8
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start in range(0, len(game_ids), batch_size):
+                logs = [(game_id, load_event_log(db, game_id)) for game_id in game_ids[start:start + batch_size]]
+                results.extend(pool.map(_verify_log, logs, chunksize=8))
+
+    failed = [result.game_id for result in results if not result.ok]
+    if failed:
+        logger.warning(f"Replay verification failed for {len(failed)} of {len(results)} games: {failed}")
+    legacy = [result.game_id for result in results if result.legacy]
+    if legacy:
+        logger.info(f"Role deal not verifiable for {len(legacy)} unseeded legacy games: {legacy}")
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Re-execute recorded games and compare the rule outcomes with the event log")
+    parser.add_argument("game_ids", nargs="*", help="Games to verify (default: all started games)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    with SessionLocal() as db:
+        verification = verify_games(db, args.game_ids or None, workers=args.workers)
+    for result in verification:
+        if not result.ok:
+            print(json.dumps(result.to_dict(), ensure_ascii=False))
+    sys.exit(0 if all(result.ok for result in verification) else 1)
@@ -3,14 +3,15 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Query
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+import asyncio
 import logging
 import json
 from typing import Dict, Set
 
 from app.config import settings
-from app.database import get_db, Base, engine
+from app.database import get_db, Base, engine, AsyncSessionLocal
 from app.routers import auth, rooms, admin, llm_config
-from app.routers import game_actions, agent_tools, llm_admin
+from app.routers import game_actions, agent_tools, llm_admin, game_events
 from app.websocket_manager import manager
 
 # Configure logging
@@ -47,6 +48,58 @@ app.include_router(llm_config.router, prefix="/api", tags=["llm-config"])
 app.include_router(game_actions.router, tags=["game-actions"])
 app.include_router(agent_tools.router, tags=["agent-tools"])
 app.include_router(llm_admin.router, tags=["llm-admin"])
+app.include_router(game_events.router, tags=["game-events"])
+
+
+_outbox_stop = asyncio.Event()
+_outbox_relay = None
+_outbox_task = None
+_timers_stop = None
+_timers_task = None
+
+
+@app.on_event("startup")
+async def start_game_registry():
+    """Create the process-wide game service so WebSocket actions are routed from the start"""
+    from app.game.registry import game_registry
+    game_registry.service
+
+
+@app.on_event("startup")
+async def start_phase_timer_recovery():
+    """Re-arm persisted phase deadlines and keep this worker's timer leases alive"""
+    global _timers_stop, _timers_task
+    from app.game.registry import game_registry
+    _timers_stop = asyncio.Event()
+    _timers_task = asyncio.create_task(game_registry.service.run_timer_recovery(_timers_stop))
+
+
+@app.on_event("startup")
+async def start_outbox_relay():
+    """Relay outbox events to NATS when the outbox is enabled"""
+    global _outbox_relay, _outbox_task
+    if not settings.event_outbox_enabled:
+        return
+    from app.game.outbox import OutboxRelay, NatsBus
+    _outbox_relay = OutboxRelay(AsyncSessionLocal, NatsBus(settings.nats_url))
+    _outbox_task = asyncio.create_task(_outbox_relay.run(_outbox_stop))
+
+
+@app.on_event("shutdown")
+async def stop_outbox_relay():
+    """Stop the outbox relay, letting the current batch finish"""
+    if _outbox_task is not None:
+        _outbox_stop.set()
+        await _outbox_task
+        await _outbox_relay.bus.close()
+
+
+@app.on_event("shutdown")
+async def stop_phase_timer_recovery():
+    """Stop firing phase timers and release their leases so another worker takes over"""
+    if _timers_task is not None:
+        _timers_stop.set()
+        await _timers_task
 
 
 @app.get("/")
@@ -9,7 +9,7 @@ import logging
 from app.database import get_db
 from app.agent.tools_service import AgentToolsService
 from app.game.game_service import GameService
-from app.websocket_manager import manager
+from app.game.registry import get_game_service
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +20,7 @@ class AgentSpeakRequest(BaseModel):
     game_id: str
     seat: int
     text: str
+    finished: bool = False
 
 
 class AgentVoteRequest(BaseModel):
@@ -44,14 +45,12 @@ class AgentGMQuestionRequest(BaseModel):
 @router.post("/agent/say")
 async def agent_say(
     request: AgentSpeakRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service)
 ):
     """Agent speak tool endpoint"""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-    
-    tools_service = AgentToolsService(db, manager.game_service)
-    result = await tools_service.say(request.game_id, request.seat, request.text)
+    tools_service = AgentToolsService(db, game_service)
+    result = await tools_service.say(request.game_id, request.seat, request.text, request.finished)
     
     return result.dict()
 
@@ -59,13 +58,11 @@ async def agent_say(
 @router.post("/agent/vote")
 async def agent_vote(
     request: AgentVoteRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service)
 ):
     """Agent vote tool endpoint"""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-    
-    tools_service = AgentToolsService(db, manager.game_service)
+    tools_service = AgentToolsService(db, game_service)
     result = await tools_service.vote(request.game_id, request.seat, request.target_seat)
     
     return result.dict()
@@ -74,13 +71,11 @@ async def agent_vote(
 @router.post("/agent/night-action")
 async def agent_night_action(
     request: AgentNightActionRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service)
 ):
     """Agent night action tool endpoint"""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-    
-    tools_service = AgentToolsService(db, manager.game_service)
+    tools_service = AgentToolsService(db, game_service)
     result = await tools_service.night_action(
         request.game_id, 
         request.seat, 
@@ -94,13 +89,11 @@ async def agent_night_action(
 @router.post("/agent/ask-gm")
 async def agent_ask_gm(
     request: AgentGMQuestionRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service)
 ):
     """Agent GM question tool endpoint"""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-    
-    tools_service = AgentToolsService(db, manager.game_service)
+    tools_service = AgentToolsService(db, game_service)
     result = await tools_service.ask_gm_for_clarification(
         request.game_id, 
         request.seat, 
@@ -9,7 +9,8 @@ import logging
 
 from app.database import get_db, Game, GamePlayer
 from app.routers.auth import get_current_user
-from app.websocket_manager import manager
+from app.game.game_service import GameService
+from app.game.registry import get_game_service
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ router = APIRouter()
 
 class SpeakRequest(BaseModel):
     content: str
+    finished: bool = False
 
 
 class VoteRequest(BaseModel):
@@ -49,11 +51,9 @@ async def speak(
     request: SpeakRequest,
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service),
 ):
     """Submit a speak action for the authenticated player."""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-
     # Ensure game exists
     game = db.query(Game).filter(Game.id == game_id).first()
     if not game:
@@ -62,7 +62,7 @@ async def speak(
     seat = _get_player_seat(db, game_id, current_user.id)
 
     try:
-        result = await manager.game_service.submit_speak(game_id, seat, request.content)
+        result = await game_service.submit_speak(game_id, seat, request.content, request.finished)
         return {"ok": True, "data": result}
     except ValueError as e:
         return {"ok": False, "error": {"code": "INVALID_ACTION", "message": str(e)}}
@@ -74,11 +74,9 @@ async def vote(
     request: VoteRequest,
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service),
 ):
     """Submit a vote for the authenticated player."""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-
     game = db.query(Game).filter(Game.id == game_id).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -86,7 +84,7 @@ async def vote(
     seat = _get_player_seat(db, game_id, current_user.id)
 
     try:
-        result = await manager.game_service.submit_vote(game_id, seat, request.target_seat)
+        result = await game_service.submit_vote(game_id, seat, request.target_seat)
         return {"ok": True, "data": result}
     except ValueError as e:
         # Attempt to classify common errors
@@ -101,11 +99,9 @@ async def night_action(
     request: NightActionRequest,
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    game_service: GameService = Depends(get_game_service),
 ):
     """Submit a night action for the authenticated player."""
-    if not manager.game_service:
-        raise HTTPException(status_code=503, detail="Game service unavailable")
-
     game = db.query(Game).filter(Game.id == game_id).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -113,7 +109,7 @@ async def night_action(
     seat = _get_player_seat(db, game_id, current_user.id)
 
     try:
-        result = await manager.game_service.submit_night_action(
+        result = await game_service.submit_night_action(
             game_id, seat, request.action, request.target_seat
         )
         return {"ok": True, "data": result}
@@ -0,0 +1,141 @@
+"""Game event log routes - replay seek and audit proofs over the event store"""
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional, List, Literal, Iterator
+from datetime import datetime
+import json
+import logging
+
+from app.database import get_db, Game, SessionLocal
+from app.game.event_sourcing import EventStore, GameEventManager, REPLAY_PAGE_SIZE
+from app.game.summaries import list_summaries
+from app.game.registry import game_registry
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/events/dispatch/metrics")
+def get_dispatch_metrics():
+    """Queue depth, delivery and error counters of the live event dispatcher."""
+    return {
+        **game_registry.service.event_manager.publisher.get_metrics(),
+        **game_registry.get_metrics()
+    }
+
+
+@router.get("/games/summaries")
+def get_game_summaries(
+    limit: int = Query(default=50, ge=1, le=200),
+    before: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+):
+    """List game summaries, newest first.
+
+    Pass the ``start_time`` of the last item as ``before`` to fetch the next page.
+    """
+    return {"games": list_summaries(db, limit=limit, before=before)}
+
+
+@router.get("/games/{game_id}/summary")
+def get_game_summary(
+    game_id: str,
+    db: Session = Depends(get_db),
+):
+    """Return the summary (rounds, phases, winner) of one game."""
+    summary = GameEventManager(db).get_game_summary(game_id)
+    if summary["total_events"] == 0:
+        raise HTTPException(status_code=404, detail="No events recorded for this game")
+    return summary
+
+
+@router.get("/games/{game_id}/events/{idx}/proof")
+def get_event_proof(
+    game_id: str,
+    idx: int,
+    db: Session = Depends(get_db),
+):
+    """Return a Merkle inclusion proof for one event of a game.
+
+    The proof ties the event to the root committed for its phase, so a single
+    speech or vote can be checked without downloading the whole game.
+    """
+    game = db.query(Game).filter(Game.id == game_id).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    proof = EventStore(db).get_inclusion_proof(game_id, idx)
+    if proof is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Event not found or its phase is not sealed yet",
+        )
+    return proof
+
+
+@router.get("/games/{game_id}/state")
+def get_game_state_at(
+    game_id: str,
+    idx: Optional[int] = Query(default=None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """Return the game state right after event idx (latest state if omitted).
+
+    The state is restored from the nearest snapshot and only the tail events
+    are replayed, so seeking costs O(events since snapshot).
+    """
+    game = db.query(Game).filter(Game.id == game_id).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    state = EventStore(db).load_game_state(game_id, to_idx=idx)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No events recorded for this game")
+    return {"game_id": game_id, "idx": idx, "state": state.to_snapshot()}
+
+
+@router.get("/games/{game_id}/events")
+def stream_game_events(
+    game_id: str,
+    from_idx: int = Query(default=0, ge=0),
+    to_idx: Optional[int] = Query(default=None, ge=0),
+    types: Optional[List[str]] = Query(default=None),
+    format: Literal["ndjson", "json"] = "ndjson",
+    page_size: int = Query(default=REPLAY_PAGE_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db),
+):
+    """Stream a game's events for replay or export.
+
+    Events are read in keyset pages (idx > cursor) and written out as they are
+    fetched, so memory stays flat however long the game is. ``types`` may be
+    repeated or comma separated. ``format=json`` streams one chunked JSON array
+    instead of newline-delimited JSON.
+    """
+    game = db.query(Game).filter(Game.id == game_id).first()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    type_filter = [t for value in types or [] for t in value.split(",") if t] or None
+    # The request session is closed before the body is streamed, so the generator owns its own
+    bind = db.get_bind()
+
+    def generate() -> Iterator[str]:
+        with SessionLocal(bind=bind) as stream_db:
+            events = GameEventManager(stream_db).stream_replay(
+                game_id, from_idx=from_idx, to_idx=to_idx, types=type_filter, page_size=page_size
+            )
+            if format == "ndjson":
+                for event in events:
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+                return
+
+            yield "["
+            for position, event in enumerate(events):
+                yield ("," if position else "") + json.dumps(event, ensure_ascii=False)
+            yield "]"
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(generate(), media_type=media_type)
@@ -334,30 +334,26 @@ async def start_game(
             detail="Need at least 6 players to start"
         )
     
-    # Create and start game using game service
-    from app.game.game_service import GameService
-    from app.websocket_manager import manager  # Get the WebSocket manager instance
+    # Create and start game on the process-wide game service
+    from app.game.registry import game_registry
     
-    game_service = GameService(db, manager)
-    manager.game_service = game_service  # Set reference
+    game_service = game_registry.service
     
     try:
-        # Create game
-        game_id = await game_service.create_game(room_id, room.config)
-        
-        # Start game (assign roles and begin first phase)
-        result = await game_service.start_game(game_id)
-        
-        # Update room status
-        room.status = "playing"
-        db.commit()
+        # Create and start the game (roles, players, first phase, room status) in one transaction
+        result = await game_service.start_room_game(room_id, room.config)
         
         return {
             "message": "Game started successfully",
-            "game_id": game_id,
+            "game_id": result["game_id"],
             "assignments": result.get("assignments", [])
         }
-        
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error starting game: {e}")
         raise HTTPException(
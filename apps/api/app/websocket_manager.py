@@ -188,6 +188,7 @@ class ConnectionManager:
     async def _handle_speak(self, websocket: WebSocket, room_id: str, user_id: str, payload: dict):
         """Handle speak message"""
         content = payload.get("content", "")
+        finished = bool(payload.get("finished", False))
         seat = self.websocket_seats.get(websocket)
         
         if not seat or not self.game_service:
@@ -203,18 +204,9 @@ class ConnectionManager:
         
         try:
             # Find game_id for this room
-            from app.database import Room, Game
-            from app.database import SessionLocal
-            
-            db = SessionLocal()
-            try:
-                room = db.query(Room).filter(Room.id == room_id).first()
-                if room:
-                    game = db.query(Game).filter(Game.room_id == room_id).order_by(Game.started_at.desc()).first()
-                    if game:
-                        await self.game_service.submit_speak(game.id, seat, content)
-            finally:
-                db.close()
+            game_id = await self.game_service.game_for_room(room_id)
+            if game_id:
+                await self.game_service.submit_speak(game_id, seat, content, finished)
                 
         except Exception as e:
             logger.error(f"Error handling speak: {e}")
@@ -245,18 +237,9 @@ class ConnectionManager:
         
         try:
             # Find game_id for this room
-            from app.database import Room, Game
-            from app.database import SessionLocal
-            
-            db = SessionLocal()
-            try:
-                room = db.query(Room).filter(Room.id == room_id).first()
-                if room:
-                    game = db.query(Game).filter(Game.room_id == room_id).order_by(Game.started_at.desc()).first()
-                    if game:
-                        await self.game_service.submit_vote(game.id, seat, target_seat)
-            finally:
-                db.close()
+            game_id = await self.game_service.game_for_room(room_id)
+            if game_id:
+                await self.game_service.submit_vote(game_id, seat, target_seat)
                 
         except Exception as e:
             logger.error(f"Error handling vote: {e}")
@@ -288,18 +271,9 @@ class ConnectionManager:
         
         try:
             # Find game_id for this room
-            from app.database import Room, Game
-            from app.database import SessionLocal
-            
-            db = SessionLocal()
-            try:
-                room = db.query(Room).filter(Room.id == room_id).first()
-                if room:
-                    game = db.query(Game).filter(Game.room_id == room_id).order_by(Game.started_at.desc()).first()
-                    if game:
-                        await self.game_service.submit_night_action(game.id, seat, action, target_seat)
-            finally:
-                db.close()
+            game_id = await self.game_service.game_for_room(room_id)
+            if game_id:
+                await self.game_service.submit_night_action(game_id, seat, action, target_seat)
                 
         except Exception as e:
             logger.error(f"Error handling night action: {e}")
@@ -4,14 +4,17 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import StaticPool, NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from app.main import app
 from app.database import get_db, Base
 from app.config import Settings
+from app.game.event_sourcing import chain_heads
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -30,6 +33,8 @@ def override_get_db():
 @pytest.fixture(scope="function")
 def db_session():
     """Create a fresh database session for each test"""
+    # Drop first so a test.db left with an older schema does not leak into the run
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -37,6 +42,13 @@ def db_session():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
+        chain_heads.clear()
+
+@pytest.fixture(scope="function")
+def async_session_factory(db_session):
+    """Create an async session factory bound to the same test database"""
+    async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+    yield async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(scope="function")
 def client(db_session):
@@ -135,4 +135,70 @@ def test_information_isolation(db_session):
     
     # Should not have access to other players' roles in public state
     # (only revealed/dead players should show roles)
-    assert len(observation.public_state.revealed_identities) == 0
\ No newline at end of file
+    assert len(observation.public_state.revealed_identities) == 0
+
+@pytest.mark.unit
+def test_observation_from_read_models(db_session):
+    """Test that chat, notes, deaths and potion usage come from projected read models"""
+    from app.game.event_sourcing import (
+        GameEventManager, EventStore, SpeakEvent, NightActionEvent, NightResultEvent,
+        PlayerDiedEvent, SystemNoticeEvent
+    )
+    from app.database import ChatMessageRecord, PrivateNoteRecord
+    
+    state_machine = GameStateMachine()
+    context_builder = AgentContextBuilder(db_session, state_machine)
+    
+    game_id = "test-game"
+    game_state = state_machine.create_game(game_id, {})
+    game_state.players = {
+        1: {"seat": 1, "role": "Seer", "alignment": "Village", "alive": True},
+        2: {"seat": 2, "role": "Werewolf", "alignment": "Werewolf", "alive": True},
+        3: {"seat": 3, "role": "Werewolf", "alignment": "Werewolf", "alive": True},
+        4: {"seat": 4, "role": "Witch", "alignment": "Village", "alive": False}
+    }
+    game_state.dead_players = [4]
+    game_state.current_phase = GamePhase.NIGHT
+    
+    now = datetime.utcnow()
+    event_manager = GameEventManager(db_session)
+    event_manager.emit(NightActionEvent(game_id=game_id, timestamp=now, actor="1", seat=1, action="inspect", target_seat=2, role="Seer"))
+    event_manager.emit(NightActionEvent(game_id=game_id, timestamp=now, actor="4", seat=4, action="save", target_seat=1, role="Witch"))
+    with event_manager.batch(game_id):
+        event_manager.emit(NightResultEvent(game_id=game_id, timestamp=now, actor="system", results={
+            "killed": [], "saved": [1], "poisoned": [], "guarded": [], "inspected": {2: "Werewolf"}
+        }))
+        event_manager.emit(PlayerDiedEvent(game_id=game_id, timestamp=now, actor="system", seat=4, cause="voted"))
+    event_manager.emit(SpeakEvent(game_id=game_id, timestamp=now, actor="2", seat=2, content="hello", phase="DayTalk"))
+    event_manager.emit(SpeakEvent(game_id=game_id, timestamp=now, actor="3", seat=3, content="wolves only", phase="Night", visibility="team"))
+    event_manager.emit(SystemNoticeEvent(game_id=game_id, timestamp=now, actor="system", message="for seat 2", target_seats=[2]))
+    
+    seer = context_builder.build_observation(game_id, 1)
+    assert [m.text for m in seer.chat_history.public_chat_tail] == ["hello"]
+    assert seer.chat_history.team_chat_tail == []
+    assert [n.content for n in seer.private_notes] == ["你查验了2号玩家，结果：Werewolf阵营", "你被女巫救了！"]
+    assert seer.public_state.revealed_identities[0]["reason"] == "voted_out"
+    
+    wolf = context_builder.build_observation(game_id, 2)
+    assert [m.text for m in wolf.chat_history.team_chat_tail] == ["wolves only"]
+    assert [n.content for n in wolf.private_notes] == ["for seat 2"]
+    
+    assert context_builder._get_witch_potion_status(game_id, 4) == (False, True)
+    
+    # Read models can be rebuilt from the event log alone
+    assert EventStore(db_session).rebuild_read_models(game_id, batch_size=2) == 7
+    assert db_session.query(ChatMessageRecord).filter_by(game_id=game_id).count() == 2
+    assert db_session.query(PrivateNoteRecord).filter_by(game_id=game_id).count() == 3
+    
+    # Running games recorded before the read-model tables are filled in by the backfill
+    from app.database import Game
+    from app.game.read_models import READ_MODELS, backfill_read_models
+    db_session.add(Game(id=game_id, room_id="test-room", seed="seed"))
+    for model in READ_MODELS:
+        db_session.query(model).filter_by(game_id=game_id).delete()
+    db_session.commit()
+    assert context_builder.build_observation(game_id, 1).private_notes == []
+    assert backfill_read_models(db_session) == 1
+    assert [n.content for n in context_builder.build_observation(game_id, 1).private_notes] == [
+        "你查验了2号玩家，结果：Werewolf阵营", "你被女巫救了！"
+    ]
@@ -206,4 +206,129 @@ def test_game_over_detection():
     is_over, winner = game_state.is_game_over()
     
     assert is_over is True
-    assert winner == "Werewolf"
\ No newline at end of file
+    assert winner == "Werewolf"
+
+@pytest.mark.unit
+def test_alive_indexes_track_deaths():
+    """Test alive, role and alignment indexes stay in sync with deaths"""
+    state_machine = GameStateMachine()
+    
+    game_state = state_machine.create_game("test-game-9", {})
+    game_state.players = {
+        1: {"role": "Werewolf", "alignment": "Werewolf"},
+        2: {"role": "Werewolf", "alignment": "Werewolf"},
+        3: {"role": "Seer", "alignment": "Village"},
+        4: {"role": "Villager", "alignment": "Village"},
+        5: {"role": "Villager", "alignment": "Village", "alive": False}
+    }
+    
+    assert game_state.get_alive_players() == [1, 2, 3, 4]
+    assert game_state.count_alive("Village") == 2
+    assert game_state.is_game_over() == (True, "Werewolf")
+    
+    game_state.mark_dead(1)
+    game_state.mark_dead(1)
+    
+    assert not game_state.is_alive(1) and game_state.is_alive(2)
+    assert game_state.get_players_by_role("Werewolf") == [2]
+    assert game_state.get_players_by_alignment("Village") == [3, 4]
+    assert game_state.dead_players == [1]
+    assert game_state.is_game_over() == (False, None)
+    
+    game_state.set_role(4, "Werewolf", "Werewolf")
+    assert game_state.count_alive("Werewolf") == 2
+    assert game_state.players[4]["role"] == "Werewolf"
+
+    # Malformed seats never reach the bitmaps
+    for seat in (0, -1, 6, 10 ** 6, True, 2.0, "2", None):
+        assert not game_state.is_alive(seat)
+    game_state.mark_dead(-1)
+    assert game_state.dead_players == [1]
+    with pytest.raises(ValueError):
+        game_state.add_player(-1)
+    assert -1 not in game_state.players
+
+
+@pytest.mark.unit
+def test_resolve_night_priorities():
+    """Test guard, shared kills, save, poison and inspect resolve in priority order"""
+    state_machine = GameStateMachine()
+    
+    game_id = "test-game-10"
+    roles = ["Werewolf", "Werewolf", "Seer", "Witch", "Guard", "Villager", "Villager"]
+    game_state = state_machine.create_game(game_id, {"roles": roles})
+    game_state.players = {
+        seat: {"role": role, "alignment": state_machine._get_alignment(role)}
+        for seat, role in enumerate(roles, start=1)
+    }
+    
+    game_state.night_actions = {
+        3: {"action": "inspect", "target_seat": 1, "actor_role": "Seer"},
+        1: {"action": "kill", "target_seat": 6, "actor_role": "Werewolf"},
+        2: {"action": "kill", "target_seat": 6, "actor_role": "Werewolf"},
+        4: {"action": "save", "target_seat": 6, "actor_role": "Witch"},
+        5: {"action": "guard", "target_seat": 7, "actor_role": "Guard"}
+    }
+    result = state_machine.resolve_night(game_id)
+    
+    assert result["killed"] == []
+    assert result["saved"] == [6]
+    assert result["guarded"] == [7]
+    assert result["inspected"] == {1: "Werewolf"}
+    assert game_state.is_alive(6)
+    
+    game_state.night_actions = {
+        1: {"action": "kill", "target_seat": 7, "actor_role": "Werewolf"},
+        2: {"action": "kill", "target_seat": 6, "actor_role": "Werewolf"},
+        4: {"action": "poison", "target_seat": 6, "actor_role": "Witch"},
+        5: {"action": "guard", "target_seat": 7, "actor_role": "Guard"}
+    }
+    result = state_machine.resolve_night(game_id)
+    
+    assert result["killed"] == [6]
+    assert result["poisoned"] == []
+    assert game_state.get_alive_players() == [1, 2, 3, 4, 5, 7]
+
+
+@pytest.mark.unit
+def test_phase_completion_predicates():
+    """Test that a phase is complete once every required alive player has acted"""
+    state_machine = GameStateMachine()
+    
+    game_id = "test-game-11"
+    roles = ["Werewolf", "Seer", "Villager", "Villager"]
+    game_state = state_machine.create_game(game_id, {"roles": roles})
+    game_state.players = {
+        seat: {"role": role, "alignment": state_machine._get_alignment(role)}
+        for seat, role in enumerate(roles, start=1)
+    }
+    
+    # Night: only roles with night actions are waited for
+    state_machine.start_phase(game_id, GamePhase.NIGHT)
+    state_machine.submit_night_action(game_id, 1, "kill", 3)
+    assert not state_machine.is_phase_complete(game_id)
+    state_machine.submit_night_action(game_id, 2, "inspect", 1)
+    assert state_machine.is_phase_complete(game_id)
+    state_machine.resolve_night(game_id)
+    
+    # Day talk: every alive player has to finish speaking
+    state_machine.start_phase(game_id, GamePhase.DAY_TALK)
+    for seat in (1, 2):
+        state_machine.finish_speech(game_id, seat)
+    assert not state_machine.is_phase_complete(game_id)
+    state_machine.finish_speech(game_id, 4)
+    assert state_machine.is_phase_complete(game_id)
+    with pytest.raises(ValueError):
+        state_machine.finish_speech(game_id, 3)
+    
+    # Vote: abstentions count as votes
+    state_machine.start_phase(game_id, GamePhase.VOTE)
+    state_machine.submit_vote(game_id, 1, None)
+    state_machine.submit_vote(game_id, 2, 1)
+    assert not state_machine.is_phase_complete(game_id)
+    state_machine.submit_vote(game_id, 4, 1)
+    assert state_machine.is_phase_complete(game_id)
+    
+    # Phases without a predicate only end on their deadline
+    state_machine.start_phase(game_id, GamePhase.DAWN)
+    assert not state_machine.is_phase_complete(game_id)
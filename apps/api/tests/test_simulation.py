@@ -0,0 +1,102 @@
+"""Test batch role-balance simulation"""
+
+import numpy as np
+import pytest
+
+from app.game.state_machine import GameStateMachine, GamePhase
+from app.game.simulation import (
+    ROLES, ACTIONS, BatchState, RandomPolicy, HeuristicPolicy, encode_lineup, deal_roles,
+    check_game_over, resolve_night, resolve_vote, simulate_lineup, VILLAGE_WIN, WEREWOLF_WIN
+)
+
+LINEUP = ["Werewolf", "Werewolf", "Seer", "Witch", "Guard", "Villager", "Villager"]
+
+
+def _scalar_game(state_machine, game, roles):
+    game_state = state_machine.create_game(f"sim-{game}", {})
+    game_state.players = {
+        seat + 1: {"role": ROLES[code], "alignment": state_machine._get_alignment(ROLES[code])}
+        for seat, code in enumerate(roles)
+    }
+    return game_state
+
+
+def _alive(game_state, n_seats):
+    return [game_state.is_alive(seat + 1) for seat in range(n_seats)]
+
+
+@pytest.mark.unit
+def test_batch_rules_match_state_machine():
+    """Test batch night/vote resolution against the scalar state machine"""
+    rng = np.random.default_rng(7)
+    policy = RandomPolicy()
+    state = BatchState(deal_roles(encode_lineup(LINEUP), 200, rng))
+    state_machine = GameStateMachine()
+    games = [_scalar_game(state_machine, game, state.roles[game]) for game in range(state.n_games)]
+
+    active = check_game_over(state)
+    for _ in range(6):
+        actions, targets = policy.night_actions(state, rng)
+        votes = policy.votes(state, rng)
+        before = active.copy()
+
+        resolve_night(state, actions, targets, mask=active)
+        active = check_game_over(state)
+        night_active = active.copy()
+        night_alive = state.alive.copy()
+        resolve_vote(state, votes, mask=active)
+        active = check_game_over(state)
+
+        for game, game_state in enumerate(games):
+            if not before[game]:
+                continue
+            game_id = game_state.game_id
+            state_machine.start_phase(game_id, GamePhase.NIGHT)
+            for seat in range(state.n_seats):
+                try:
+                    state_machine.submit_night_action(
+                        game_id, seat + 1, ACTIONS[actions[game, seat]],
+                        int(targets[game, seat]) + 1 if targets[game, seat] >= 0 else None
+                    )
+                except ValueError:
+                    pass
+            state_machine.resolve_night(game_id)
+
+            assert _alive(game_state, state.n_seats) == night_alive[game].tolist()
+            is_over, _ = game_state.is_game_over()
+            assert is_over == (not night_active[game])
+            if is_over:
+                continue
+
+            state_machine.start_phase(game_id, GamePhase.VOTE)
+            for seat in range(state.n_seats):
+                try:
+                    state_machine.submit_vote(game_id, seat + 1, int(votes[game, seat]) + 1 if votes[game, seat] >= 0 else None)
+                except ValueError:
+                    pass
+            state_machine.resolve_vote(game_id)
+
+            assert _alive(game_state, state.n_seats) == state.alive[game].tolist()
+            is_over, winner = game_state.is_game_over()
+            assert is_over == (not active[game])
+            if is_over:
+                assert state.winner[game] == (VILLAGE_WIN if winner == "Village" else WEREWOLF_WIN)
+
+
+@pytest.mark.unit
+def test_simulate_lineup():
+    """Test win rates and confidence interval of a simulated lineup"""
+    result = simulate_lineup(LINEUP, games=2000, policy=HeuristicPolicy(), seed=1, batch_size=512)
+
+    assert result.games == 2000
+    assert result.village_wins + result.werewolf_wins + result.unfinished == 2000
+    low, high = result.confidence_interval("Village")
+    assert low <= result.win_rate("Village") <= high
+    assert high - low < 0.05
+    assert simulate_lineup(LINEUP, games=2000, policy=HeuristicPolicy(), seed=1, batch_size=512) == result
+
+    # A lone villager against a werewolf ends before the first night
+    assert simulate_lineup(["Werewolf", "Villager"], games=10, seed=1).werewolf_wins == 10
+
+    with pytest.raises(ValueError):
+        simulate_lineup(["Werewolf", "Dragon"], games=1)
@@ -6,10 +6,12 @@ Handles real-time WebSocket connections and message broadcasting
 import asyncio
 import json
 import logging
-from typing import Dict, List, Set
+import os
+from typing import Dict, List, Optional, Set
 import redis.asyncio as redis
 import nats.aio.client as nc
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import httpx
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
@@ -34,23 +36,53 @@ nats_client: nc.Client = None
 active_connections: Dict[str, Set[WebSocket]] = {}
 room_connections: Dict[str, Set[str]] = {}
 
+# API used to resolve which seat an authenticated user holds in a room
+API_BASE_URL = os.getenv("API_BASE_URL", "http://api:8000")
+
+async def resolve_seat(token: Optional[str], room_id: str) -> Optional[int]:
+    """Look up the seat the token's user holds in the room; None for spectators or invalid tokens"""
+    if not token or not room_id:
+        return None
+    headers = {"Authorization": f"Bearer {token}"}
+    try:
+        async with httpx.AsyncClient(base_url=API_BASE_URL, timeout=5.0) as client:
+            me = await client.get("/auth/me", headers=headers)
+            if me.status_code != 200:
+                return None
+            user_id = me.json().get("id")
+            room = await client.get(f"/rooms/{room_id}", headers=headers)
+            if room.status_code != 200:
+                return None
+            for member in room.json().get("members", []):
+                if member.get("user_id") == user_id:
+                    return member.get("seat")
+    except Exception as e:
+        logger.warning(f"Failed to resolve seat for room {room_id}: {e}")
+    return None
+
 class ConnectionManager:
     """Manages WebSocket connections and rooms"""
     
     def __init__(self):
         self.active_connections: Dict[str, WebSocket] = {}
         self.room_connections: Dict[str, Set[str]] = {}
+        self.client_seats: Dict[str, int] = {}
+        self.client_tokens: Dict[str, str] = {}
     
-    async def connect(self, websocket: WebSocket, client_id: str):
+    async def connect(self, websocket: WebSocket, client_id: str, token: Optional[str] = None):
         """Accept a WebSocket connection"""
         await websocket.accept()
         self.active_connections[client_id] = websocket
+        if token:
+            self.client_tokens[client_id] = token
         logger.info(f"Client {client_id} connected")
     
     async def disconnect(self, client_id: str):
         """Disconnect a WebSocket client"""
         if client_id in self.active_connections:
             del self.active_connections[client_id]
+        self.client_seats.pop(client_id, None)
+        self.client_tokens.pop(client_id, None)
         
         # Remove from all rooms
         for room_id, clients in self.room_connections.items():
@@ -60,10 +92,14 @@ class ConnectionManager:
         logger.info(f"Client {client_id} disconnected")
     
     async def join_room(self, client_id: str, room_id: str):
-        """Add client to a room"""
+        """Add client to a room; its seat (needed for private game events) comes from the API, never the client"""
         if room_id not in self.room_connections:
             self.room_connections[room_id] = set()
         self.room_connections[room_id].add(client_id)
+        self.client_seats.pop(client_id, None)
+        seat = await resolve_seat(self.client_tokens.get(client_id), room_id)
+        if seat is not None:
+            self.client_seats[client_id] = seat
         logger.info(f"Client {client_id} joined room {room_id}")
     
     async def leave_room(self, client_id: str, room_id: str):
@@ -73,6 +109,7 @@ class ConnectionManager:
                 self.room_connections[room_id].remove(client_id)
             if not self.room_connections[room_id]:
                 del self.room_connections[room_id]
+        self.client_seats.pop(client_id, None)
         logger.info(f"Client {client_id} left room {room_id}")
     
     async def send_to_client(self, client_id: str, message: dict):
@@ -84,12 +121,21 @@ class ConnectionManager:
                 logger.error(f"Error sending to client {client_id}: {e}")
                 await self.disconnect(client_id)
     
-    async def broadcast_to_room(self, room_id: str, message: dict, exclude_client: str = None):
-        """Broadcast message to all clients in a room"""
+    async def broadcast_to_room(
+        self,
+        room_id: str,
+        message: dict,
+        exclude_client: str = None,
+        target_seats: Optional[List[int]] = None
+    ):
+        """Broadcast message to all clients in a room, or only to those at target_seats"""
         if room_id in self.room_connections:
-            for client_id in self.room_connections[room_id]:
-                if client_id != exclude_client:
-                    await self.send_to_client(client_id, message)
+            for client_id in list(self.room_connections[room_id]):
+                if client_id == exclude_client:
+                    continue
+                if target_seats is not None and self.client_seats.get(client_id) not in target_seats:
+                    continue
+                await self.send_to_client(client_id, message)
     
     async def broadcast_to_all(self, message: dict):
         """Broadcast message to all connected clients"""
@@ -104,9 +150,9 @@ async def health_check():
     return {"status": "healthy", "service": "websocket-gateway"}
 
 @app.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
+async def websocket_endpoint(websocket: WebSocket, client_id: str, token: Optional[str] = Query(None)):
     """WebSocket endpoint for real-time communication"""
-    await manager.connect(websocket, client_id)
+    await manager.connect(websocket, client_id, token)
     
     try:
         while True:
@@ -119,6 +165,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
             
             if msg_type == "join_room":
                 room_id = message.get("room_id")
+                # Any client-supplied seat is ignored; see ConnectionManager.join_room
                 await manager.join_room(client_id, room_id)
                 
             elif msg_type == "leave_room":
@@ -172,8 +219,8 @@ async def init_nats():
         nats_client = nc.Client()
         await nats_client.connect(servers=["nats://nats:4222"])
         
-        # Subscribe to game events
-        await nats_client.subscribe("game.*", cb=handle_game_event)
+        # Subscribe to game events: game.<room_id> and game.<room_id>.private
+        await nats_client.subscribe("game.>", cb=handle_game_event)
         logger.info("Connected to NATS")
     except Exception as e:
         logger.error(f"Failed to connect to NATS: {e}")
@@ -184,18 +231,22 @@ async def handle_game_event(msg):
         subject = msg.subject
         data = json.loads(msg.data.decode())
         
-        # Extract room_id from subject (e.g., "game.room_123")
+        # Extract room_id from subject (e.g., "game.room_123" or "game.room_123.private")
         parts = subject.split(".")
         if len(parts) >= 2:
             room_id = parts[1]
             
-            # Broadcast to all clients in the room
+            # Private events only go to the seats listed by the relay
+            target_seats = None
+            if len(parts) >= 3 and parts[2] == "private":
+                target_seats = data.get("target_seats") or []
+            
             await manager.broadcast_to_room(room_id, {
                 "type": "game_event",
                 "event_type": data.get("type"),
                 "payload": data.get("payload", {}),
                 "timestamp": data.get("timestamp")
-            })
+            }, target_seats=target_seats)
             
     except Exception as e:
         logger.error(f"Error handling game event: {e}")
@@ -50,9 +50,18 @@ CREATE TABLE IF NOT EXISTS games (
     config JSONB,
     version INTEGER DEFAULT 1,
     current_phase VARCHAR(20) DEFAULT 'Lobby',
-    current_round INTEGER DEFAULT 0
+    current_round INTEGER DEFAULT 0,
+    -- Durable phase timer: deadline of the current phase and the worker lease to fire it
+    phase_deadline TIMESTAMP,
+    timer_owner VARCHAR(255),
+    timer_lease_until TIMESTAMP
 );
 
+-- Databases created before the durable phase timers
+ALTER TABLE games ADD COLUMN IF NOT EXISTS phase_deadline TIMESTAMP;
+ALTER TABLE games ADD COLUMN IF NOT EXISTS timer_owner VARCHAR(255);
+ALTER TABLE games ADD COLUMN IF NOT EXISTS timer_lease_until TIMESTAMP;
+
 -- Game players table
 CREATE TABLE IF NOT EXISTS game_players (
     game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
@@ -74,9 +83,127 @@ CREATE TABLE IF NOT EXISTS events (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     type VARCHAR(50) NOT NULL,
     actor VARCHAR(20), -- seat number or "system"
-    payload JSONB,
+    payload JSONB, -- NULL when the payload is stored in payload_bin
+    payload_codec VARCHAR(20) NOT NULL DEFAULT 'json', -- json / msgpack-v1
+    payload_bin BYTEA,
+    hash VARCHAR(64) NOT NULL,
+    prev_hash VARCHAR(64),
+    CONSTRAINT uq_events_game_idx UNIQUE (game_id, idx)
+);
+
+-- Verified hash-chain checkpoints (incremental audit)
+CREATE TABLE IF NOT EXISTS chain_checkpoints (
+    game_id VARCHAR(255) PRIMARY KEY REFERENCES games(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
     hash VARCHAR(64) NOT NULL,
-    prev_hash VARCHAR(64)
+    verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Merkle roots of event segments (one per phase)
+CREATE TABLE IF NOT EXISTS merkle_commitments (
+    game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    from_idx INTEGER NOT NULL,
+    to_idx INTEGER NOT NULL,
+    round INTEGER,
+    phase VARCHAR(20),
+    leaf_count INTEGER NOT NULL,
+    root VARCHAR(64) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (game_id, from_idx)
+);
+
+-- Serialized GameState snapshots taken at phase boundaries
+CREATE TABLE IF NOT EXISTS game_snapshots (
+    game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    phase VARCHAR(20),
+    round INTEGER,
+    state JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (game_id, idx)
+);
+
+-- Transactional outbox relayed to NATS subjects game.<room_id>
+CREATE TABLE IF NOT EXISTS event_outbox (
+    id VARCHAR(255) PRIMARY KEY,
+    game_id VARCHAR(255) NOT NULL,
+    idx INTEGER NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    message JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    published_at TIMESTAMP,
+    claimed_until TIMESTAMP,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+
+-- Databases created before relays claimed their batches
+ALTER TABLE event_outbox ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMP;
+
+-- Offset index of finished games moved to cold-storage segment files
+CREATE TABLE IF NOT EXISTS archived_games (
+    game_id VARCHAR(255) PRIMARY KEY REFERENCES games(id) ON DELETE CASCADE,
+    segment VARCHAR(255) NOT NULL,
+    "offset" BIGINT NOT NULL,
+    length INTEGER NOT NULL,
+    event_count INTEGER NOT NULL,
+    last_idx INTEGER NOT NULL,
+    last_hash VARCHAR(64) NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per-game summaries maintained from PhaseChanged / GameEnded events
+CREATE TABLE IF NOT EXISTS game_summaries (
+    game_id VARCHAR(255) PRIMARY KEY REFERENCES games(id) ON DELETE CASCADE,
+    total_events INTEGER NOT NULL DEFAULT 0,
+    start_time TIMESTAMP,
+    end_time TIMESTAMP,
+    winner VARCHAR(20),
+    rounds INTEGER NOT NULL DEFAULT 0,
+    current_phase VARCHAR(20),
+    phases JSONB NOT NULL DEFAULT '[]',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Read models projected from the event stream
+CREATE TABLE IF NOT EXISTS chat_messages (
+    game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    seat INTEGER,
+    phase VARCHAR(20),
+    visibility VARCHAR(20) NOT NULL DEFAULT 'public',
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (game_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS night_actions (
+    game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    role VARCHAR(50),
+    action VARCHAR(20) NOT NULL,
+    target_seat INTEGER,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (game_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS deaths (
+    game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    seat INTEGER NOT NULL,
+    cause VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (game_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS private_notes (
+    id SERIAL PRIMARY KEY,
+    game_id VARCHAR(255) NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    seat INTEGER,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL
 );
 
 -- Action records table (idempotency)
@@ -137,11 +264,17 @@ CREATE INDEX IF NOT EXISTS idx_rooms_status ON rooms(status);
 CREATE INDEX IF NOT EXISTS idx_room_members_room_id ON room_members(room_id);
 CREATE INDEX IF NOT EXISTS idx_room_members_user_id ON room_members(user_id);
 CREATE INDEX IF NOT EXISTS idx_games_room_id ON games(room_id);
+CREATE INDEX IF NOT EXISTS idx_games_phase_deadline ON games(phase_deadline);
 CREATE INDEX IF NOT EXISTS idx_game_players_game_id ON game_players(game_id);
 CREATE INDEX IF NOT EXISTS idx_game_players_seat ON game_players(game_id, seat);
 CREATE INDEX IF NOT EXISTS idx_events_game_id ON events(game_id);
-CREATE INDEX IF NOT EXISTS idx_events_game_id_idx ON events(game_id, idx);
 CREATE INDEX IF NOT EXISTS idx_events_type ON events(type);
+CREATE INDEX IF NOT EXISTS idx_event_outbox_pending ON event_outbox(created_at) WHERE published_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_game_summaries_start_time ON game_summaries(start_time);
+CREATE INDEX IF NOT EXISTS idx_chat_messages_game_visibility ON chat_messages(game_id, visibility, idx);
+CREATE INDEX IF NOT EXISTS idx_night_actions_game_seat_action ON night_actions(game_id, seat, action, idx);
+CREATE INDEX IF NOT EXISTS idx_deaths_game_seat ON deaths(game_id, seat);
+CREATE INDEX IF NOT EXISTS idx_private_notes_game_seat ON private_notes(game_id, seat, idx);
 CREATE INDEX IF NOT EXISTS idx_presets_provider_id ON presets(provider_id);
 CREATE INDEX IF NOT EXISTS idx_bindings_scope ON bindings(scope, scope_key);
 CREATE INDEX IF NOT EXISTS idx_bindings_preset_id ON bindings(preset_id);